@@ -21,8 +21,8 @@ def main():
         # 确定配置文件目录
         config_dir = pathlib.Path(__file__).parent.parent / "config"
         
-        # 初始化并运行应用控制器
-        controller = AppController(config_dir)
+        # 初始化并运行应用控制器（配置文件修改后自动热更新）
+        controller = AppController(config_dir, hot_reload=True)
         controller.run()
         
     except KeyboardInterrupt:
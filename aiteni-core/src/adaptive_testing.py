@@ -0,0 +1,179 @@
+"""
+自适应测试（CAT）
+
+在 NTRPEvaluator 的预编译选项表之上，按"下一题信息量最大"的原则挑选问题：
+- 每道题各选项在各等级上的支持度按等级归一化，得到作答似然 P(选项 | 等级)；
+- 已作答各题的对数似然逐题累加，得到 NTRPConstants.LEVELS 上的后验分布；
+- 下一题取使后验期望信息增益（等级与该题作答的互信息）最大的未答题；
+- 后验在当前估计附近的概率质量达到置信度阈值，或剩余问题已无法改变展示等级时停止。
+似然和条件熵都在构造时预先算好，挑选一次下一题只需每题几次长度为等级数的点积。
+最终结果仍由 EvaluationSession 按评估器的规则计算。
+"""
+
+import math
+from operator import mul
+from typing import Dict, List, Optional
+
+from data_models import EvaluationDetail, QuestionConfig
+from evaluation_session import EvaluationSession
+
+# 各选项在任一等级上的最小支持度，避免某个等级被单次作答完全排除
+_SUPPORT_FLOOR = 1e-3
+
+
+class AdaptiveTest:
+    """自适应测试"""
+    
+    def __init__(
+        self,
+        evaluator,
+        confidence_threshold: float = 0.9,
+        tolerance: float = 0.5,
+        min_questions: int = 6,
+        max_questions: Optional[int] = None,
+        stop_when_decided: bool = True,
+    ) -> None:
+        """
+        初始化自适应测试
+        
+        Args:
+            evaluator: NTRPEvaluator 实例
+            confidence_threshold: 停止所需的置信度（后验在估计等级 ± tolerance 内的概率）
+            tolerance: 置信区间半宽
+            min_questions: 至少回答的题数
+            max_questions: 最多回答的题数，None 表示不限
+            stop_when_decided: 剩余问题已无法改变展示等级时是否停止（见 EvaluationSession.level_bounds）
+        """
+        self.evaluator = evaluator
+        self.confidence_threshold = confidence_threshold
+        self.tolerance = tolerance
+        self.min_questions = min_questions
+        self.max_questions = max_questions
+        self.stop_when_decided = stop_when_decided
+        
+        self.session = EvaluationSession(evaluator)
+        self._levels = evaluator._levels
+        self._log_posterior: List[float] = [0.0] * len(self._levels)
+        self._posterior: List[float] = [1.0 / len(self._levels)] * len(self._levels)
+        
+        # 每道题：各选项的似然行、对数似然行，以及 Σ_k P(k|ℓ)·log P(k|ℓ)（负条件熵）
+        self._likelihood: Dict[str, List[List[float]]] = {}
+        self._log_likelihood: Dict[str, Dict[str, List[float]]] = {}
+        self._neg_entropy: Dict[str, List[float]] = {}
+        for question in evaluator.questions:
+            rows = [
+                [s + _SUPPORT_FLOOR for s in evaluator._compiled_options[opt.id].support]
+                for opt in question.options
+            ]
+            totals = [sum(column) for column in zip(*rows)]
+            likelihood = [[s / t for s, t in zip(row, totals)] for row in rows]
+            self._likelihood[question.id] = likelihood
+            self._log_likelihood[question.id] = {
+                opt.id: [math.log(p) for p in row]
+                for opt, row in zip(question.options, likelihood)
+            }
+            self._neg_entropy[question.id] = [
+                sum(p * math.log(p) for p in column) for column in zip(*likelihood)
+            ]
+    
+    @property
+    def answers(self) -> Dict[str, str]:
+        """当前已作答的答案（副本）"""
+        return self.session.answers
+    
+    def posterior(self) -> Dict[float, float]:
+        """当前的等级后验分布 {等级: 概率}"""
+        return dict(zip(self._levels, self._posterior))
+    
+    def estimate(self) -> float:
+        """后验期望等级"""
+        return sum(level * p for level, p in zip(self._levels, self._posterior))
+    
+    def confidence(self) -> float:
+        """后验在期望等级 ± tolerance 内的概率质量"""
+        center = self.estimate()
+        limit = self.tolerance + 1e-9
+        return sum(p for level, p in zip(self._levels, self._posterior) if abs(level - center) <= limit)
+    
+    def information_gain(self) -> Dict[str, float]:
+        """
+        每道未答题的期望信息增益
+        
+        I(等级; 作答) = Σ_ℓ π(ℓ)·Σ_k P(k|ℓ)·log P(k|ℓ) − Σ_k P(k)·log P(k)，其中 P(k) = Σ_ℓ π(ℓ)·P(k|ℓ)
+        
+        Returns:
+            {问题ID: 信息增益（nat）}
+        """
+        posterior = self._posterior
+        gains: Dict[str, float] = {}
+        for question in self.evaluator.questions:
+            if question.id in self.session:
+                continue
+            gain = sum(map(mul, posterior, self._neg_entropy[question.id]))
+            for row in self._likelihood[question.id]:
+                p = sum(map(mul, posterior, row))
+                gain -= p * math.log(p)
+            gains[question.id] = gain
+        return gains
+    
+    def next_question(self) -> Optional[QuestionConfig]:
+        """
+        挑选下一道题
+        
+        Returns:
+            期望信息增益最大的未答题；已满足停止条件时返回 None
+        """
+        if self.should_stop():
+            return None
+        gains = self.information_gain()
+        if not gains:
+            return None
+        return self.evaluator._question_dict[max(gains, key=gains.get)]
+    
+    def answer(self, question_id: str, option_id: str) -> None:
+        """
+        记录一道题的答案（重复作答时替换原答案）
+        
+        Raises:
+            ValueError: 问题或选项不存在，或选项不属于该问题
+        """
+        log_likelihood = self._log_likelihood.get(question_id, {})
+        if option_id not in log_likelihood:
+            raise ValueError(f"答案格式错误或包含无效选项: {question_id}={option_id}")
+        
+        previous = self.session.answers.get(question_id)
+        self.session.answer(question_id, option_id)
+        
+        log_posterior = self._log_posterior
+        if previous is not None:
+            for i, value in enumerate(log_likelihood[previous]):
+                log_posterior[i] -= value
+        for i, value in enumerate(log_likelihood[option_id]):
+            log_posterior[i] += value
+        
+        peak = max(log_posterior)
+        weights = [math.exp(value - peak) for value in log_posterior]
+        total = sum(weights)
+        self._posterior = [w / total for w in weights]
+    
+    def should_stop(self) -> bool:
+        """是否满足停止条件"""
+        answered = len(self.session)
+        if answered >= len(self.evaluator.questions):
+            return True
+        if self.max_questions is not None and answered >= self.max_questions:
+            return True
+        if answered < max(self.min_questions, 1):
+            return False
+        if self.confidence() >= self.confidence_threshold:
+            return True
+        return self.stop_when_decided and self.session.level_bounds().decided
+    
+    def result(self, detail: EvaluationDetail = EvaluationDetail.FULL):
+        """
+        按已作答的问题生成评估结果
+        
+        Raises:
+            ValueError: 尚未作答任何问题
+        """
+        return self.session.snapshot(detail)
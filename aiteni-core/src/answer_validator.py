@@ -0,0 +1,164 @@
+"""
+严格答案校验
+
+每份问卷配置只编译一次：问题ID → 列号、(问题ID, 选项ID) → 选项下标、各层级的题数。
+校验一份答案只需对每个作答做两次字典查找：
+- 问题存在、选项存在，且选项属于所答问题（跨题作答视为错误）；
+- (问题ID, 选项ID) 序列形式的输入中同一道题只能出现一次；
+- 要求层级的完整性是该层问题集合与已答问题集合的一次子集判断，只有缺题时才列出缺少的问题。
+批量模式逐行给出错误码，并顺带输出有效行的整数编码，可直接交给 evaluate_many。
+"""
+
+from collections.abc import Mapping
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from data_models import (
+    AnswerErrorCode, AnswerValidation, BatchAnswerValidation, QuestionConfig
+)
+
+
+class AnswerValidator:
+    """编译后的答案校验器"""
+    
+    def __init__(self, questions: Sequence[QuestionConfig]) -> None:
+        """
+        Args:
+            questions: 问题配置列表（列顺序与 NTRPEvaluator.questions 一致）
+        """
+        self.questions = list(questions)
+        # 问题ID → (选项ID → 选项下标, 列号)
+        self._entries: Dict[str, Tuple[Dict[str, int], int]] = {}
+        self._option_owner: Dict[str, str] = {}
+        self._tier_questions: Dict[str, FrozenSet[str]] = {}
+        for j, question in enumerate(self.questions):
+            self._entries[question.id] = ({opt.id: k for k, opt in enumerate(question.options)}, j)
+            for opt in question.options:
+                self._option_owner[opt.id] = question.id
+            self._tier_questions[question.question_tier] = (
+                self._tier_questions.get(question.question_tier, frozenset()) | {question.id}
+            )
+    
+    @property
+    def tiers(self) -> List[str]:
+        """问卷中出现的层级"""
+        return list(self._tier_questions)
+    
+    def validate(
+        self,
+        answers,
+        required_tiers: Iterable[str] = (),
+        allow_empty: bool = False,
+    ) -> AnswerValidation:
+        """
+        校验一份答案
+        
+        Args:
+            answers: {问题ID: 选项ID}，或 [(问题ID, 选项ID), ...]
+            required_tiers: 必须全部作答的层级（如 ("basic",)）
+            allow_empty: 是否接受空答案
+        
+        Returns:
+            校验结果（第一处错误）
+        
+        Raises:
+            ValueError: required_tiers 中有问卷不存在的层级
+        """
+        return self._check(answers, self._required(required_tiers), allow_empty, None)
+    
+    def validate_many(
+        self,
+        answer_sets: Iterable,
+        required_tiers: Iterable[str] = (),
+        allow_empty: bool = False,
+    ) -> BatchAnswerValidation:
+        """
+        批量校验并编码
+        
+        Args:
+            answer_sets: 答案列表，每行格式同 validate
+            required_tiers: 必须全部作答的层级
+            allow_empty: 是否接受空答案
+        
+        Returns:
+            每行的校验结果和有效行的整数编码
+        
+        Raises:
+            ValueError: required_tiers 中有问卷不存在的层级
+        """
+        required = self._required(required_tiers)
+        width = len(self.questions)
+        results: List[AnswerValidation] = []
+        matrix: List[Optional[List[int]]] = []
+        for answers in answer_sets:
+            codes = [-1] * width
+            result = self._check(answers, required, allow_empty, codes)
+            results.append(result)
+            matrix.append(codes if result.ok else None)
+        return BatchAnswerValidation(results=results, matrix=matrix)
+    
+    def _required(self, required_tiers: Iterable[str]) -> Tuple[str, ...]:
+        required = tuple(required_tiers)
+        unknown = [tier for tier in required if tier not in self._tier_questions]
+        if unknown:
+            raise ValueError(f"问卷中不存在的层级: {', '.join(unknown)}")
+        return required
+    
+    def _check(
+        self,
+        answers,
+        required: Tuple[str, ...],
+        allow_empty: bool,
+        codes: Optional[List[int]],
+    ) -> AnswerValidation:
+        """校验一行；codes 不为 None 时同时写入整数编码"""
+        if isinstance(answers, Mapping):
+            pairs = answers.items()
+        elif isinstance(answers, (list, tuple)):
+            pairs = answers
+        else:
+            return AnswerValidation(AnswerErrorCode.MALFORMED)
+        
+        entries = self._entries
+        seen = set()
+        for pair in pairs:
+            try:
+                question_id, option_id = pair
+            except (TypeError, ValueError):
+                return AnswerValidation(AnswerErrorCode.MALFORMED)
+            
+            try:
+                entry = entries.get(question_id)
+            except TypeError:  # 不可哈希的问题ID
+                return AnswerValidation(AnswerErrorCode.MALFORMED)
+            if entry is None:
+                if not isinstance(question_id, str) or not isinstance(option_id, str):
+                    return AnswerValidation(AnswerErrorCode.MALFORMED)
+                return AnswerValidation(AnswerErrorCode.UNKNOWN_QUESTION, question_id, option_id)
+            options, column = entry
+            code = options.get(option_id) if isinstance(option_id, str) else None
+            if code is None:
+                if not isinstance(option_id, str):
+                    return AnswerValidation(AnswerErrorCode.MALFORMED)
+                error = (
+                    AnswerErrorCode.OPTION_NOT_IN_QUESTION if option_id in self._option_owner
+                    else AnswerErrorCode.UNKNOWN_OPTION
+                )
+                return AnswerValidation(error, question_id, option_id)
+            if question_id in seen:
+                return AnswerValidation(AnswerErrorCode.DUPLICATE_QUESTION, question_id, option_id)
+            seen.add(question_id)
+            if codes is not None:
+                codes[column] = code
+        
+        if not seen and not allow_empty:
+            return AnswerValidation(AnswerErrorCode.EMPTY)
+        
+        for tier in required:
+            if not self._tier_questions[tier] <= seen:
+                missing = [
+                    q.id for q in self.questions
+                    if q.question_tier in required and q.id not in seen
+                ]
+                return AnswerValidation(AnswerErrorCode.INCOMPLETE, missing=missing)
+        
+        return AnswerValidation(AnswerErrorCode.OK)
@@ -6,36 +6,50 @@
 """
 
 import pathlib
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence
 
 from config_manager import ConfigManager
 from ntrp_evaluator import NTRPEvaluator
+from adaptive_testing import AdaptiveTest
+from hot_reload import ConfigWatcher, build_snapshot
+from scoring_engines import EngineRegistry
 from chart_generator import ChartGenerator
 from interactive_ui import InteractiveUI
 from result_display import ResultDisplay
-from data_models import QuestionConfig, EvaluateResult
+from data_models import ConfigSnapshot, QuestionConfig, EvaluateResult, EngineStats
 
 
 class AppController:
     """应用程序控制器"""
     
-    def __init__(self, config_dir: Optional[pathlib.Path] = None):
+    def __init__(
+        self,
+        config_dir: Optional[pathlib.Path] = None,
+        shadow_engines: Sequence[str] = (),
+        hot_reload: bool = False,
+    ):
         """
         初始化控制器
         
         Args:
             config_dir: 配置文件目录，如果为None则使用默认目录
+            shadow_engines: 在 scoring.json 之外额外影子运行、与主引擎比对的评分引擎名
+                （见 scoring_engines.ENGINE_FACTORIES）
+            hot_reload: 是否在后台监视配置文件，修改后自动加载新配置（见 hot_reload.ConfigWatcher）
         """
         # 初始化各个组件
-        self.config_manager = ConfigManager(config_dir)
+        self._config_manager = ConfigManager(config_dir)
         self.ui = InteractiveUI()
-        self.display = ResultDisplay(self.config_manager)
-        self.chart_generator = ChartGenerator(self.config_manager)
         
-        # 核心组件（需要配置初始化）
-        self._evaluator: Optional[NTRPEvaluator] = None
-        self._questions: Optional[List[QuestionConfig]] = None
+        # 核心组件（需要配置初始化）：配置、评估器、路由策略和评分引擎作为一个快照整体替换，
+        # 每个请求开始时取一次 self._snapshot，之后只使用该快照中的对象
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._watcher: Optional[ConfigWatcher] = None
+        self._hot_reload = hot_reload
         self._is_initialized = False
+        
+        # 评分引擎：主引擎和影子引擎由 scoring.json 选择，shadow_engines 追加在后台比对
+        self._shadow_engine_names = list(shadow_engines)
     
     def initialize(self) -> bool:
         """
@@ -45,12 +59,19 @@ class AppController:
             是否初始化成功
         """
         try:
-            # 加载配置
-            self._questions = self.config_manager.load_questions()
-            suggestions = self.config_manager.load_suggestions()
+            # 加载配置，编译评估器、路由策略和评分引擎
+            config_dir = self._config_manager.config_dir
+            self._snapshot = build_snapshot(config_dir, shadow_engines=self._shadow_engine_names)
             
-            # 初始化评估器
-            self._evaluator = NTRPEvaluator(self._questions, suggestions, self.config_manager)
+            if self._hot_reload:
+                self._watcher = ConfigWatcher(
+                    config_dir,
+                    self._snapshot,
+                    on_reload=self._on_config_reload,
+                    on_error=lambda e: self.ui.show_error(f"新配置加载失败，继续使用当前配置: {e}"),
+                    shadow_engines=self._shadow_engine_names,
+                )
+                self._watcher.start()
             
             self._is_initialized = True
             return True
@@ -59,6 +80,40 @@ class AppController:
             self.ui.show_error(f"系统初始化失败: {e}")
             return False
     
+    @property
+    def config_manager(self) -> ConfigManager:
+        """当前配置快照的配置管理器（初始化前为启动时创建的管理器）"""
+        snapshot = self._snapshot
+        return snapshot.config_manager if snapshot is not None else self._config_manager
+    
+    @property
+    def engines(self) -> Optional[EngineRegistry]:
+        """当前配置快照的评分引擎注册表（统计按快照分别累计，热更新后从零开始）"""
+        snapshot = self._snapshot
+        return snapshot.engines if snapshot is not None else None
+    
+    @property
+    def display(self) -> ResultDisplay:
+        """按当前配置快照显示结果（请求处理中使用由请求所取快照创建的显示器）"""
+        return ResultDisplay(self.config_manager)
+    
+    @property
+    def chart_generator(self) -> ChartGenerator:
+        """按当前配置快照生成图表数据"""
+        return ChartGenerator(self.config_manager)
+    
+    @property
+    def _evaluator(self) -> Optional[NTRPEvaluator]:
+        return self._snapshot.evaluator if self._snapshot is not None else None
+    
+    @property
+    def _questions(self) -> Optional[List[QuestionConfig]]:
+        return self._snapshot.evaluator.questions if self._snapshot is not None else None
+    
+    def _on_config_reload(self, snapshot: ConfigSnapshot) -> None:
+        """热更新回调（在监视线程中执行）：替换唯一的快照引用，进行中的请求继续使用旧快照"""
+        self._snapshot = snapshot
+    
     def run(self) -> None:
         """运行主程序"""
         # 显示欢迎信息
@@ -78,8 +133,10 @@ class AppController:
                 if choice == 1:
                     self._handle_interactive_evaluation()
                 elif choice == 2:
-                    self._handle_demo_mode()
+                    self._handle_adaptive_evaluation()
                 elif choice == 3:
+                    self._handle_demo_mode()
+                elif choice == 4:
                     self.ui.show_goodbye()
                     break
                     
@@ -89,71 +146,100 @@ class AppController:
                 break
             except Exception as e:
                 self.ui.show_error(f"程序运行出错: {e}")
+        
+        if self._watcher is not None:
+            self._watcher.stop()
+        snapshot = self._snapshot
+        if snapshot is not None:
+            snapshot.engines.shutdown(wait=False)
     
     def _handle_interactive_evaluation(self) -> None:
-        """处理交互式评估流程（两阶段模式）"""
+        """处理交互式评估流程（按 routing.json 的路由策略分阶段作答）"""
+        snapshot = self._snapshot
+        display = ResultDisplay(snapshot.config_manager)
         try:
             # 显示评估提示
-            self.display.display_evaluation_tips()
+            display.display_evaluation_tips()
             self.ui.show_evaluation_tips()
-            self.ui.show_questions_summary(self._questions)
+            self.ui.show_questions_summary(snapshot.evaluator.questions)
             
             self.ui.confirm_continue("准备好了吗？按回车开始评估...")
             
-            # 分离基础题和进阶题
-            basic_questions = [q for q in self._questions if q.question_tier == "basic"]
-            advanced_questions = [q for q in self._questions if q.question_tier == "advanced"]
-            
-            # 阶段一：基础题评估
-            print(f"\n{'='*50}")
-            print(f"📊 【基础评估】 共 {len(basic_questions)} 题")
-            print(f"{'='*50}")
-            
-            basic_answers = self.ui.collect_answers(basic_questions)
-            
-            if not basic_answers:  # 用户取消
-                return
+            # 会话随作答逐题更新；剩余可能被询问的问题已无法改变展示等级时提前结束
+            run = snapshot.routing.start()
+            stage = run.next_stage()
             
-            # 验证基础题答案（不要求所有问题都有答案）
-            if not self.config_manager.validate_answers(basic_answers, require_all=False):
-                self.ui.show_error("答案验证失败")
-                return
-            
-            # 执行基础题评估，获得初步等级
-            basic_result = self._evaluator.evaluate(basic_answers)
-            L_screen = basic_result.total_level
-            
-            # 判断是否需要进阶题
-            all_answers = basic_answers.copy()
-            
-            if L_screen < 3.0:
-                # 低水平选手，跳过进阶题
-                print(f"\n正在分析您的答案...")
-            else:
-                # 需要进阶题
+            while stage is not None:
+                questions = run.pending_questions()
                 print(f"\n{'='*50}")
-                print(f"📊 【进阶评估】 共 {len(advanced_questions)} 题")
+                print(f"📊 【{stage.title}】 共 {len(questions)} 题")
                 print(f"{'='*50}")
                 
-                # 收集进阶题答案（不允许中途退出）
-                advanced_answers = self.ui.collect_answers(advanced_questions)
+                answers = self.ui.collect_answers(questions, on_answer=run.answer)
+                
+                if not answers:  # 用户取消
+                    return
                 
-                if advanced_answers and self.config_manager.validate_answers(advanced_answers, require_all=False):
-                    all_answers.update(advanced_answers)
+                # 验证本阶段答案（不要求所有问题都有答案）
+                if not snapshot.config_manager.validate_answers(answers, require_all=False):
+                    self.ui.show_error("答案验证失败")
+                    return
+                
+                stage = run.next_stage()
             
-            # 执行最终评估
-            print("\n正在生成完整评估报告...")
-            result = self._evaluator.evaluate(all_answers)
+            if run.decided and any(reason == "decided" for _, reason in run.skipped):
+                print(f"\n✅ 后续问题已不会改变评估结果，跳过剩余阶段")
             
-            # 生成图表数据
-            result.chart_data = self.chart_generator.generate_chart_data(result)
+            # 最终评估交给配置的主引擎（ntrp 直接复用作答中累积的会话状态），影子引擎在后台比对
+            print("\n正在生成完整评估报告...")
+            result = snapshot.engines.evaluate_session(run.session)
             
             # 展示结果
-            self.display.display_summary_card("🎾 您的NTRP评估结果", result)
+            display.display_summary_card("🎾 您的NTRP评估结果", result)
             
             # 询问是否查看详细分析
             if self.ui.get_user_confirmation("是否查看详细评估报告？"):
-                self.display.display_detailed_result("🎾 您的NTRP详细评估报告", result)
+                display.display_detailed_result("🎾 您的NTRP详细评估报告", result)
+            
+            self.ui.confirm_continue()
+            
+        except Exception as e:
+            self.ui.show_error(f"评估过程出错: {e}")
+    
+    def _handle_adaptive_evaluation(self) -> None:
+        """处理自适应评估流程（每次挑选信息量最大的问题，置信度足够时停止）"""
+        snapshot = self._snapshot
+        display = ResultDisplay(snapshot.config_manager)
+        try:
+            display.display_evaluation_tips()
+            self.ui.show_evaluation_tips()
+            
+            self.ui.confirm_continue("准备好了吗？按回车开始评估...")
+            
+            test = AdaptiveTest(snapshot.evaluator)
+            total = len(snapshot.evaluator.questions)
+            
+            print(f"\n{'='*50}")
+            print(f"🎯 【自适应评估】 最多 {total} 题，结果确定后自动结束")
+            print(f"{'='*50}")
+            print("(输入 'q' 可以随时退出)")
+            
+            question = test.next_question()
+            while question is not None:
+                option_id = self.ui.ask_question(question, len(test.answers) + 1, total)
+                if option_id is None:  # 用户取消
+                    return
+                test.answer(question.id, option_id)
+                question = test.next_question()
+            
+            print(f"\n✅ 共回答 {len(test.answers)} 个问题，评估置信度 {test.confidence():.0%}")
+            print("正在生成完整评估报告...")
+            result = snapshot.engines.evaluate_session(test.session)
+            
+            display.display_summary_card("🎾 您的NTRP评估结果", result)
+            
+            if self.ui.get_user_confirmation("是否查看详细评估报告？"):
+                display.display_detailed_result("🎾 您的NTRP详细评估报告", result)
             
             self.ui.confirm_continue()
             
@@ -162,8 +248,9 @@ class AppController:
     
     def _handle_demo_mode(self) -> None:
         """处理演示模式"""
+        snapshot = self._snapshot
         try:
-            demo_cases = self.config_manager.get_demo_cases()
+            demo_cases = snapshot.config_manager.get_demo_cases()
             
             while True:
                 choice = self.ui.show_demo_menu(demo_cases)
@@ -171,38 +258,38 @@ class AppController:
                 if choice == len(demo_cases) + 2:  # 返回主菜单
                     break
                 elif choice == len(demo_cases) + 1:  # 查看所有案例
-                    self._show_all_demo_cases(demo_cases)
+                    self._show_all_demo_cases(snapshot, demo_cases)
                 elif 1 <= choice <= len(demo_cases):
-                    self._show_single_demo_case(demo_cases[choice - 1])
+                    self._show_single_demo_case(snapshot, demo_cases[choice - 1])
                     
         except Exception as e:
             self.ui.show_error(f"演示模式出错: {e}")
     
-    def _show_all_demo_cases(self, demo_cases: List[Dict[str, Any]]) -> None:
+    def _show_all_demo_cases(self, snapshot: ConfigSnapshot, demo_cases: List[Dict[str, Any]]) -> None:
         """显示所有演示案例对比"""
+        display = ResultDisplay(snapshot.config_manager)
         print("\n" + "="*80)
         print("📊 演示案例对比")
         print("="*80)
         
         for case in demo_cases:
-            result = self._evaluator.evaluate(case["answers"])
-            result.chart_data = self.chart_generator.generate_chart_data(result)
-            self.display.display_simple_result(case["name"], result)
+            result = snapshot.engines.evaluate(case["answers"])
+            display.display_simple_result(case["name"], result)
         
         print("="*80)
         self.ui.confirm_continue()
     
-    def _show_single_demo_case(self, case: Dict[str, Any]) -> None:
+    def _show_single_demo_case(self, snapshot: ConfigSnapshot, case: Dict[str, Any]) -> None:
         """显示单个演示案例"""
-        result = self._evaluator.evaluate(case["answers"])
-        result.chart_data = self.chart_generator.generate_chart_data(result)
+        display = ResultDisplay(snapshot.config_manager)
+        result = snapshot.engines.evaluate(case["answers"])
         
         # 先显示简略版
-        self.display.display_summary_card(f"📋 {case['name']}", result)
+        display.display_summary_card(f"📋 {case['name']}", result)
         
         # 询问是否查看详细分析
         if self.ui.get_user_confirmation("是否查看详细评估报告？"):
-            self.display.display_detailed_result(f"📋 {case['name']} - 详细报告", result)
+            display.display_detailed_result(f"📋 {case['name']} - 详细报告", result)
         
         self.ui.confirm_continue()
     
@@ -246,19 +333,30 @@ class AppController:
             RuntimeError: 如果系统未初始化
             ValueError: 如果答案无效
         """
-        if not self._is_initialized or not self._evaluator:
+        snapshot = self._snapshot
+        if not self._is_initialized or snapshot is None:
             raise RuntimeError("系统未初始化")
         
-        if not self.validate_answers(answers):
+        if not snapshot.config_manager.validate_answers(answers):
             raise ValueError("答案验证失败")
         
-        # 执行评估
-        result = self._evaluator.evaluate(answers)
-        
-        # 生成图表数据
-        result.chart_data = self.chart_generator.generate_chart_data(result)
+        # 执行评估（包含图表数据）；影子引擎在后台比对，不影响返回
+        return snapshot.engines.evaluate(answers)
+    
+    def engine_summary(self) -> Dict[str, EngineStats]:
+        """
+        获取当前配置快照各评分引擎的耗时和影子比对统计
         
-        return result
+        Returns:
+            {引擎名: EngineStats}
+            
+        Raises:
+            RuntimeError: 如果系统未初始化
+        """
+        snapshot = self._snapshot
+        if not self._is_initialized or snapshot is None:
+            raise RuntimeError("系统未初始化")
+        return snapshot.engines.summary()
     
     def get_demo_cases(self) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,269 @@
+"""
+批量评估
+
+在 NTRPEvaluator 的预编译选项表之上，对整批答案一次性计算支持度分布、
+基础等级、维度分数、木桶效应统计和四舍五入等级。
+NumPy 可用时按题目列做向量化累加，否则逐条走评估器的数值路径。
+"""
+
+import math
+import weakref
+from typing import Any, Dict, List, Mapping, Optional
+
+from data_models import BatchEvaluateResult, NTRPConstants, round_to_half
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+# 每个评估器的按题查表数组只构建一次
+_column_tables_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def evaluate_many(evaluator, answer_sets, use_numpy: Optional[bool] = None) -> BatchEvaluateResult:
+    """
+    批量评估入口（由 NTRPEvaluator.evaluate_many 调用）
+    
+    Args:
+        evaluator: NTRPEvaluator 实例
+        answer_sets: 答案字典列表，或整数编码的答案矩阵
+        use_numpy: 是否使用 NumPy，None 表示可用时自动使用
+    
+    Returns:
+        批量评估结果
+    
+    Raises:
+        ValueError: 答案无效，或要求使用 NumPy 但未安装
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    elif use_numpy and np is None:
+        raise ValueError("未安装 NumPy，无法使用向量化批量评估")
+    
+    rows = list(answer_sets)
+    is_dict_input = bool(rows) and isinstance(rows[0], Mapping)
+    
+    if not use_numpy:
+        if not is_dict_input:
+            rows = [evaluator.decode_answers(codes) for codes in rows]
+        return _evaluate_many_python(evaluator, rows)
+    
+    matrix = evaluator.encode_answers(rows) if is_dict_input else rows
+    return _evaluate_many_numpy(evaluator, matrix)
+
+
+def _evaluate_many_python(evaluator, answer_sets: List[Dict[str, str]]) -> BatchEvaluateResult:
+    """纯 Python 回退：逐条调用评估器的数值路径"""
+    dimensions = list(evaluator._dimensions)
+    columns: Dict[str, List[Any]] = {
+        'support_distribution': [],
+        'dimension_scores': [],
+        'total_level': [],
+        'rounded_level': [],
+        'base_level': [],
+        'dimension_mean': [],
+        'dimension_variance': [],
+        'dimension_min': [],
+        'dimension_max': [],
+        'balance_factor': [],
+        'barrel_adjusted_level': [],
+        'comprehensive_bonus': [],
+    }
+    
+    for row, answers in enumerate(answer_sets):
+        if not evaluator._validate_answers(answers):
+            raise ValueError(f"第{row}条答案格式错误或包含无效选项")
+        
+        support, base_level, dimension_scores, barrel_stats = evaluator._evaluate_numbers(answers)
+        final_level = barrel_stats['final_level']
+        
+        columns['support_distribution'].append(list(support.values()))
+        columns['dimension_scores'].append(
+            [dimension_scores.get(dim, math.nan) for dim in dimensions]
+        )
+        columns['total_level'].append(final_level)
+        columns['rounded_level'].append(round_to_half(final_level))
+        columns['base_level'].append(base_level)
+        columns['dimension_mean'].append(barrel_stats['mean'])
+        columns['dimension_variance'].append(barrel_stats['variance'])
+        columns['dimension_min'].append(barrel_stats['min'])
+        columns['dimension_max'].append(barrel_stats['max'])
+        columns['balance_factor'].append(barrel_stats['balance_factor'])
+        columns['barrel_adjusted_level'].append(barrel_stats['barrel_adjusted'])
+        columns['comprehensive_bonus'].append(barrel_stats['bonus'])
+    
+    return BatchEvaluateResult(
+        levels=list(evaluator._levels),
+        dimensions=dimensions,
+        **columns
+    )
+
+
+def _get_column_tables(evaluator):
+    """获取（必要时构建）评估器的按题查表数组"""
+    tables = _column_tables_cache.get(evaluator)
+    if tables is None:
+        tables = _column_tables_cache[evaluator] = _build_column_tables(evaluator)
+    return tables
+
+
+def _build_column_tables(evaluator):
+    """
+    按题目构建查表数组
+    
+    每道题的表比选项数多一行全零（硬性上限为 inf）的填充行，
+    未作答编码 -1 恰好索引到这一行，累加时无需分支。
+    """
+    n_levels = len(evaluator._levels)
+    tables = []
+    for question in evaluator.questions:
+        compiled = [evaluator._compiled_options[opt.id] for opt in question.options]
+        support = np.zeros((len(compiled) + 1, n_levels))
+        weight = np.zeros(len(compiled) + 1)
+        center = np.zeros(len(compiled) + 1)
+        answered = np.zeros(len(compiled) + 1)
+        hard_cap = np.full(len(compiled) + 1, np.inf)
+        for k, c in enumerate(compiled):
+            support[k] = c.support
+            weight[k] = c.weight
+            center[k] = c.center_level
+            answered[k] = 1.0
+            hard_cap[k] = c.hard_cap
+        tables.append((
+            evaluator._dimension_index[question.dimension],
+            support, weight, center * weight, center, answered, hard_cap,
+        ))
+    return tables
+
+
+def _evaluate_many_numpy(evaluator, matrix) -> BatchEvaluateResult:
+    """NumPy 向量化路径：按题目列累加，逐列顺序与 evaluate 的累加顺序一致"""
+    codes = np.asarray(matrix, dtype=np.int64)
+    n_questions = len(evaluator.questions)
+    if codes.size == 0:
+        codes = codes.reshape(0, n_questions)
+    if codes.ndim != 2 or codes.shape[1] != n_questions:
+        raise ValueError(f"答案矩阵应为 n × {n_questions} 的二维整数矩阵")
+    
+    option_counts = np.array([len(q.options) for q in evaluator.questions])
+    invalid = (codes < -1) | (codes >= option_counts)
+    empty = (codes < 0).all(axis=1)
+    if invalid.any() or empty.any():
+        row = int(np.flatnonzero(invalid.any(axis=1) | empty)[0])
+        raise ValueError(f"第{row}条答案格式错误或包含无效选项")
+    
+    n_rows = codes.shape[0]
+    levels = np.asarray(evaluator._levels)
+    n_dims = len(evaluator._dimensions)
+    
+    support = np.zeros((n_rows, len(levels)))
+    dim_weight = np.zeros((n_rows, n_dims))
+    dim_weighted_sum = np.zeros((n_rows, n_dims))
+    dim_score_sum = np.zeros((n_rows, n_dims))
+    dim_count = np.zeros((n_rows, n_dims))
+    hard_cap = np.full(n_rows, np.inf)
+    
+    # 1) 按题目列累加支持度、维度累积量和硬性上限
+    for j, (d, t_support, t_weight, t_weighted, t_center, t_answered, t_cap) in enumerate(
+        _get_column_tables(evaluator)
+    ):
+        col = codes[:, j]
+        support += t_support[col]
+        dim_weight[:, d] += t_weight[col]
+        dim_weighted_sum[:, d] += t_weighted[col]
+        dim_score_sum[:, d] += t_center[col]
+        dim_count[:, d] += t_answered[col]
+        np.minimum(hard_cap, t_cap[col], out=hard_cap)
+    
+    return finish_numpy(
+        evaluator, support, dim_weight, dim_weighted_sum, dim_score_sum, dim_count, hard_cap
+    )
+
+
+def finish_numpy(
+    evaluator, support, dim_weight, dim_weighted_sum, dim_score_sum, dim_count, hard_cap
+) -> BatchEvaluateResult:
+    """
+    由逐行累积好的支持度、维度累积量和硬性上限计算批量数值结果
+    
+    Args:
+        evaluator: NTRPEvaluator 实例
+        support: 支持度 (n × 等级数)
+        dim_weight: 各维度权重和 (n × 维度数，列顺序同 evaluator._dimensions)
+        dim_weighted_sum: 各维度加权分数和
+        dim_score_sum: 各维度分数和
+        dim_count: 各维度作答题数
+        hard_cap: 硬性上限 (n)
+    """
+    n_rows = support.shape[0]
+    levels = np.asarray(evaluator._levels)
+    n_dims = len(evaluator._dimensions)
+    
+    # 2) 基础等级：支持度期望（按等级顺序累加，与 evaluate 一致）
+    total_support = np.zeros(n_rows)
+    weighted_levels = np.zeros(n_rows)
+    for k, level in enumerate(levels):
+        total_support += support[:, k]
+        weighted_levels += level * support[:, k]
+    fallback = levels[len(levels) // 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expectation = np.where(total_support > 0, weighted_levels / total_support, fallback)
+    base_level = np.minimum(expectation, hard_cap)
+    
+    # 3) 维度分数
+    present = dim_count > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.where(dim_weight > 0, dim_weighted_sum / dim_weight, dim_score_sum / dim_count)
+    scores = np.where(present, scores, np.nan)
+    
+    # 4) 木桶效应统计
+    n_present = present.sum(axis=1)
+    score_sum = np.zeros(n_rows)
+    for d in range(n_dims):
+        score_sum += np.where(present[:, d], scores[:, d], 0.0)
+    mean = score_sum / n_present
+    variance = np.zeros(n_rows)
+    for d in range(n_dims):
+        variance += np.where(present[:, d], (scores[:, d] - mean) ** 2, 0.0)
+    variance = variance / n_present
+    min_score = np.where(present, scores, np.inf).min(axis=1)
+    max_score = np.where(present, scores, -np.inf).max(axis=1)
+    
+    variance_low = NTRPConstants.VARIANCE_LOW
+    variance_high = NTRPConstants.VARIANCE_HIGH
+    balance_factor = np.where(
+        variance <= variance_low, 1.0,
+        np.where(
+            variance >= variance_high, 0.0,
+            1.0 - (variance - variance_low) / (variance_high - variance_low)
+        )
+    )
+    balance_factor = np.clip(balance_factor, 0.0, 1.0)
+    
+    barrel_adjusted = balance_factor * base_level + (1 - balance_factor) * min_score
+    barrel_adjusted = np.maximum(base_level - NTRPConstants.MAX_BARREL_PENALTY, barrel_adjusted)
+    
+    bonus = np.where(
+        (mean >= NTRPConstants.HIGH_LEVEL_THRESHOLD)
+        & (balance_factor >= NTRPConstants.BALANCE_THRESHOLD),
+        NTRPConstants.COMPREHENSIVE_BONUS, 0.0
+    )
+    final_level = barrel_adjusted + bonus
+    
+    return BatchEvaluateResult(
+        levels=list(evaluator._levels),
+        dimensions=list(evaluator._dimensions),
+        support_distribution=support,
+        dimension_scores=scores,
+        total_level=final_level,
+        rounded_level=np.round(final_level * 2) / 2,
+        base_level=base_level,
+        dimension_mean=mean,
+        dimension_variance=variance,
+        dimension_min=min_score,
+        dimension_max=max_score,
+        balance_factor=balance_factor,
+        barrel_adjusted_level=barrel_adjusted,
+        comprehensive_bonus=bonus,
+    )
@@ -0,0 +1,498 @@
+"""
+评分参数校准
+
+用联赛评级已知的选手作答数据，拟合 questions.json 中每个选项的 center_level
+和每道题的 weight，使最终等级与真实评级的均方误差最小。
+
+前向计算是 NTRPEvaluator 数值路径的 NumPy 向量化版本（整批选手一次计算）：
+支持度期望 → 硬性上限 → 维度分数 → 木桶效应调整 → 全面型加成，
+反向传播按同一链路手工求梯度（min/max/截断取次梯度，全面型加成的阶跃视为常数），
+用 Adam 全批量优化，并对偏离原配置的幅度加 L2 正则。
+几千名选手、几百次迭代在数秒内完成；校准前后的误差都用真实的 NTRPEvaluator 评估。
+
+用法:
+    python calibration.py players.json -o questions.candidate.json
+"""
+
+import argparse
+import dataclasses
+import json
+import math
+import pathlib
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from data_models import (
+    CalibrationMetrics, CalibrationReport, NTRPConstants, QuestionConfig
+)
+from ntrp_evaluator import NTRPEvaluator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+LabeledPlayer = Tuple[Dict[str, str], float]
+
+# 拟合参数的取值范围
+CENTER_RANGE = (NTRPConstants.LEVELS[0], NTRPConstants.LEVELS[-1])
+WEIGHT_RANGE = (0.1, 5.0)
+
+
+def load_labeled_players(path: pathlib.Path) -> List[LabeledPlayer]:
+    """
+    加载带标签的选手作答数据
+    
+    支持 JSON（列表，或 {"players": [...]}）和 JSON Lines（.jsonl），
+    每条记录形如 {"answers": {"Q1": "Q1_A3", ...}, "rating": 4.0}。
+    
+    Raises:
+        ValueError: 文件格式错误
+    """
+    path = pathlib.Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            records = data["players"] if isinstance(data, dict) else data
+    
+    try:
+        return [(dict(r["answers"]), float(r["rating"])) for r in records]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"选手数据格式错误: {e}")
+
+
+class Calibrator:
+    """center_level / weight 校准器"""
+    
+    def __init__(self, evaluator: NTRPEvaluator, players: Sequence[LabeledPlayer]) -> None:
+        """
+        Args:
+            evaluator: 当前配置的 NTRPEvaluator
+            players: [(答案字典, 真实评级), ...]
+        
+        Raises:
+            ValueError: 未安装 NumPy，答案包含无效选项，或有选手没有作答任何问题
+        """
+        if np is None:
+            raise ValueError("未安装 NumPy，无法进行向量化校准")
+        
+        self.evaluator = evaluator
+        self.questions: List[QuestionConfig] = list(evaluator.questions)
+        self.players = list(players)
+        
+        levels = np.array(evaluator._levels)
+        self._levels = levels
+        question_index = {q.id: j for j, q in enumerate(self.questions)}
+        
+        # 选项按问卷顺序展开；最后一行是"未作答"的哑选项（支持度为 0）
+        self.option_ids: List[str] = []
+        option_index: Dict[str, Tuple[int, int]] = {}
+        sigmas: List[float] = []
+        is_baseline: List[bool] = []
+        boosts: List[float] = []
+        fixed = []
+        centers: List[float] = []
+        caps: List[float] = []
+        for j, question in enumerate(self.questions):
+            for option in question.options:
+                option_index[option.id] = (j, len(self.option_ids))
+                self.option_ids.append(option.id)
+                centers.append(option.center_level)
+                caps.append(option.hard_cap if option.hard_cap is not None else np.inf)
+                boosts.append(NTRPConstants.LOCATOR_BOOST if option.anchor_type == "locator" else 1.0)
+                is_baseline.append(option.anchor_type == "baseline")
+                if option.anchor_type == "baseline":
+                    # 基线选项的隶属度只取决于 baseline_min_level，不随 center_level 变化
+                    sigmas.append(1.0)
+                    fixed.append([evaluator._compute_membership_by_anchor(l, option) for l in levels])
+                else:
+                    sigmas.append(NTRPConstants.LOCATOR_SIGMA if option.anchor_type == "locator" else evaluator.spread)
+                    fixed.append([0.0] * len(levels))
+        n_options = len(self.option_ids)
+        self._sigma = np.array(sigmas + [1.0])
+        self._is_baseline = np.array(is_baseline + [True])
+        self._boost = np.array(boosts + [0.0])
+        self._fixed = np.array(fixed + [[0.0] * len(levels)])
+        self.initial_centers = np.array(centers)
+        self.initial_weights = np.array([q.weight for q in self.questions])
+        
+        # 选手 × 题目 的选项下标
+        n_players, n_questions = len(self.players), len(self.questions)
+        option_matrix = np.full((n_players, n_questions), n_options, dtype=np.int64)
+        for i, (answers, _) in enumerate(self.players):
+            # 没有作答的选手支持度总和为 0，等级为 0/0，NaN 会污染整个损失和优化器状态
+            if not answers:
+                raise ValueError(f"第 {i + 1} 名选手没有作答任何问题")
+            for question_id, option_id in answers.items():
+                # 校准只接受选项属于所答问题的答案
+                j, k = option_index.get(option_id, (None, None))
+                if j is None or question_index.get(question_id) != j:
+                    raise ValueError(f"第 {i + 1} 名选手的答案无效: {question_id}={option_id}")
+                option_matrix[i, j] = k
+        self._option_matrix = option_matrix
+        self._answered = option_matrix < n_options
+        self._ratings = np.array([rating for _, rating in self.players])
+        self._hard_cap = np.append(np.array(caps), np.inf)[option_matrix].min(axis=1)
+        
+        dimensions = list(evaluator._dimensions)
+        self._question_dim = np.array([dimensions.index(q.dimension) for q in self.questions])
+        self._n_dims = len(dimensions)
+    
+    # ---------- 前向与反向 ----------
+    
+    def _option_terms(self, centers):
+        """各选项的 Σ等级×支持度、Σ支持度 及其对 center_level 的导数"""
+        c = np.append(centers, 0.0)[:, None]
+        diff = self._levels[None, :] - c
+        sigma = self._sigma[:, None]
+        gauss = np.exp(-(diff ** 2) / (2 * sigma ** 2))
+        membership = np.where(self._is_baseline[:, None], self._fixed, gauss)
+        g = membership * self._boost[:, None]
+        dg = np.where(self._is_baseline[:, None], 0.0, g * diff / sigma ** 2)
+        return g @ self._levels, g.sum(axis=1), dg @ self._levels, dg.sum(axis=1)
+    
+    def forward(self, centers, weights, with_grad: bool = False):
+        """
+        计算所有选手的最终等级（未四舍五入）
+        
+        Returns:
+            with_grad 为 False 时返回最终等级数组；否则返回 (最终等级, 反向传播所需的中间量)
+        """
+        opt = self._option_matrix
+        answered = self._answered
+        a, b, da, db = self._option_terms(centers)
+        
+        w = weights[None, :] * answered                          # (n, Q)
+        A = (w * a[opt]).sum(axis=1)
+        W = (w * b[opt]).sum(axis=1)
+        expectation = A / W
+        capped = expectation >= self._hard_cap
+        base = np.where(capped, self._hard_cap, expectation)
+        
+        # 维度分数
+        center_of = np.append(centers, 0.0)[opt]
+        n = len(opt)
+        num = np.zeros((n, self._n_dims))
+        den = np.zeros((n, self._n_dims))
+        for j, d in enumerate(self._question_dim):
+            num[:, d] += w[:, j] * center_of[:, j]
+            den[:, d] += w[:, j]
+        present = den > 0
+        scores = np.where(present, num / np.where(present, den, 1.0), 0.0)
+        count = present.sum(axis=1)
+        mean = (scores * present).sum(axis=1) / count
+        deviation = (scores - mean[:, None]) * present
+        variance = (deviation ** 2).sum(axis=1) / count
+        masked = np.where(present, scores, np.inf)
+        min_dim = masked.argmin(axis=1)
+        minimum = masked[np.arange(n), min_dim]
+        
+        # 木桶效应与全面型加成
+        low, high = NTRPConstants.VARIANCE_LOW, NTRPConstants.VARIANCE_HIGH
+        balance = np.clip(1.0 - (variance - low) / (high - low), 0.0, 1.0)
+        balance = np.where(variance <= low, 1.0, np.where(variance >= high, 0.0, balance))
+        blend = balance * base + (1 - balance) * minimum
+        floor = base - NTRPConstants.MAX_BARREL_PENALTY
+        barrel = np.maximum(floor, blend)
+        bonus = np.where(
+            (mean >= NTRPConstants.HIGH_LEVEL_THRESHOLD) & (balance >= NTRPConstants.BALANCE_THRESHOLD),
+            NTRPConstants.COMPREHENSIVE_BONUS, 0.0
+        )
+        final = barrel + bonus
+        if not with_grad:
+            return final
+        
+        cache = dict(
+            a=a, b=b, da=da, db=db, w=w, A=A, W=W, capped=capped, base=base,
+            center_of=center_of, num=num, den=den, present=present, count=count,
+            deviation=deviation, variance=variance, min_dim=min_dim, minimum=minimum,
+            balance=balance, blend=blend, floor=floor,
+        )
+        return final, cache
+    
+    def backward(self, d_final, centers, weights, cache):
+        """由 ∂损失/∂最终等级 反向传播到 (center_level, weight) 的梯度"""
+        opt = self._option_matrix
+        n = len(opt)
+        low, high = NTRPConstants.VARIANCE_LOW, NTRPConstants.VARIANCE_HIGH
+        
+        # barrel = max(floor, blend)
+        use_blend = cache["blend"] >= cache["floor"]
+        d_blend = np.where(use_blend, d_final, 0.0)
+        d_base = np.where(use_blend, 0.0, d_final)
+        
+        # blend = B·base + (1 - B)·min
+        balance = cache["balance"]
+        d_base = d_base + d_blend * balance
+        d_balance = d_blend * (cache["base"] - cache["minimum"])
+        d_minimum = d_blend * (1 - balance)
+        variance = cache["variance"]
+        in_ramp = (variance > low) & (variance < high)
+        d_variance = np.where(in_ramp, -d_balance / (high - low), 0.0)
+        
+        # 维度分数：方差和最低分
+        d_scores = (2.0 / cache["count"])[:, None] * cache["deviation"] * d_variance[:, None]
+        d_scores[np.arange(n), cache["min_dim"]] += d_minimum
+        present = cache["present"]
+        den = np.where(present, cache["den"], 1.0)
+        d_num = np.where(present, d_scores / den, 0.0)
+        d_den = np.where(present, -d_scores * cache["num"] / den ** 2, 0.0)
+        
+        # 基础等级：min(A / W, cap)
+        d_expectation = np.where(cache["capped"], 0.0, d_base)
+        W = cache["W"]
+        d_A = d_expectation / W
+        d_W = -d_expectation * cache["A"] / W ** 2
+        
+        a, b = cache["a"], cache["b"]
+        w = cache["w"]
+        answered = self._answered
+        dims = self._question_dim
+        # ∂/∂w_q 和 ∂/∂(选项 k 的 a, b, center)，按选手 × 题目展开
+        d_w_matrix = (
+            d_A[:, None] * a[opt] + d_W[:, None] * b[opt]
+            + d_num[:, dims] * cache["center_of"] + d_den[:, dims]
+        ) * answered
+        d_weights = d_w_matrix.sum(axis=0)
+        
+        d_center_matrix = (
+            w * (d_A[:, None] * cache["da"][opt] + d_W[:, None] * cache["db"][opt])
+            + d_num[:, dims] * w
+        )
+        d_centers = np.bincount(
+            opt.ravel(), weights=d_center_matrix.ravel(), minlength=len(centers) + 1
+        )[:-1]
+        return d_centers, d_weights
+    
+    def loss_and_grad(self, centers, weights, regularization: float, rows=None):
+        """均方误差 + L2 正则，以及对参数的梯度"""
+        final, cache = self.forward(centers, weights, with_grad=True)
+        residual = final - self._ratings
+        if rows is not None:
+            mask = np.zeros(len(residual))
+            mask[rows] = 1.0
+            residual = residual * mask
+            n = len(rows)
+        else:
+            n = len(residual)
+        center_delta = centers - self.initial_centers
+        weight_delta = weights - self.initial_weights
+        loss = (residual ** 2).sum() / n + regularization * (
+            (center_delta ** 2).mean() + (weight_delta ** 2).mean()
+        )
+        d_centers, d_weights = self.backward(2.0 * residual / n, centers, weights, cache)
+        d_centers = d_centers + regularization * 2.0 * center_delta / len(centers)
+        d_weights = d_weights + regularization * 2.0 * weight_delta / len(weights)
+        return loss, d_centers, d_weights
+    
+    # ---------- 拟合 ----------
+    
+    def fit(
+        self,
+        iterations: int = 400,
+        learning_rate: float = 0.02,
+        regularization: float = 0.05,
+        holdout: float = 0.2,
+        seed: int = 0,
+        decimals: int = 2,
+    ) -> Tuple[List[QuestionConfig], CalibrationReport]:
+        """
+        拟合 center_level 和 weight
+        
+        Args:
+            iterations: Adam 迭代次数
+            learning_rate: 学习率
+            regularization: 偏离原配置的 L2 正则系数
+            holdout: 留出评估的选手比例（0 表示全部用于拟合）
+            seed: 划分留出集的随机种子
+            decimals: 输出参数保留的小数位数
+        
+        Returns:
+            (候选问题配置, 校准前后的误差报告)
+        """
+        start = time.perf_counter()
+        indices = list(range(len(self.players)))
+        random.Random(seed).shuffle(indices)
+        n_holdout = int(len(indices) * holdout)
+        holdout_rows = sorted(indices[:n_holdout])
+        train_rows = sorted(indices[n_holdout:])
+        
+        params = [self.initial_centers.copy(), self.initial_weights.copy()]
+        bounds = [CENTER_RANGE, WEIGHT_RANGE]
+        moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        for step in range(1, iterations + 1):
+            _, d_centers, d_weights = self.loss_and_grad(
+                params[0], params[1], regularization, train_rows
+            )
+            for i, grad in enumerate((d_centers, d_weights)):
+                m, v = moments[i]
+                m[:] = beta1 * m + (1 - beta1) * grad
+                v[:] = beta2 * v + (1 - beta2) * grad ** 2
+                m_hat = m / (1 - beta1 ** step)
+                v_hat = v / (1 - beta2 ** step)
+                params[i] = np.clip(params[i] - learning_rate * m_hat / (np.sqrt(v_hat) + eps), *bounds[i])
+        
+        candidate = self.candidate_questions(params[0], params[1], decimals)
+        seconds = time.perf_counter() - start
+        
+        after = NTRPEvaluator(
+            candidate, self.evaluator.suggestion_rules, self.evaluator.config_manager, self.evaluator.spread
+        )
+        report = CalibrationReport(
+            train_before=self.metrics(self.evaluator, train_rows),
+            train_after=self.metrics(after, train_rows),
+            holdout_before=self.metrics(self.evaluator, holdout_rows) if holdout_rows else None,
+            holdout_after=self.metrics(after, holdout_rows) if holdout_rows else None,
+            iterations=iterations,
+            seconds=seconds,
+            center_changes={
+                option.id: (old.center_level, option.center_level)
+                for q_old, q_new in zip(self.questions, candidate)
+                for old, option in zip(q_old.options, q_new.options)
+                if option.center_level != old.center_level
+            },
+            weight_changes={
+                q_new.id: (q_old.weight, q_new.weight)
+                for q_old, q_new in zip(self.questions, candidate)
+                if q_new.weight != q_old.weight
+            },
+        )
+        return candidate, report
+    
+    def candidate_questions(self, centers, weights, decimals: int = 2) -> List[QuestionConfig]:
+        """用拟合参数生成新的问题配置（其余字段不变）"""
+        centers = iter(np.round(centers, decimals).tolist())
+        candidate = []
+        for question, weight in zip(self.questions, np.round(weights, decimals).tolist()):
+            options = [dataclasses.replace(option, center_level=next(centers)) for option in question.options]
+            candidate.append(dataclasses.replace(question, weight=weight, options=options))
+        return candidate
+    
+    def metrics(self, evaluator: NTRPEvaluator, rows: List[int]) -> CalibrationMetrics:
+        """用真实评估器计算一组选手上的误差"""
+        if not rows:
+            return compute_metrics([], [], [])
+        result = evaluator.evaluate_many([self.players[i][0] for i in rows])
+        return compute_metrics(result.total_level, result.rounded_level, self._ratings[rows].tolist())
+
+
+def compute_metrics(
+    total_levels: Sequence[float],
+    rounded_levels: Sequence[float],
+    ratings: Sequence[float],
+) -> CalibrationMetrics:
+    """
+    最终等级相对真实评级的误差（纯 Python，不依赖 NumPy）
+    
+    Args:
+        total_levels: 最终等级（未四舍五入）
+        rounded_levels: 展示等级
+        ratings: 真实评级
+    """
+    n = len(ratings)
+    if n == 0:
+        return CalibrationMetrics(players=0, mae=0.0, rmse=0.0, exact_rate=0.0, within_half_rate=0.0)
+    errors = [float(level) - rating for level, rating in zip(total_levels, ratings)]
+    rounded_errors = [abs(float(level) - rating) for level, rating in zip(rounded_levels, ratings)]
+    return CalibrationMetrics(
+        players=n,
+        mae=sum(abs(e) for e in errors) / n,
+        rmse=math.sqrt(sum(e * e for e in errors) / n),
+        exact_rate=sum(e < 1e-9 for e in rounded_errors) / n,
+        within_half_rate=sum(e <= 0.5 + 1e-9 for e in rounded_errors) / n,
+    )
+
+
+def write_questions_json(
+    source: pathlib.Path,
+    questions: List[QuestionConfig],
+    output: pathlib.Path,
+) -> None:
+    """
+    以原 questions.json 为模板写出候选配置，只替换 center_level 和 weight
+    
+    Args:
+        source: 原 questions.json
+        questions: 候选问题配置
+        output: 输出路径
+    """
+    with open(source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    
+    by_id = {q.id: q for q in questions}
+    for q in data["questions"]:
+        fitted = by_id.get(q["id"])
+        if fitted is None:
+            continue
+        q["weight"] = fitted.weight
+        centers = {o.id: o.center_level for o in fitted.options}
+        for o in q["options"]:
+            if o["id"] in centers:
+                o["center_level"] = centers[o["id"]]
+    
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def format_report(report: CalibrationReport) -> str:
+    """校准前后误差的文本报告"""
+    lines = [f"拟合耗时 {report.seconds:.2f} 秒（{report.iterations} 次迭代）", ""]
+    header = f"{'':<10}{'选手数':>6}{'MAE':>8}{'RMSE':>8}{'完全一致':>10}{'±0.5内':>9}"
+    rows = [("训练集", report.train_before, report.train_after)]
+    if report.holdout_before is not None:
+        rows.append(("留出集", report.holdout_before, report.holdout_after))
+    lines.append(header)
+    for name, before, after in rows:
+        for tag, m in (("校准前", before), ("校准后", after)):
+            lines.append(
+                f"{name + tag:<10}{m.players:>8}{m.mae:>8.3f}{m.rmse:>8.3f}"
+                f"{m.exact_rate:>11.1%}{m.within_half_rate:>10.1%}"
+            )
+    lines.append("")
+    lines.append(f"调整了 {len(report.center_changes)} 个选项的 center_level、{len(report.weight_changes)} 道题的 weight")
+    largest = sorted(report.center_changes.items(), key=lambda kv: -abs(kv[1][1] - kv[1][0]))[:10]
+    for option_id, (old, new) in largest:
+        lines.append(f"  {option_id:<8} center_level {old:.2f} → {new:.2f}")
+    for question_id, (old, new) in report.weight_changes.items():
+        lines.append(f"  {question_id:<8} weight {old:.2f} → {new:.2f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from config_manager import ConfigManager
+    
+    parser = argparse.ArgumentParser(description="用带评级的选手数据校准 center_level 和 weight")
+    parser.add_argument("players", type=pathlib.Path, help="选手数据（JSON 或 JSON Lines）")
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=pathlib.Path("questions.candidate.json"))
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--iterations", type=int, default=400)
+    parser.add_argument("--learning-rate", type=float, default=0.02)
+    parser.add_argument("--regularization", type=float, default=0.05)
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    
+    config_manager = ConfigManager(args.config_dir)
+    evaluator = NTRPEvaluator(config_manager.load_questions(), config_manager.load_suggestions(), config_manager)
+    calibrator = Calibrator(evaluator, load_labeled_players(args.players))
+    candidate, report = calibrator.fit(
+        iterations=args.iterations,
+        learning_rate=args.learning_rate,
+        regularization=args.regularization,
+        holdout=args.holdout,
+        seed=args.seed,
+    )
+    write_questions_json(config_manager.config_dir / "questions.json", candidate, args.output)
+    print(format_report(report))
+    print(f"\n候选配置已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
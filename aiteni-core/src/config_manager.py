@@ -5,22 +5,125 @@
 提供统一的配置访问接口。
 """
 
+import bisect
+import hashlib
 import json
+import marshal
+import math
+import os
 import pathlib
-from typing import Dict, List, Any, Optional
+import struct
+import warnings
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Optional, Sequence, Tuple
 
 from data_models import QuestionConfig, OptionConfig
+from answer_validator import AnswerValidator
+
+# scoring.json 缺省时的评分引擎配置（与未引入该文件前的行为一致）
+DEFAULT_SCORING_CONFIG: Dict[str, Any] = {
+    "primary_engine": "ntrp",
+    "shadow_engines": [],
+    "irt": {"parameters": "irt_parameters.json"},
+}
+
+# routing.json 缺省时的路由策略：先答基础题，初步等级达到 3.0 再答进阶题（与引入该文件前的交互流程一致）
+DEFAULT_ROUTING_CONFIG: Dict[str, Any] = {
+    "default_policy": "two_stage",
+    "policies": {
+        "two_stage": {
+            "stages": [
+                {"name": "basic", "title": "基础评估", "tier": "basic"},
+                {"name": "advanced", "title": "进阶评估", "tier": "advanced", "min_level": 3.0},
+            ],
+        },
+    },
+}
+
+# experiments.json 缺省时的问卷实验配置：只有 questions.json 一个版本，全部流量
+DEFAULT_EXPERIMENT_CONFIG: Dict[str, Any] = {
+    "salt": "questionnaire",
+    "versions": {
+        "current": {"questions": "questions.json", "traffic": 100},
+    },
+}
+
+# 二进制配置快照：魔数、格式版本、文件头长度，文件头为源文件内容的 SHA-256（每次恢复前都重新计算比对，
+# 不信任 mtime/大小），之后是全部已解析状态的 marshal 数据（问题和选项存为字段元组，恢复时重建数据类、索引和答案校验器）
+SNAPSHOT_FILE = "config.snapshot"
+SNAPSHOT_VERSION = 3                      # 快照格式或缓存结构变化时递增，使旧快照失效
+SNAPSHOT_MAGIC = b"NTRPSNAP"
+SNAPSHOT_SOURCES = (
+    "questions.json", "dimension_suggestions.json", "tennis_knowledge.json", "scoring.json", "routing.json",
+    "experiments.json",
+)
+# 直接保存的解析结果（JSON 数据、默认值合并后的配置和维度建议区间索引）
+_SNAPSHOT_TABLES = (
+    "_suggestions", "_tennis_knowledge", "_dimension_suggestions", "_suggestion_index",
+    "_scoring_config", "_routing_config", "_experiment_config",
+)
+_SNAPSHOT_PREFIX = struct.Struct("<8sII")
+
+
+def content_digest(config_dir: pathlib.Path, files: Sequence[str]) -> str:
+    """若干配置文件内容的 SHA-256（不存在的文件按缺失标记计入）"""
+    digest = hashlib.sha256()
+    for name in files:
+        digest.update(name.encode("utf-8") + b"\0")
+        try:
+            digest.update((pathlib.Path(config_dir) / name).read_bytes())
+        except FileNotFoundError:
+            digest.update(b"\0missing")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _intern_questions(questions: List[QuestionConfig], pool: Dict[Any, Any]) -> List[QuestionConfig]:
+    """
+    把字段完全相同的选项、问题和文本替换为池中已有的同一个对象
+    
+    多个问卷版本共用一个池时，各版本未改动的选项和问题在内存中只保留一份（配置对象加载后只读）。
+    """
+    interned: List[QuestionConfig] = []
+    for question in questions:
+        options = []
+        for o in question.options:
+            key = ("option", o.id, o.text, o.center_level, o.hard_cap, o.anchor_type, o.baseline_min_level)
+            option = pool.get(key)
+            if option is None:
+                o.text = pool.setdefault(o.text, o.text)
+                option = pool[key] = o
+            options.append(option)
+        
+        key = (
+            "question", question.id, question.text, question.dimension, question.weight, question.question_tier,
+            tuple(id(option) for option in options),
+        )
+        shared = pool.get(key)
+        if shared is None:
+            question.text = pool.setdefault(question.text, question.text)
+            question.options = options
+            shared = pool[key] = question
+        interned.append(shared)
+    return interned
 
 
 class ConfigManager:
     """配置文件管理器"""
     
-    def __init__(self, config_dir: Optional[pathlib.Path] = None):
+    def __init__(
+        self,
+        config_dir: Optional[pathlib.Path] = None,
+        use_snapshot: bool = True,
+        questions_file: str = "questions.json",
+    ):
         """
         初始化配置管理器
         
         Args:
             config_dir: 配置文件目录路径，如果为None则使用默认路径
+            use_snapshot: 是否优先加载与源文件一致的二进制快照（见 compile_snapshot）
+            questions_file: 配置目录下的问题文件名（快照只对应 questions.json，其它问题文件总是解析 JSON）
         """
         if config_dir is None:
             # 默认配置目录为当前文件上级目录的config文件夹
@@ -29,8 +132,29 @@ class ConfigManager:
             self.config_dir = config_dir
             
         self._questions: Optional[List[QuestionConfig]] = None
+        # 加载问题时一次性建立的只读索引：问题ID → 问题、选项ID → 选项、选项ID → 所属问题、层级 → 问题
+        self._question_index: Mapping[str, QuestionConfig] = MappingProxyType({})
+        self._option_index: Mapping[str, OptionConfig] = MappingProxyType({})
+        self._option_question: Mapping[str, QuestionConfig] = MappingProxyType({})
+        self._tier_index: Mapping[str, Tuple[QuestionConfig, ...]] = MappingProxyType({})
         self._suggestions: Optional[Dict[str, List[Dict[str, Any]]]] = None
         self._tennis_knowledge: Optional[Dict[str, Any]] = None
+        self._dimension_suggestions: Optional[Dict[str, Any]] = None
+        # 维度 → (断点, 各区间的建议文本)，见 _compile_suggestion_rules
+        self._suggestion_index: Optional[Dict[str, Tuple[List[float], List[Optional[str]]]]] = None
+        self._scoring_config: Optional[Dict[str, Any]] = None
+        self._routing_config: Optional[Dict[str, Any]] = None
+        self._experiment_config: Optional[Dict[str, Any]] = None
+        self._answer_validator: Optional[AnswerValidator] = None
+        
+        self.questions_file = questions_file
+        # 跨问卷版本共享的对象池（见 with_questions）
+        self._intern_pool: Optional[Dict[Any, Any]] = None
+        self._use_snapshot = use_snapshot and questions_file == "questions.json"
+        self._snapshot_checked = False
+        self.snapshot_loaded = False
+        # 快照存在但未被使用的原因：version / stale / corrupt，None 表示已使用或没有快照
+        self.snapshot_fallback: Optional[str] = None
     
     def load_questions(self) -> List[QuestionConfig]:
         """
@@ -43,10 +167,11 @@ class ConfigManager:
             FileNotFoundError: 配置文件不存在
             ValueError: 配置文件格式错误
         """
+        self._restore_snapshot()
         if self._questions is not None:
             return self._questions
             
-        questions_file = self.config_dir / "questions.json"
+        questions_file = self.config_dir / self.questions_file
         
         try:
             with open(questions_file, "r", encoding="utf-8") as f:
@@ -81,12 +206,42 @@ class ConfigManager:
                     )
                 )
             
+            if self._intern_pool is not None:
+                questions = _intern_questions(questions, self._intern_pool)
+            self._build_indexes(questions)
             self._questions = questions
             return questions
             
         except (KeyError, TypeError, ValueError) as e:
             raise ValueError(f"问题配置文件数据结构错误: {e}")
     
+    def _build_indexes(self, questions: List[QuestionConfig]) -> None:
+        """
+        建立问题和选项的只读索引
+        
+        Raises:
+            ValueError: 问题ID或选项ID重复
+        """
+        question_index: Dict[str, QuestionConfig] = {}
+        option_index: Dict[str, OptionConfig] = {}
+        option_question: Dict[str, QuestionConfig] = {}
+        tier_index: Dict[str, List[QuestionConfig]] = {}
+        for question in questions:
+            if question.id in question_index:
+                raise ValueError(f"重复的问题ID: {question.id}")
+            question_index[question.id] = question
+            tier_index.setdefault(question.question_tier, []).append(question)
+            for option in question.options:
+                if option.id in option_index:
+                    raise ValueError(f"重复的选项ID: {option.id}")
+                option_index[option.id] = option
+                option_question[option.id] = question
+        
+        self._question_index = MappingProxyType(question_index)
+        self._option_index = MappingProxyType(option_index)
+        self._option_question = MappingProxyType(option_question)
+        self._tier_index = MappingProxyType({tier: tuple(qs) for tier, qs in tier_index.items()})
+    
     def load_suggestions(self) -> Dict[str, List[Dict[str, Any]]]:
         """
         加载评语建议配置
@@ -98,6 +253,7 @@ class ConfigManager:
             FileNotFoundError: 配置文件不存在
             ValueError: 配置文件格式错误
         """
+        self._restore_snapshot()
         if self._suggestions is not None:
             return self._suggestions
             
@@ -126,6 +282,7 @@ class ConfigManager:
             FileNotFoundError: 配置文件不存在
             ValueError: 配置文件格式错误
         """
+        self._restore_snapshot()
         if self._tennis_knowledge is not None:
             return self._tennis_knowledge
             
@@ -154,17 +311,259 @@ class ConfigManager:
             FileNotFoundError: 配置文件不存在
             ValueError: 配置文件格式错误
         """
+        self._restore_snapshot()
+        if self._dimension_suggestions is not None:
+            return self._dimension_suggestions
+        
         suggestion_file = self.config_dir / "dimension_suggestions.json"
         
         try:
             with open(suggestion_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            return data
-            
         except FileNotFoundError:
             raise FileNotFoundError(f"维度建议配置文件不存在: {suggestion_file}")
         except json.JSONDecodeError as e:
             raise ValueError(f"维度建议配置文件格式错误: {e}")
+        
+        self._dimension_suggestions = data
+        return data
+    
+    def load_scoring_config(self) -> Dict[str, Any]:
+        """
+        加载评分引擎配置（scoring.json，不存在时使用 DEFAULT_SCORING_CONFIG）
+        
+        Returns:
+            {"primary_engine": 主引擎名, "shadow_engines": [影子引擎名], "irt": {...}}
+        
+        Raises:
+            ValueError: 配置文件格式错误
+        """
+        self._restore_snapshot()
+        if self._scoring_config is not None:
+            return self._scoring_config
+        
+        scoring_file = self.config_dir / "scoring.json"
+        
+        try:
+            with open(scoring_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError as e:
+            raise ValueError(f"评分引擎配置文件格式错误: {e}")
+        
+        if not isinstance(data, dict) or not isinstance(data.get("irt", {}), dict):
+            raise ValueError("评分引擎配置文件数据结构错误")
+        config = {**DEFAULT_SCORING_CONFIG, **data}
+        config["irt"] = {**DEFAULT_SCORING_CONFIG["irt"], **data.get("irt", {})}
+        config["shadow_engines"] = list(config["shadow_engines"])
+        
+        self._scoring_config = config
+        return config
+    
+    def load_routing_config(self) -> Dict[str, Any]:
+        """
+        加载路由策略配置（routing.json，不存在时使用 DEFAULT_ROUTING_CONFIG）
+        
+        Returns:
+            {"default_policy": 默认策略名, "policies": {策略名: 策略配置}}（策略结构见 routing_policy.build_policy）
+        
+        Raises:
+            ValueError: 配置文件格式错误或默认策略不存在
+        """
+        self._restore_snapshot()
+        if self._routing_config is not None:
+            return self._routing_config
+        
+        routing_file = self.config_dir / "routing.json"
+        
+        try:
+            with open(routing_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = DEFAULT_ROUTING_CONFIG
+        except json.JSONDecodeError as e:
+            raise ValueError(f"路由策略配置文件格式错误: {e}")
+        
+        if not isinstance(data, dict) or not isinstance(data.get("policies"), dict) or not data["policies"]:
+            raise ValueError("路由策略配置文件数据结构错误")
+        config = {"default_policy": data.get("default_policy", next(iter(data["policies"]))), "policies": data["policies"]}
+        if config["default_policy"] not in config["policies"]:
+            raise ValueError(f"默认路由策略不存在: {config['default_policy']}")
+        
+        self._routing_config = config
+        return config
+    
+    def load_experiment_config(self) -> Dict[str, Any]:
+        """
+        加载问卷实验配置（experiments.json，不存在时使用 DEFAULT_EXPERIMENT_CONFIG）
+        
+        Returns:
+            {"salt": 分流盐, "versions": {版本名: {"questions": 问题文件名, "traffic": 流量权重}}}
+        
+        Raises:
+            ValueError: 配置文件格式错误，或没有任何版本分到流量
+        """
+        self._restore_snapshot()
+        if self._experiment_config is not None:
+            return self._experiment_config
+        
+        experiment_file = self.config_dir / "experiments.json"
+        
+        try:
+            with open(experiment_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = DEFAULT_EXPERIMENT_CONFIG
+        except json.JSONDecodeError as e:
+            raise ValueError(f"问卷实验配置文件格式错误: {e}")
+        
+        try:
+            versions = {
+                str(name): {"questions": str(spec["questions"]), "traffic": float(spec.get("traffic", 0.0))}
+                for name, spec in data["versions"].items()
+            }
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"问卷实验配置文件数据结构错误: {e}")
+        if any(spec["traffic"] < 0 for spec in versions.values()):
+            raise ValueError("问卷版本的流量权重不能为负")
+        if sum(spec["traffic"] for spec in versions.values()) <= 0:
+            raise ValueError("问卷实验配置中没有分到流量的版本")
+        
+        self._experiment_config = {"salt": str(data.get("salt", DEFAULT_EXPERIMENT_CONFIG["salt"])), "versions": versions}
+        return self._experiment_config
+    
+    def with_questions(self, questions_file: str, pool: Optional[Dict[Any, Any]] = None) -> "ConfigManager":
+        """
+        创建只替换问题文件的配置管理器，问题以外的配置（知识文本、维度建议及其索引、评分/路由/实验配置）
+        与本实例共享同一份对象
+        
+        Args:
+            questions_file: 配置目录下的问题文件名
+            pool: 跨版本共享的对象池，相同的选项、问题和文本只保留一份（见 _intern_questions）；None 时不去重
+            
+        Returns:
+            已加载问题的配置管理器
+            
+        Raises:
+            FileNotFoundError / ValueError: 同各 load_* 方法
+        """
+        self.load_suggestions()
+        self.load_tennis_knowledge()
+        self.load_dimension_suggestions()
+        self.load_scoring_config()
+        self.load_routing_config()
+        self.load_experiment_config()
+        self._build_suggestion_index()
+        
+        other = ConfigManager(self.config_dir, use_snapshot=False, questions_file=questions_file)
+        for name in _SNAPSHOT_TABLES:
+            setattr(other, name, getattr(self, name))
+        other._intern_pool = pool
+        other.load_questions()
+        return other
+    
+    def load_all(self) -> None:
+        """
+        加载全部配置文件并建立全部索引（启动预热，或生成快照前调用）
+        
+        Raises:
+            FileNotFoundError / ValueError: 同各 load_* 方法
+        """
+        self.load_questions()
+        self.load_suggestions()
+        self.load_tennis_knowledge()
+        self.load_dimension_suggestions()
+        self.load_scoring_config()
+        self.load_routing_config()
+        self.load_experiment_config()
+        self.get_answer_validator()
+        self._build_suggestion_index()
+    
+    def compile_snapshot(self) -> pathlib.Path:
+        """
+        把全部已解析的配置（问题/选项数据、文本表、维度建议区间索引）写成配置目录下的二进制快照 SNAPSHOT_FILE
+        
+        文件头记录格式版本和 SNAPSHOT_SOURCES 的内容摘要；之后创建的 ConfigManager
+        重新计算摘要，内容一致时直接恢复这些状态，不再解析 JSON。
+        写入先落到临时文件再原子替换。
+        
+        Returns:
+            快照路径
+            
+        Raises:
+            FileNotFoundError / ValueError: 配置文件缺失或格式错误，或问题文件不是 questions.json
+        """
+        if self.questions_file != "questions.json":
+            raise ValueError(f"配置快照只对应 questions.json，不能由 {self.questions_file} 生成")
+        digest = content_digest(self.config_dir, SNAPSHOT_SOURCES)
+        self.load_all()
+        questions = tuple(
+            (q.id, q.text, q.dimension, q.weight, q.question_tier, tuple(
+                (o.id, o.text, o.center_level, o.hard_cap, o.anchor_type, o.baseline_min_level)
+                for o in q.options
+            ))
+            for q in self._questions
+        )
+        payload = marshal.dumps((questions,) + tuple(getattr(self, name) for name in _SNAPSHOT_TABLES))
+        header = marshal.dumps(digest)
+        
+        path = pathlib.Path(self.config_dir) / SNAPSHOT_FILE
+        temp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            f.write(_SNAPSHOT_PREFIX.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(temp, path)
+        return path
+    
+    def _restore_snapshot(self) -> None:
+        """
+        首次加载时尝试恢复二进制快照；快照不存在、版本或内容不一致、数据损坏时退回 JSON
+        
+        退回的原因记录在 snapshot_fallback 中；数据无法解码或重建时另外发出 RuntimeWarning，
+        解码和重建以外的异常原样抛出。
+        """
+        if self._snapshot_checked:
+            return
+        self._snapshot_checked = True
+        if not self._use_snapshot:
+            return
+        
+        try:
+            data = (pathlib.Path(self.config_dir) / SNAPSHOT_FILE).read_bytes()
+        except FileNotFoundError:
+            return
+        
+        try:
+            magic, version, header_size = _SNAPSHOT_PREFIX.unpack_from(data)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                self.snapshot_fallback = "version"
+                return
+            offset = _SNAPSHOT_PREFIX.size
+            if marshal.loads(data[offset:offset + header_size]) != content_digest(self.config_dir, SNAPSHOT_SOURCES):
+                self.snapshot_fallback = "stale"
+                return
+            questions_data, *tables = marshal.loads(data[offset + header_size:])
+            questions = [
+                QuestionConfig(
+                    id=qid, text=text, dimension=dimension, weight=weight, question_tier=tier,
+                    options=[OptionConfig(*option) for option in options],
+                )
+                for qid, text, dimension, weight, tier, options in questions_data
+            ]
+            self._build_indexes(questions)
+        except (ValueError, EOFError, TypeError, struct.error) as e:
+            # 损坏的快照按不存在处理，但要让人看到：反复出现说明快照格式与代码不一致
+            self.snapshot_fallback = "corrupt"
+            warnings.warn(f"配置快照无法恢复，改为解析 JSON: {type(e).__name__}: {e}", RuntimeWarning)
+            return
+        
+        self._questions = questions
+        for name, value in zip(_SNAPSHOT_TABLES, tables):
+            setattr(self, name, value)
+        self._answer_validator = AnswerValidator(questions)
+        self.snapshot_loaded = True
     
     def get_level_description(self, level: float) -> str:
         """
@@ -249,6 +648,23 @@ class ConfigManager:
         texts = knowledge.get("relative_evaluation_texts", {})
         return texts.get(evaluation_type, "")
     
+    def _build_suggestion_index(self) -> Dict[str, Tuple[List[float], List[Optional[str]]]]:
+        """
+        建立（已建立时直接返回）维度建议的区间索引
+        
+        Returns:
+            {维度: (断点, 各段建议文本)}（见 _compile_suggestion_rules）
+        """
+        index = self._suggestion_index
+        if index is None:
+            rules = self.load_dimension_suggestions().get("suggestions", {})
+            index = self._suggestion_index  # 加载时可能已从快照恢复
+            if index is None:
+                index = self._suggestion_index = {
+                    dim: _compile_suggestion_rules(dim_rules) for dim, dim_rules in rules.items()
+                }
+        return index
+    
     def get_dimension_suggestion(self, dimension: str, score: float) -> str:
         """
         根据维度和分数获取详细建议
@@ -258,28 +674,19 @@ class ConfigManager:
             score: 分数
             
         Returns:
-            建议文本
+            建议文本（按配置顺序第一条区间包含该分数的建议）
         """
-        suggestions_config = self.load_dimension_suggestions()
-        dimension_suggestions = suggestions_config.get("suggestions", {}).get(dimension, [])
+        index = self._suggestion_index
+        if index is None:
+            index = self._build_suggestion_index()
         
-        # 根据分数找到匹配的建议
-        for suggestion in dimension_suggestions:
-            min_score = suggestion.get("min")
-            max_score = suggestion.get("max")
-            
-            # 检查分数是否在范围内
-            if min_score is None and max_score is None:
-                continue
-            elif min_score is None:
-                if score <= max_score:
-                    return suggestion.get("text", "")
-            elif max_score is None:
-                if score >= min_score:
-                    return suggestion.get("text", "")
-            else:
-                if min_score <= score <= max_score:
-                    return suggestion.get("text", "")
+        entry = index.get(dimension)
+        if entry is not None and not math.isnan(score):
+            points, texts = entry
+            i = bisect.bisect_left(points, score)
+            text = texts[2 * i + 1] if i < len(points) and points[i] == score else texts[2 * i]
+            if text is not None:
+                return text
         
         return f"暂无针对{self.get_dimension_name(dimension)} {score:.1f}分的具体建议。"
     
@@ -321,11 +728,8 @@ class ConfigManager:
         Returns:
             问题配置，如果不存在返回None
         """
-        questions = self.load_questions()
-        for question in questions:
-            if question.id == question_id:
-                return question
-        return None
+        self.load_questions()
+        return self._question_index.get(question_id)
     
     def get_option_by_id(self, question_id: str, option_id: str) -> Optional[OptionConfig]:
         """
@@ -336,16 +740,65 @@ class ConfigManager:
             option_id: 选项ID
             
         Returns:
-            选项配置，如果不存在返回None
+            选项配置，如果问题不存在或选项不属于该问题返回None
         """
-        question = self.get_question_by_id(question_id)
-        if question is None:
+        self.load_questions()
+        question = self._option_question.get(option_id)
+        if question is None or question.id != question_id:
             return None
+        return self._option_index[option_id]
+    
+    def get_option(self, option_id: str) -> Optional[OptionConfig]:
+        """
+        只按选项ID获取选项配置
+        
+        Args:
+            option_id: 选项ID
             
-        for option in question.options:
-            if option.id == option_id:
-                return option
-        return None
+        Returns:
+            选项配置，如果不存在返回None
+        """
+        self.load_questions()
+        return self._option_index.get(option_id)
+    
+    def get_question_of_option(self, option_id: str) -> Optional[QuestionConfig]:
+        """
+        获取选项所属的问题
+        
+        Args:
+            option_id: 选项ID
+            
+        Returns:
+            问题配置，如果选项不存在返回None
+        """
+        self.load_questions()
+        return self._option_question.get(option_id)
+    
+    def get_questions_by_tier(self, tier: str) -> Tuple[QuestionConfig, ...]:
+        """
+        获取某一层级的全部问题（按配置顺序）
+        
+        Args:
+            tier: 问题层级（basic / advanced）
+            
+        Returns:
+            问题配置元组，层级不存在时为空
+        """
+        self.load_questions()
+        return self._tier_index.get(tier, ())
+    
+    def get_answer_validator(self) -> AnswerValidator:
+        """
+        获取编译后的答案校验器（按问题配置构建一次）
+        
+        Returns:
+            答案校验器
+        """
+        if self._answer_validator is None:
+            questions = self.load_questions()
+            if self._answer_validator is None:
+                self._answer_validator = AnswerValidator(questions)
+        return self._answer_validator
     
     def validate_answer(self, question_id: str, option_id: str) -> bool:
         """
@@ -358,7 +811,7 @@ class ConfigManager:
         Returns:
             是否有效
         """
-        return self.get_option_by_id(question_id, option_id) is not None
+        return self.get_answer_validator().validate({question_id: option_id}).ok
     
     def validate_answers(self, answers: Dict[str, str], require_all: bool = True) -> bool:
         """
@@ -371,19 +824,9 @@ class ConfigManager:
         Returns:
             是否全部有效
         """
-        questions = self.load_questions()
-        question_ids = {q.id for q in questions}
-        
-        # 如果要求所有问题都有答案
-        if require_all and not question_ids.issubset(answers.keys()):
-            return False
-        
-        # 检查每个答案是否有效
-        for question_id, option_id in answers.items():
-            if not self.validate_answer(question_id, option_id):
-                return False
-        
-        return True
+        validator = self.get_answer_validator()
+        required = validator.tiers if require_all else ()
+        return validator.validate(answers, required, allow_empty=not require_all).ok
     
     def get_demo_cases(self) -> List[Dict[str, Any]]:
         """
@@ -447,4 +890,55 @@ class ConfigManager:
                     "Q12": "Q12_A5",  # 几乎每天都练
                 }
             }
-        ]
\ No newline at end of file
+        ]
+
+
+# =========================
+#  维度建议区间索引
+# =========================
+
+def _suggestion_matches(suggestion: Dict[str, Any], score: float) -> bool:
+    """建议规则的区间 [min, max]（缺省一端不限，两端都缺省的规则不匹配任何分数）是否包含分数"""
+    min_score = suggestion.get("min")
+    max_score = suggestion.get("max")
+    if min_score is None and max_score is None:
+        return False
+    if min_score is not None and score < min_score:
+        return False
+    return max_score is None or score <= max_score
+
+
+def _compile_suggestion_rules(rules: List[Dict[str, Any]]) -> Tuple[List[float], List[Optional[str]]]:
+    """
+    把一个维度按顺序匹配的建议规则编译为区间索引
+    
+    所有 min/max 断点排序去重为 p_0 < … < p_{m-1}，数轴被分成 2m+1 段：
+    第 2i 段为 p_{i-1} 与 p_i 之间的开区间，第 2i+1 段为单点 p_i。
+    每段取一个代表点求出第一条匹配规则的文本（无匹配为 None），查询时 bisect 定位所在段，
+    结果与按配置顺序逐条匹配完全相同。
+    
+    Returns:
+        (断点, 各段建议文本)
+    """
+    points = sorted({
+        float(value)
+        for rule in rules
+        for value in (rule.get("min"), rule.get("max"))
+        if value is not None
+    })
+    
+    def first_text(score: float) -> Optional[str]:
+        for rule in rules:
+            if _suggestion_matches(rule, score):
+                return rule.get("text", "")
+        return None
+    
+    if not points:
+        return points, [first_text(0.0)]
+    
+    texts: List[Optional[str]] = [first_text(points[0] - 1.0)]
+    for i, point in enumerate(points):
+        texts.append(first_text(point))
+        upper = points[i + 1] if i + 1 < len(points) else point + 2.0
+        texts.append(first_text((point + upper) / 2))
+    return points, texts
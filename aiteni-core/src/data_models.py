@@ -22,6 +22,25 @@ class DimensionTag(Enum):
     WEAKNESS = "短板"
 
 
+class EvaluationDetail(Enum):
+    """评估结果详细程度"""
+    LEVEL = "level"      # 只计算等级 -> LevelResult
+    SCORES = "scores"    # 等级 + 维度分数 + 木桶效应统计 -> ScoreResult
+    FULL = "full"        # 完整结果（评语、总结、图表数据）-> EvaluateResult
+
+
+class AnswerErrorCode(Enum):
+    """答案校验错误码"""
+    OK = "ok"                                          # 有效
+    MALFORMED = "malformed"                            # 不是 {问题ID: 选项ID} 映射或 (问题ID, 选项ID) 序列
+    EMPTY = "empty"                                    # 没有任何答案
+    UNKNOWN_QUESTION = "unknown_question"              # 问题ID不存在
+    UNKNOWN_OPTION = "unknown_option"                  # 选项ID不存在
+    OPTION_NOT_IN_QUESTION = "option_not_in_question"  # 选项属于另一道题
+    DUPLICATE_QUESTION = "duplicate_question"          # 同一道题出现多次
+    INCOMPLETE = "incomplete"                          # 缺少要求层级的题
+
+
 # =========================
 #  配置相关数据结构
 # =========================
@@ -48,6 +67,19 @@ class QuestionConfig:
     question_tier: str = "basic"        # 问题等级: basic(基础问题) / advanced(进阶问题)
 
 
+@dataclass(frozen=True)
+class CompiledOption:
+    """预编译后的选项评分数据（评估器构造时生成，只与选项本身有关）"""
+    option_id: str                      # 选项ID
+    question_id: str                    # 所属问题ID
+    support: tuple                      # 对 NTRPConstants.LEVELS 各等级的加权支持度（已含题目权重和locator加成）
+    dimension: str                      # 所属维度
+    dimension_index: int                # 维度在评估器维度表中的下标
+    center_level: float                 # 中心等级（用于维度分数）
+    weight: float                       # 题目权重（用于维度分数）
+    hard_cap: float = float('inf')      # 硬性等级上限，无上限时为 inf
+
+
 # =========================
 #  图表相关数据结构
 # =========================
@@ -103,6 +135,17 @@ class ChartData:
 #  评估结果数据结构
 # =========================
 
+@dataclass
+class PosteriorSummary:
+    """由支持度分布归一化得到的等级后验摘要"""
+    probabilities: Dict[float, float]             # 各等级（0.5 一档）的后验概率，和为 1
+    mean: float                                   # 后验期望等级（未应用硬性上限和木桶效应）
+    credible_lower: float                         # 可信区间下端（包含展示等级）
+    credible_upper: float                         # 可信区间上端
+    credible_mass: float                          # 可信区间实际覆盖的概率
+    entropy: float                                # 后验熵（bit），越小越确定
+
+
 @dataclass
 class EvaluateResult:
     """评估结果完整输出"""
@@ -125,6 +168,302 @@ class EvaluateResult:
     balance_factor: Optional[float] = None        # 均衡度因子(0-1)
     barrel_adjusted_level: Optional[float] = None # 木桶修正后等级
     comprehensive_bonus: Optional[float] = None   # 全面型加成
+    # 后验摘要
+    posterior: Optional[PosteriorSummary] = None  # 等级后验、可信区间和熵
+
+
+@dataclass
+class LevelResult:
+    """只含等级的评估结果（EvaluationDetail.LEVEL）"""
+    total_level: float                            # 木桶效应调整后的最终等级（未四舍五入）
+    rounded_level: float                          # 对外展示等级（四舍五入到 0.5）
+
+
+@dataclass
+class ScoreResult:
+    """不含文本的数值评估结果（EvaluationDetail.SCORES）"""
+    total_level: float                            # 木桶效应调整后的最终等级（未四舍五入）
+    rounded_level: float                          # 对外展示等级（四舍五入到 0.5）
+    dimension_scores: Dict[str, float]            # 各维度数值
+    support_distribution: Dict[float, float]      # 各等级支持度分布
+    base_level: float                             # Anchor机制计算的基础等级
+    dimension_mean: float                         # 维度平均值
+    dimension_variance: float                     # 维度方差
+    dimension_min: float                          # 最低维度分数
+    dimension_max: float                          # 最高维度分数
+    balance_factor: float                         # 均衡度因子(0-1)
+    barrel_adjusted_level: float                  # 木桶修正后等级
+    comprehensive_bonus: float                    # 全面型加成
+    posterior: Optional[PosteriorSummary] = None  # 等级后验、可信区间和熵
+
+
+@dataclass
+class SensitivityEntry:
+    """单题改答后的评估结果（敏感度矩阵的一个单元）"""
+    question_id: str                              # 改答的问题ID
+    option_id: str                                # 改为的选项ID
+    total_level: float                            # 改答后的最终等级（未四舍五入）
+    rounded_level: float                          # 改答后的展示等级
+    level_delta: float                            # 相对当前最终等级的变化
+    rounded_delta: float                          # 相对当前展示等级的变化
+    base_level: float                             # 改答后的基础等级
+    dimension_min: float                          # 改答后的最低维度分数
+    balance_factor: float                         # 改答后的均衡度因子
+    barrel_adjusted_level: float                  # 改答后的木桶修正等级
+    comprehensive_bonus: float                    # 改答后的全面型加成
+
+
+@dataclass
+class UpgradePlan:
+    """达到目标等级的答案升级方案"""
+    target_level: float                           # 目标展示等级
+    reached: bool                                 # 是否在允许的改动数内达到目标
+    changes: List[tuple]                          # 改动列表 [(问题ID, 原选项ID, 新选项ID), ...]
+    current_level: float                          # 当前最终等级
+    total_level: float                            # 应用改动后的最终等级
+    rounded_level: float                          # 应用改动后的展示等级
+    evaluations: int = 0                          # 搜索中增量求值的次数
+
+
+@dataclass
+class LevelBounds:
+    """剩余问题所有作答组合下最终等级的上下界"""
+    lower_level: float                            # 最终等级下界
+    upper_level: float                            # 最终等级上界
+    rounded_lower: float                          # 展示等级下界
+    rounded_upper: float                          # 展示等级上界
+    decided: bool                                 # 展示等级是否已确定（上下界相同）
+    remaining: int                                # 剩余问题数
+
+
+@dataclass
+class CalibrationMetrics:
+    """一组带标签选手上的评分误差"""
+    players: int                                  # 选手数
+    mae: float                                    # 最终等级平均绝对误差
+    rmse: float                                   # 最终等级均方根误差
+    exact_rate: float                             # 展示等级与标签完全一致的比例
+    within_half_rate: float                       # 展示等级与标签相差不超过 0.5 的比例
+
+
+@dataclass
+class CalibrationReport:
+    """校准前后的误差对比报告"""
+    train_before: CalibrationMetrics              # 训练集：校准前
+    train_after: CalibrationMetrics               # 训练集：校准后
+    holdout_before: Optional[CalibrationMetrics]  # 留出集：校准前（未留出时为 None）
+    holdout_after: Optional[CalibrationMetrics]   # 留出集：校准后
+    iterations: int                               # 优化迭代次数
+    seconds: float                                # 拟合耗时（秒）
+    center_changes: Dict[str, tuple]              # {选项ID: (原 center_level, 新 center_level)}
+    weight_changes: Dict[str, tuple]              # {问题ID: (原 weight, 新 weight)}
+
+
+@dataclass
+class HyperparameterTrial:
+    """超参数搜索中一组候选常量的评分结果"""
+    index: int                                    # 候选编号（同一搜索空间下稳定，用于断点续跑）
+    params: Dict[str, float]                      # {常量名: 取值}，spread 为评估器参数
+    metrics: CalibrationMetrics                   # 在带标签数据上的误差
+    seconds: float                                # 构建评估器并评分的耗时（秒）
+
+
+@dataclass
+class AnswerValidation:
+    """单份答案的校验结果"""
+    code: AnswerErrorCode                         # 错误码（第一处错误）
+    question_id: Optional[str] = None             # 出错的问题ID
+    option_id: Optional[str] = None               # 出错的选项ID
+    missing: List[str] = field(default_factory=list)  # INCOMPLETE 时缺少的问题ID
+    
+    @property
+    def ok(self) -> bool:
+        return self.code is AnswerErrorCode.OK
+
+
+@dataclass
+class BatchAnswerValidation:
+    """批量答案校验结果（按行对应输入）"""
+    results: List[AnswerValidation]               # 每行的校验结果
+    matrix: List[Optional[List[int]]]             # 有效行的整数编码（见 NTRPEvaluator.encode_answers），无效行为 None
+    
+    def __len__(self) -> int:
+        return len(self.results)
+    
+    @property
+    def codes(self) -> List[AnswerErrorCode]:
+        """每行的错误码"""
+        return [r.code for r in self.results]
+    
+    @property
+    def valid_rows(self) -> List[int]:
+        """有效行的下标"""
+        return [i for i, r in enumerate(self.results) if r.ok]
+    
+    def error_counts(self) -> Dict[AnswerErrorCode, int]:
+        """各错误码的行数（不含 OK）"""
+        counts: Dict[AnswerErrorCode, int] = {}
+        for r in self.results:
+            if not r.ok:
+                counts[r.code] = counts.get(r.code, 0) + 1
+        return counts
+
+
+@dataclass
+class EngineStats:
+    """评分引擎的运行统计（主引擎与影子引擎共用）"""
+    engine: str                                   # 引擎名
+    role: str                                     # primary / shadow
+    calls: int                                    # 完成的调用次数
+    errors: int                                   # 抛出异常的次数
+    dropped: int                                  # 影子队列已满而放弃的次数
+    mean_ms: float                                # 平均耗时（毫秒）
+    p50_ms: float                                 # 最近样本的耗时中位数
+    p95_ms: float                                 # 最近样本的耗时 95 分位
+    max_ms: float                                 # 最大耗时
+    disagreements: int = 0                        # 展示等级与主引擎不同的次数（仅影子引擎）
+    level_deltas: Dict[float, int] = field(default_factory=dict)  # {影子等级 - 主引擎等级: 次数}
+
+
+@dataclass
+class IRTFitReport:
+    """分级反应模型 EM 拟合报告"""
+    respondents: int                              # 参与拟合的作答记录数
+    iterations: int                               # 实际 EM 迭代次数
+    converged: bool                               # 是否在迭代上限内收敛
+    log_likelihood: List[float]                   # 每轮 E 步的边际对数似然减参数先验惩罚（每条记录平均）
+    discrimination: Dict[str, float]              # {问题ID: 拟合后的区分度}
+    seconds: float                                # 拟合耗时（秒）
+
+
+@dataclass
+class InvariantCounterexample:
+    """缩减到最小的不变量反例（数值由 NTRPEvaluator.evaluate 重新计算）"""
+    invariant: str                                # 不变量名
+    answers: Dict[str, str]                       # 最小答案集合（删去任一其它题都不再违反）
+    observed: float                               # 实际值：总等级 / 木桶下调量 / 改选后的总等级
+    bound: float                                  # 应满足的界：硬性上限 / 最大下调 / 改选前的总等级
+    question_id: Optional[str] = None             # 单调性：改选的问题
+    from_option: Optional[str] = None             # 单调性：原选项
+    to_option: Optional[str] = None               # 单调性：center_level 更高的新选项
+
+
+@dataclass
+class InvariantResult:
+    """单个不变量的检查结果"""
+    invariant: str                                # 不变量名
+    checked: int                                  # 检查的样本数
+    violations: int                               # 违反的样本数
+    example: Optional[InvariantCounterexample] = None  # 违反幅度最大的样本缩减后的反例（有基线时只取新的违反）
+    new_violations: int = 0                       # 基线之外的违反数（没有基线时等于 violations）
+    signatures: Dict[str, float] = field(default_factory=dict)  # {违反签名: 最大违反幅度}
+    new_signatures: List[str] = field(default_factory=list)     # 有基线之外违反的签名
+
+
+@dataclass
+class InvariantReport:
+    """不变量检查报告"""
+    config_dir: str                               # 被检查的配置目录
+    rows: int                                     # 随机答案数
+    evaluations: int                              # 评估次数（含单调性检查的改选评估）
+    seconds: float                                # 总耗时（秒）
+    results: Dict[str, InvariantResult]           # {不变量名: 检查结果}
+    baseline: Optional[str] = None                # 比对的基线文件（见 invariant_checker.load_baseline）
+    sampling: Dict[str, Any] = field(default_factory=dict)  # 抽样参数 {"seed", "skip_rate", "chunk_size"}
+    
+    @property
+    def ok(self) -> bool:
+        """所有被检查的不变量都没有基线之外的违反（没有基线时即没有任何违反）"""
+        return all(result.new_violations == 0 for result in self.results.values())
+
+
+@dataclass
+class RoutingStage:
+    """路由策略中的一个作答阶段（一次提交一批问题）"""
+    name: str                                     # 阶段名
+    title: str                                    # 展示标题
+    question_ids: List[str]                       # 本阶段的问题ID
+    min_level: Optional[float] = None             # 进入条件：当前等级 ≥ min_level
+    max_level: Optional[float] = None             # 进入条件：当前等级 < max_level
+    skip_confidence: Optional[float] = None       # 进入时置信度已达到此值则跳过本阶段
+    stop_confidence: Optional[float] = None       # 作答中置信度达到此值即结束本阶段
+
+
+@dataclass
+class RoutingPolicy:
+    """多阶段路由策略（阶段按顺序询问，不满足进入条件的阶段被跳过）"""
+    name: str                                     # 策略名
+    stages: List[RoutingStage]                    # 各阶段
+    stop_when_decided: bool = True                # 后续作答已无法改变展示等级时结束整个问卷
+    confidence_tolerance: float = 0.5             # 置信度：后验在期望等级 ± tolerance 内的概率
+
+
+@dataclass
+class RoutingSimulation:
+    """路由策略在一组完整作答上的模拟结果（与全部作答的展示等级比较）"""
+    policy: str                                   # 策略名
+    respondents: int                              # 模拟的作答人数
+    mean_questions: float                         # 平均作答题数
+    mean_stages: float                            # 平均提交次数（进入的阶段数）
+    exact_rate: float                             # 展示等级与完整作答相同的比例
+    within_half_rate: float                       # 展示等级差不超过 0.5 的比例
+    mean_abs_error: float                         # 展示等级的平均绝对误差
+    max_abs_error: float                          # 展示等级的最大绝对误差
+    stage_rates: Dict[str, float] = field(default_factory=dict)  # {阶段名: 进入比例}
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    加载并编译完成的一份配置（热更新时整体替换，替换后不再修改）
+    
+    请求开始时取一次快照引用，整个请求只使用其中的对象，不会看到新旧配置混用的状态。
+    """
+    version: int                                  # 快照序号（首次加载为 1，每次热更新加 1）
+    digest: str                                   # 被监视配置文件内容的 SHA-256
+    config_manager: Any                           # 该版本配置的 ConfigManager（已加载全部文件）
+    evaluator: Any                                # 该版本配置编译的 NTRPEvaluator
+    routing: Any                                  # 默认路由策略的 RoutingRunner
+    engines: Any                                  # 按该版本 scoring.json 组建的 EngineRegistry
+    loaded_at: float                              # 构建完成时间（time.time()）
+
+
+@dataclass
+class VersionStats:
+    """问卷实验中单个版本的运行统计"""
+    version: str                                  # 版本名
+    questions_file: str                           # 问题文件名
+    traffic: float                                # 分到的流量比例（0~1）
+    calls: int                                    # 完成的评估次数
+    errors: int                                   # 抛出异常的次数
+    mean_ms: float                                # 平均耗时（毫秒）
+    p50_ms: float                                 # 最近样本的耗时中位数
+    p95_ms: float                                 # 最近样本的耗时 95 分位
+    max_ms: float                                 # 最大耗时
+    mean_level: float                             # 展示等级的平均值
+    level_distribution: Dict[float, int] = field(default_factory=dict)  # {展示等级: 次数}
+
+
+@dataclass
+class BatchEvaluateResult:
+    """批量评估数值结果（每个字段按行对应一份答案，NumPy 可用时为 ndarray，否则为 list）"""
+    levels: List[float]                           # 支持度分布的列（NTRPConstants.LEVELS）
+    dimensions: List[str]                         # 维度分数的列，未作答的维度为 nan
+    support_distribution: Any                     # 支持度分布 (n × 等级数)
+    dimension_scores: Any                         # 各维度数值 (n × 维度数)
+    total_level: Any                              # 木桶效应调整后的最终等级
+    rounded_level: Any                            # 四舍五入到 0.5 的等级
+    base_level: Any                               # Anchor机制计算的基础等级
+    dimension_mean: Any                           # 维度平均值
+    dimension_variance: Any                       # 维度方差
+    dimension_min: Any                            # 最低维度分数
+    dimension_max: Any                            # 最高维度分数
+    balance_factor: Any                           # 均衡度因子(0-1)
+    barrel_adjusted_level: Any                    # 木桶修正后等级
+    comprehensive_bonus: Any                      # 全面型加成
+    
+    def __len__(self) -> int:
+        return len(self.total_level)
 
 
 # =========================
@@ -190,6 +529,9 @@ class NTRPConstants:
     HIGH_LEVEL_THRESHOLD: float = 4.5   # 高水平阈值
     MAX_BARREL_PENALTY: float = 1.0     # 木桶效应最大下调幅度
     COMPREHENSIVE_BONUS: float = 0.25   # 全面型选手加成
+    
+    # 后验摘要相关常量
+    CREDIBLE_MASS: float = 0.5          # 可信区间的最低覆盖概率（"很可能"的范围）
 
 
 # =========================
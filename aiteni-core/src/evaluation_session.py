@@ -0,0 +1,189 @@
+"""
+增量评估会话
+
+在 NTRPEvaluator 的预编译选项表之上维护一份可增量更新的评估状态：
+支持度向量、各维度加权累积量和硬性上限。
+答案可以逐题或按题目分层（basic / advanced）加入，每次更新只需 O(等级数)，
+任意时刻都可以取出当前的评估快照。
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import level_bounds
+from data_models import CompiledOption, EvaluationDetail, LevelBounds
+
+
+class EvaluationSession:
+    """增量评估会话"""
+    
+    def __init__(self, evaluator, answers: Optional[Dict[str, str]] = None) -> None:
+        """
+        初始化会话
+        
+        Args:
+            evaluator: NTRPEvaluator 实例
+            answers: 初始答案（可选），按字典顺序依次加入
+        """
+        self.evaluator = evaluator
+        self._support: List[float] = [0.0] * len(evaluator._levels)
+        self._dim_sums: Dict[str, List[float]] = {}
+        self._hard_cap = float('inf')
+        self._answers: Dict[str, str] = {}
+        self._compiled: Dict[str, CompiledOption] = {}
+        
+        if answers:
+            self.answer_many(answers)
+    
+    @property
+    def answers(self) -> Dict[str, str]:
+        """当前已作答的答案（副本）"""
+        return dict(self._answers)
+    
+    def __len__(self) -> int:
+        return len(self._answers)
+    
+    def __contains__(self, question_id: str) -> bool:
+        return question_id in self._answers
+    
+    def answer(self, question_id: str, option_id: str) -> None:
+        """
+        加入（或修改）一道题的答案
+        
+        Args:
+            question_id: 问题ID
+            option_id: 选项ID
+        
+        Raises:
+            ValueError: 问题或选项不存在，或选项不属于该问题
+        """
+        compiled = self.evaluator._get_compiled_option(question_id, option_id)
+        
+        previous = self._answers.get(question_id)
+        if previous == option_id:
+            return
+        if previous is not None:
+            self._retract(question_id)
+        
+        self._answers[question_id] = option_id
+        self._compiled[question_id] = compiled
+        
+        support = self._support
+        for i, value in enumerate(compiled.support):
+            support[i] += value
+        
+        sums = self._dim_sums.get(compiled.dimension)
+        if sums is None:
+            sums = self._dim_sums[compiled.dimension] = [0.0, 0.0, 0.0, 0]
+        sums[0] += compiled.weight
+        sums[1] += compiled.center_level * compiled.weight
+        sums[2] += compiled.center_level
+        sums[3] += 1
+        
+        if compiled.hard_cap < self._hard_cap:
+            self._hard_cap = compiled.hard_cap
+    
+    def answer_many(self, answers: Dict[str, str]) -> None:
+        """
+        按顺序加入一组答案（例如一整个题目分层）
+        
+        Args:
+            answers: 答案字典
+        
+        Raises:
+            ValueError: 问题或选项不存在（此前已加入的答案保持不变）
+        """
+        for question_id, option_id in answers.items():
+            self.answer(question_id, option_id)
+    
+    def remove(self, question_id: str) -> None:
+        """
+        撤回一道题的答案
+        
+        Args:
+            question_id: 问题ID
+        
+        Raises:
+            KeyError: 该问题尚未作答
+        """
+        if question_id not in self._answers:
+            raise KeyError(question_id)
+        self._retract(question_id)
+    
+    def _retract(self, question_id: str) -> None:
+        """从累积状态中减去一道题的贡献"""
+        compiled = self._compiled.pop(question_id)
+        del self._answers[question_id]
+        
+        support = self._support
+        for i, value in enumerate(compiled.support):
+            support[i] -= value
+        
+        sums = self._dim_sums[compiled.dimension]
+        sums[3] -= 1
+        if sums[3] == 0:
+            del self._dim_sums[compiled.dimension]
+        else:
+            sums[0] -= compiled.weight
+            sums[1] -= compiled.center_level * compiled.weight
+            sums[2] -= compiled.center_level
+        
+        # 硬性上限取最小值，不可减；只有撤回的恰好是当前上限时才重新求最小值
+        if compiled.hard_cap == self._hard_cap:
+            self._hard_cap = min(
+                (c.hard_cap for c in self._compiled.values()), default=float('inf')
+            )
+    
+    def copy(self) -> "EvaluationSession":
+        """复制当前会话状态（用于在同一基础上分叉）"""
+        clone = EvaluationSession.__new__(EvaluationSession)
+        clone.evaluator = self.evaluator
+        clone._support = list(self._support)
+        clone._dim_sums = {dim: list(sums) for dim, sums in self._dim_sums.items()}
+        clone._hard_cap = self._hard_cap
+        clone._answers = dict(self._answers)
+        clone._compiled = dict(self._compiled)
+        return clone
+    
+    def _numbers(self):
+        """由当前累积状态计算数值结果"""
+        if not self._answers:
+            raise ValueError("答案格式错误或包含无效选项")
+        support = dict(zip(self.evaluator._levels, self._support))
+        return self.evaluator._finish_numbers(support, self._dim_sums, self._hard_cap)
+    
+    def current_level(self) -> float:
+        """
+        当前的最终等级（木桶效应调整后、未四舍五入），不生成评语
+        
+        Raises:
+            ValueError: 尚未作答任何问题
+        """
+        return self.snapshot(EvaluationDetail.LEVEL).total_level
+    
+    def level_bounds(self, remaining: Optional[Iterable[str]] = None) -> LevelBounds:
+        """
+        剩余问题所有可能作答下最终等级的上下界
+        
+        Args:
+            remaining: 剩余待答的问题ID，None 表示所有尚未作答的问题
+            
+        Returns:
+            等级上下界；decided 为 True 时剩余问题已无法改变展示等级
+        """
+        return level_bounds.compute_level_bounds(self, remaining)
+    
+    def snapshot(self, detail: EvaluationDetail = EvaluationDetail.FULL):
+        """
+        生成当前状态的评估结果
+        
+        Args:
+            detail: 结果详细程度，同 NTRPEvaluator.evaluate
+        
+        Returns:
+            当前答案的评估结果（只加入不修改答案时与 evaluator.evaluate 完全一致，
+            修改/撤回过答案时数值误差在浮点舍入范围内）
+        
+        Raises:
+            ValueError: 尚未作答任何问题
+        """
+        return self.evaluator._build_result(*self._numbers(), detail=detail)
@@ -0,0 +1,296 @@
+"""
+配置热更新
+
+questions.json、dimension_suggestions.json、tennis_knowledge.json、routing.json 和 scoring.json 修改后无需重启进程：
+- 后台线程监视配置目录：Linux 上用 inotify（通过 ctypes 调用 libc，无第三方依赖）在文件写入时立即唤醒，
+  其它平台或 inotify 不可用时按固定间隔轮询文件的 mtime 和大小；
+- 检测到变化后等待文件稳定（编辑器常分几次写入），按内容 SHA-256 判断是否真的改变；
+- 在后台线程里用新的 ConfigManager 加载全部文件，编译 NTRPEvaluator、路由策略和评分引擎注册表，
+  并对每个选项档位做一次完整评估作为冒烟校验；任何一步失败都保留旧快照并记录错误；
+- 构建完成后替换 current 引用（单次属性赋值，对读取方是原子的）。已经取到旧快照的请求继续用旧的
+  评估器、路由和引擎算完，新请求使用新快照，替换过程中没有停顿，也不会出现新旧配置混用的状态；
+  被替换快照的引擎注册表随后关闭影子线程池。
+
+用法:
+    watcher = ConfigWatcher(config_dir, on_reload=lambda snapshot: ...)
+    watcher.start()
+    snapshot = watcher.current          # 每个请求开始时取一次
+    result = snapshot.engines.evaluate(answers)
+"""
+
+import ctypes
+import ctypes.util
+import os
+import pathlib
+import select
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from config_manager import ConfigManager, content_digest
+from scoring_engines import build_registry
+from ntrp_evaluator import NTRPEvaluator
+from routing_policy import RoutingRunner, load_policies
+from data_models import ConfigSnapshot, EvaluationDetail
+
+# 被监视的配置文件
+WATCHED_FILES = ("questions.json", "dimension_suggestions.json", "tennis_knowledge.json", "routing.json", "scoring.json")
+
+# inotify 事件：写入完成、属性变化、移入/移出、创建、删除
+_IN_EVENTS = 0x00000008 | 0x00000004 | 0x00000040 | 0x00000080 | 0x00000100 | 0x00000200
+
+
+def config_digest(config_dir: pathlib.Path, files: Sequence[str] = WATCHED_FILES) -> str:
+    """被监视文件内容的 SHA-256（不存在的文件按缺失标记计入）"""
+    return content_digest(config_dir, files)
+
+
+def build_snapshot(
+    config_dir: Optional[pathlib.Path] = None,
+    version: int = 1,
+    files: Sequence[str] = WATCHED_FILES,
+    shadow_engines: Sequence[str] = (),
+) -> ConfigSnapshot:
+    """
+    加载、编译并校验一份配置
+    
+    Args:
+        config_dir: 配置目录
+        version: 快照序号
+        files: 计算内容摘要的文件
+        shadow_engines: 在 scoring.json 之外追加的影子引擎名
+    
+    Returns:
+        可直接服务请求的配置快照
+    
+    Raises:
+        FileNotFoundError / ValueError: 配置文件缺失、格式错误，评分引擎无法创建，或冒烟评估失败
+    """
+    config_manager = ConfigManager(config_dir)
+    digest = config_digest(config_manager.config_dir, files)
+    questions = config_manager.load_questions()
+    evaluator = NTRPEvaluator(questions, config_manager.load_suggestions(), config_manager)
+    config_manager.load_tennis_knowledge()
+    config_manager.get_answer_validator()
+    config_manager._build_suggestion_index()
+    policies, default_policy = load_policies(config_manager)
+    routing = RoutingRunner(evaluator, policies[default_policy])
+    engines = build_registry(config_manager, evaluator, shadow_engines)
+    
+    # 冒烟校验：每个选项档位作答全部问题，生成完整报告
+    for k in range(max(len(q.options) for q in questions)):
+        answers = {q.id: q.options[min(k, len(q.options) - 1)].id for q in questions}
+        evaluator.evaluate(answers, EvaluationDetail.FULL)
+    
+    return ConfigSnapshot(
+        version=version,
+        digest=digest,
+        config_manager=config_manager,
+        evaluator=evaluator,
+        routing=routing,
+        engines=engines,
+        loaded_at=time.time(),
+    )
+
+
+class _Inotify:
+    """配置目录的 inotify 监视（只用于及时唤醒，是否变化仍由文件状态判断）"""
+    
+    def __init__(self, directory: pathlib.Path) -> None:
+        """
+        Raises:
+            OSError: 平台不支持 inotify 或监视失败
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify 仅在 Linux 上可用")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), _IN_EVENTS) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"无法监视配置目录: {directory}")
+        self._fd = fd
+    
+    def wait(self, timeout: float) -> bool:
+        """等待事件，返回超时前是否有事件（读出并丢弃全部事件）"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+    
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class ConfigWatcher:
+    """监视配置目录，在后台构建新快照并原子替换"""
+    
+    def __init__(
+        self,
+        config_dir: Optional[pathlib.Path] = None,
+        snapshot: Optional[ConfigSnapshot] = None,
+        on_reload: Optional[Callable[[ConfigSnapshot], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        interval: float = 1.0,
+        settle: float = 0.2,
+        use_inotify: bool = True,
+        files: Sequence[str] = WATCHED_FILES,
+        shadow_engines: Sequence[str] = (),
+    ) -> None:
+        """
+        初始化监视器（不启动线程）
+        
+        Args:
+            config_dir: 配置目录
+            snapshot: 当前正在使用的快照，None 时立即构建
+            on_reload: 新快照替换后的回调（在监视线程中调用）
+            on_error: 新配置加载或校验失败时的回调
+            interval: 轮询间隔（秒）；使用 inotify 时为兜底检查的间隔
+            settle: 检测到变化后等待文件稳定的时间（秒）
+            use_inotify: 是否尝试使用 inotify
+            files: 被监视的文件名
+            shadow_engines: 构建快照时在 scoring.json 之外追加的影子引擎名
+        """
+        self.config_dir = ConfigManager(config_dir).config_dir
+        self.files = tuple(files)
+        self.on_reload = on_reload
+        self.on_error = on_error
+        self.interval = interval
+        self.settle = settle
+        self.use_inotify = use_inotify
+        self.shadow_engines = tuple(shadow_engines)
+        
+        self._snapshot = snapshot if snapshot is not None else build_snapshot(
+            self.config_dir, files=self.files, shadow_engines=self.shadow_engines
+        )
+        self._stats = self._file_stats()
+        self._rejected: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[Exception] = None
+        self.mode = "idle"
+    
+    @property
+    def current(self) -> ConfigSnapshot:
+        """当前快照（每个请求开始时取一次，整个请求内使用同一个快照）"""
+        return self._snapshot
+    
+    def _file_stats(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        stats: Dict[str, Optional[Tuple[int, int]]] = {}
+        for name in self.files:
+            try:
+                st = os.stat(self.config_dir / name)
+                stats[name] = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                stats[name] = None
+        return stats
+    
+    def check(self) -> bool:
+        """
+        检查一次配置是否变化，变化时构建并替换快照
+        
+        Returns:
+            是否替换了新快照
+        """
+        with self._lock:
+            stats = self._file_stats()
+            if stats == self._stats:
+                return False
+            
+            # 等待文件稳定：连续两次文件状态相同
+            while True:
+                if self._stop.wait(self.settle):
+                    return False
+                settled = self._file_stats()
+                if settled == stats:
+                    break
+                stats = settled
+            self._stats = stats
+            
+            digest = config_digest(self.config_dir, self.files)
+            if digest == self._snapshot.digest or digest == self._rejected:
+                return False
+            
+            try:
+                snapshot = build_snapshot(
+                    self.config_dir, self._snapshot.version + 1, self.files, self.shadow_engines
+                )
+            except Exception as e:
+                self._reject(digest, e)
+                return False
+            if snapshot.digest != digest or config_digest(self.config_dir, self.files) != digest:
+                # 构建期间文件又被修改：下一轮按新内容重建
+                snapshot.engines.shutdown(wait=False)
+                self._stats = {}
+                return False
+            
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._rejected = None
+            self.reloads += 1
+        
+        try:
+            if self.on_reload is not None:
+                self.on_reload(snapshot)
+        finally:
+            # 仍持有旧快照的请求照常用旧的主引擎算完，只是不再启动影子计算
+            previous.engines.shutdown(wait=False)
+        return True
+    
+    def _reject(self, digest: str, error: Exception) -> None:
+        self._rejected = digest
+        self.failures += 1
+        self.last_error = error
+        if self.on_error is not None:
+            self.on_error(error)
+    
+    def start(self) -> None:
+        """启动后台监视线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止后台监视线程（之后仍可手动调用 check）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._stop.clear()
+    
+    def _run(self) -> None:
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.config_dir)
+            except (OSError, AttributeError):
+                inotify = None
+        self.mode = "inotify" if inotify is not None else "polling"
+        try:
+            while not self._stop.is_set():
+                if inotify is not None:
+                    inotify.wait(self.interval)
+                elif self._stop.wait(self.interval):
+                    break
+                try:
+                    self.check()
+                except Exception as e:  # 监视线程不因单次检查出错而退出
+                    self.failures += 1
+                    self.last_error = e
+        finally:
+            if inotify is not None:
+                inotify.close()
+            self.mode = "idle"
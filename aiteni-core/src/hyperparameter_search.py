@@ -0,0 +1,369 @@
+"""
+评分常量的超参数搜索
+
+对 NTRPConstants 中手工选定的常量（LOCATOR_SIGMA、BASELINE_SIGMA、LOCATOR_BOOST、
+VARIANCE_LOW/HIGH、MAX_BARREL_PENALTY、COMPREHENSIVE_BONUS）以及评估器的 spread
+做网格或随机搜索，用带评级的选手数据给每组候选打分并排序：
+- 选手答案只编码一次（NTRPEvaluator.encode_answers），通过进程池的 initializer
+  交给每个工作进程一次，之后每个任务只传候选编号和常量取值；
+- 工作进程在临时覆盖 NTRPConstants 的上下文中重建评估器（选项支持度在构造时预编译），
+  再用 evaluate_many 整批评分；
+- 每完成一组候选就追加一行到 JSON Lines 检查点，中断后以同样参数重跑即可跳过已完成的候选。
+
+用法:
+    python hyperparameter_search.py players.json --samples 200 --checkpoint sweep.jsonl
+    python hyperparameter_search.py players.json --grid spread=0.8,1.0,1.2 --grid LOCATOR_BOOST=1.0,1.2,1.4
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import itertools
+import json
+import pathlib
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from calibration import LabeledPlayer, compute_metrics, load_labeled_players
+from config_manager import ConfigManager
+from data_models import CalibrationMetrics, HyperparameterTrial, NTRPConstants
+from ntrp_evaluator import NTRPEvaluator
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+# 默认搜索空间 {参数名: (下限, 上限)}；spread 是评估器参数，其余为 NTRPConstants 的属性
+DEFAULT_SPACE: Dict[str, Tuple[float, float]] = {
+    "spread": (0.6, 1.6),
+    "LOCATOR_SIGMA": (0.3, 0.8),
+    "BASELINE_SIGMA": (0.5, 1.5),
+    "LOCATOR_BOOST": (1.0, 1.5),
+    "VARIANCE_LOW": (0.05, 0.3),
+    "VARIANCE_HIGH": (0.6, 1.6),
+    "MAX_BARREL_PENALTY": (0.5, 1.5),
+    "COMPREHENSIVE_BONUS": (0.0, 0.5),
+}
+
+# 排序指标：{指标名: 是否越大越好}
+METRICS: Dict[str, bool] = {
+    "mae": False,
+    "rmse": False,
+    "exact_rate": True,
+    "within_half_rate": True,
+}
+
+DEFAULT_SPREAD = 1.0
+
+
+def current_params(names: Sequence[str]) -> Dict[str, float]:
+    """当前配置下各参数的取值"""
+    return {
+        name: DEFAULT_SPREAD if name == "spread" else float(getattr(NTRPConstants, name))
+        for name in names
+    }
+
+
+def is_valid(params: Dict[str, float]) -> bool:
+    """候选常量是否自洽（方差阈值有序、标准差为正）"""
+    low = params.get("VARIANCE_LOW", NTRPConstants.VARIANCE_LOW)
+    high = params.get("VARIANCE_HIGH", NTRPConstants.VARIANCE_HIGH)
+    if low >= high:
+        return False
+    return all(params.get(name, 1.0) > 0 for name in ("spread", "LOCATOR_SIGMA", "BASELINE_SIGMA"))
+
+
+def grid_candidates(grid: Dict[str, Sequence[float]]) -> List[Dict[str, float]]:
+    """
+    网格搜索的候选（笛卡尔积，剔除不自洽的组合）
+    
+    Raises:
+        ValueError: 参数名不在搜索空间中
+    """
+    _check_names(grid)
+    names = list(grid)
+    candidates = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = {name: float(value) for name, value in zip(names, values)}
+        if is_valid(params):
+            candidates.append(params)
+    return candidates
+
+
+def random_candidates(
+    space: Dict[str, Tuple[float, float]],
+    count: int,
+    seed: int = 0,
+    decimals: int = 3,
+) -> List[Dict[str, float]]:
+    """
+    随机搜索的候选（各参数在区间内均匀采样，剔除不自洽的组合）
+    
+    同样的 space / count / seed 总是生成同样的候选序列，断点续跑依赖这一点。
+    
+    Raises:
+        ValueError: 参数名不在搜索空间中
+    """
+    _check_names(space)
+    rng = random.Random(seed)
+    candidates = []
+    while len(candidates) < count:
+        params = {name: round(rng.uniform(low, high), decimals) for name, (low, high) in space.items()}
+        if is_valid(params):
+            candidates.append(params)
+    return candidates
+
+
+def _check_names(names) -> None:
+    unknown = [name for name in names if name not in DEFAULT_SPACE]
+    if unknown:
+        raise ValueError(f"未知的搜索参数: {', '.join(unknown)}")
+
+
+@contextlib.contextmanager
+def override_constants(params: Dict[str, float]) -> Iterator[None]:
+    """临时覆盖 NTRPConstants 的类属性（spread 除外），退出时恢复"""
+    names = [name for name in params if name != "spread"]
+    saved = {name: getattr(NTRPConstants, name) for name in names}
+    try:
+        for name in names:
+            setattr(NTRPConstants, name, params[name])
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(NTRPConstants, name, value)
+
+
+# =========================
+#  工作进程
+# =========================
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(config_dir: Optional[str], codes, ratings: List[float]) -> None:
+    config_manager = ConfigManager(pathlib.Path(config_dir) if config_dir else None)
+    _worker_state["config_manager"] = config_manager
+    _worker_state["questions"] = config_manager.load_questions()
+    _worker_state["suggestions"] = config_manager.load_suggestions()
+    _worker_state["codes"] = np.asarray(codes) if np is not None else codes
+    _worker_state["ratings"] = ratings
+
+
+def _evaluate_candidate(task: Tuple[int, Dict[str, float]]) -> HyperparameterTrial:
+    index, params = task
+    start = time.perf_counter()
+    with override_constants(params):
+        evaluator = NTRPEvaluator(
+            _worker_state["questions"],
+            _worker_state["suggestions"],
+            _worker_state["config_manager"],
+            spread=params.get("spread", DEFAULT_SPREAD),
+        )
+        result = evaluator.evaluate_many(_worker_state["codes"])
+    metrics = compute_metrics(result.total_level, result.rounded_level, _worker_state["ratings"])
+    return HyperparameterTrial(
+        index=index, params=params, metrics=metrics, seconds=time.perf_counter() - start
+    )
+
+
+# =========================
+#  检查点
+# =========================
+
+def load_checkpoint(path: pathlib.Path, candidates: List[Dict[str, float]]) -> Dict[int, HyperparameterTrial]:
+    """
+    读取检查点中已完成的候选
+    
+    中断时可能留下不完整的最后一行，这样的行会被忽略。
+    
+    Raises:
+        ValueError: 检查点中的候选与当前搜索不一致（搜索空间、种子或网格已改变）
+    """
+    path = pathlib.Path(path)
+    if not path.exists():
+        return {}
+    
+    done: Dict[int, HyperparameterTrial] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            index = record["index"]
+            if index >= len(candidates) or record["params"] != candidates[index]:
+                raise ValueError(f"检查点 {path} 与当前搜索空间不一致（候选 {index}）")
+            done[index] = HyperparameterTrial(
+                index=index,
+                params=record["params"],
+                metrics=CalibrationMetrics(**record["metrics"]),
+                seconds=record["seconds"],
+            )
+    return done
+
+
+def _open_checkpoint(path: pathlib.Path):
+    """以追加方式打开检查点；中断留下的半行先补上换行，使其单独成行（读取时被忽略）"""
+    path = pathlib.Path(path)
+    if path.exists() and path.stat().st_size > 0:
+        with open(path, "rb") as f:
+            f.seek(-1, 2)
+            complete = f.read(1) == b"\n"
+        if not complete:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n")
+    return open(path, "a", encoding="utf-8")
+
+
+def _append_checkpoint(f, trial: HyperparameterTrial) -> None:
+    f.write(json.dumps(dataclasses.asdict(trial), ensure_ascii=False) + "\n")
+    f.flush()
+
+
+# =========================
+#  搜索
+# =========================
+
+def run_search(
+    evaluator: NTRPEvaluator,
+    players: Sequence[LabeledPlayer],
+    candidates: List[Dict[str, float]],
+    workers: Optional[int] = None,
+    checkpoint: Optional[pathlib.Path] = None,
+    config_dir: Optional[pathlib.Path] = None,
+) -> List[HyperparameterTrial]:
+    """
+    在进程池中给每组候选常量打分
+    
+    Args:
+        evaluator: 当前配置的评估器（只用于编码答案）
+        players: [(答案字典, 真实评级), ...]
+        candidates: 候选常量列表（下标即候选编号）
+        workers: 工作进程数，None 表示 CPU 核数，0 表示在当前进程内顺序执行
+        checkpoint: JSON Lines 检查点路径，None 表示不写检查点
+        config_dir: 工作进程加载配置的目录
+    
+    Returns:
+        所有候选（含检查点中已完成的）的评分结果，按候选编号排列
+    
+    Raises:
+        ValueError: 答案无法编码（选项不属于所答问题），或检查点与当前搜索不一致
+    """
+    codes = evaluator.encode_answers([answers for answers, _ in players])
+    ratings = [rating for _, rating in players]
+    initargs = (str(config_dir) if config_dir else None, codes, ratings)
+    
+    done = load_checkpoint(checkpoint, candidates) if checkpoint else {}
+    tasks = [(i, params) for i, params in enumerate(candidates) if i not in done]
+    
+    with contextlib.ExitStack() as stack:
+        log = stack.enter_context(_open_checkpoint(checkpoint)) if checkpoint else None
+        if workers == 0:
+            _init_worker(*initargs)
+            results = map(_evaluate_candidate, tasks)
+        else:
+            pool = stack.enter_context(
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+            )
+            results = (future.result() for future in as_completed(
+                [pool.submit(_evaluate_candidate, task) for task in tasks]
+            ))
+        for trial in results:
+            done[trial.index] = trial
+            if log is not None:
+                _append_checkpoint(log, trial)
+    
+    return [done[i] for i in sorted(done)]
+
+
+def rank_trials(trials: Sequence[HyperparameterTrial], metric: str = "mae") -> List[HyperparameterTrial]:
+    """按指标排序（误差升序、命中率降序），同分按候选编号"""
+    if metric not in METRICS:
+        raise ValueError(f"未知的排序指标: {metric}")
+    sign = -1.0 if METRICS[metric] else 1.0
+    return sorted(trials, key=lambda t: (sign * getattr(t.metrics, metric), t.index))
+
+
+def format_table(
+    ranked: Sequence[HyperparameterTrial],
+    baseline: Optional[HyperparameterTrial] = None,
+    top: int = 10,
+) -> str:
+    """排名表；baseline 为当前配置的评分，附在表尾"""
+    if not ranked:
+        return "（没有候选）"
+    names = list(ranked[0].params)
+    header = f"{'排名':>4}{'编号':>6}" + "".join(f"{name:>{max(len(name), 6) + 2}}" for name in names)
+    header += f"{'MAE':>8}{'RMSE':>8}{'完全一致':>10}{'±0.5内':>9}"
+    
+    def row(rank: str, trial: HyperparameterTrial) -> str:
+        m = trial.metrics
+        line = f"{rank:>4}{trial.index:>6}" + "".join(
+            f"{trial.params[name]:>{max(len(name), 6) + 2}.3f}" for name in names
+        )
+        return line + f"{m.mae:>8.3f}{m.rmse:>8.3f}{m.exact_rate:>11.1%}{m.within_half_rate:>10.1%}"
+    
+    lines = [header]
+    lines.extend(row(str(rank), trial) for rank, trial in enumerate(ranked[:top], 1))
+    if baseline is not None:
+        lines.append(row("当前", baseline))
+    return "\n".join(lines)
+
+
+def _parse_grid(items: Sequence[str]) -> Dict[str, List[float]]:
+    grid: Dict[str, List[float]] = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        try:
+            grid[name.strip()] = [float(v) for v in values.split(",") if v.strip()]
+        except ValueError:
+            raise ValueError(f"网格参数格式错误: {item}（应为 NAME=v1,v2,...）")
+    return grid
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="用带评级的选手数据搜索评分常量")
+    parser.add_argument("players", type=pathlib.Path, help="选手数据（JSON 或 JSON Lines）")
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=v1,v2,...",
+                        help="网格搜索的参数取值（可重复）；不给出时做随机搜索")
+    parser.add_argument("--params", nargs="+", default=list(DEFAULT_SPACE), choices=list(DEFAULT_SPACE),
+                        help="随机搜索的参数（默认全部）")
+    parser.add_argument("--samples", type=int, default=100, help="随机搜索的候选数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（0 表示单进程）")
+    parser.add_argument("--checkpoint", type=pathlib.Path, default=None, help="JSON Lines 检查点（用于断点续跑）")
+    parser.add_argument("--metric", choices=list(METRICS), default="mae")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+    
+    config_manager = ConfigManager(args.config_dir)
+    evaluator = NTRPEvaluator(config_manager.load_questions(), config_manager.load_suggestions(), config_manager)
+    players = load_labeled_players(args.players)
+    
+    if args.grid:
+        grid = _parse_grid(args.grid)
+        candidates = grid_candidates(grid)
+        names = list(grid)
+    else:
+        names = args.params
+        candidates = random_candidates({name: DEFAULT_SPACE[name] for name in names}, args.samples, args.seed)
+    # 候选 0 固定为当前配置，便于对照
+    candidates.insert(0, current_params(names))
+    
+    start = time.perf_counter()
+    trials = run_search(evaluator, players, candidates, args.workers, args.checkpoint, args.config_dir)
+    seconds = time.perf_counter() - start
+    
+    print(f"{len(trials)} 组候选 × {len(players)} 名选手，耗时 {seconds:.2f} 秒\n")
+    print(format_table(rank_trials(trials, args.metric), baseline=trials[0], top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@
 提供命令行界面的交互逻辑。
 """
 
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import sys
 import random
 
@@ -38,17 +38,18 @@ class InteractiveUI:
         """
         print("\n请选择运行模式:")
         print("1. 🏃‍♂️ 交互式评估 (根据你的情况回答问题)")
-        print("2. 🎬 演示模式 (查看不同水平的评估示例)")
-        print("3. 🚪 退出")
+        print("2. 🎯 自适应评估 (按信息量挑选问题，通常只需一半题目)")
+        print("3. 🎬 演示模式 (查看不同水平的评估示例)")
+        print("4. 🚪 退出")
         
         while True:
             try:
-                choice = input("\n请选择 (1-3): ").strip()
+                choice = input("\n请选择 (1-4): ").strip()
                 
-                if choice in ["1", "2", "3"]:
+                if choice in ["1", "2", "3", "4"]:
                     return int(choice)
                 else:
-                    print("❌ 请输入 1、2 或 3")
+                    print("❌ 请输入 1、2、3 或 4")
                     
             except (ValueError, EOFError, KeyboardInterrupt):
                 print("\n❌ 输入无效，请重试")
@@ -84,15 +85,21 @@ class InteractiveUI:
             except (ValueError, EOFError, KeyboardInterrupt):
                 print("\n❌ 输入无效，请重试")
     
-    def collect_answers(self, questions: List[QuestionConfig]) -> Optional[Dict[str, str]]:
+    def collect_answers(
+        self,
+        questions: List[QuestionConfig],
+        on_answer: Optional[Callable[[str, str], bool]] = None,
+    ) -> Optional[Dict[str, str]]:
         """
         收集用户对所有问题的答案
         
         Args:
             questions: 问题配置列表
+            on_answer: 每答完一题后的回调 (问题ID, 选项ID) -> 是否提前结束；
+                返回 True 表示剩余问题已不会改变评估结果，不再继续提问
             
         Returns:
-            答案字典，如果用户取消则返回None
+            答案字典（提前结束时只包含已回答的问题），如果用户取消则返回None
         """
         print("\n开始评估，请根据您的实际情况选择最合适的答案")
         print("(输入 'q' 可以随时退出)")
@@ -105,45 +112,66 @@ class InteractiveUI:
         random.shuffle(display_questions)
         
         for i, question in enumerate(display_questions, 1):
-            print(f"\n【问题 {i}/{len(questions)}】")
-            print(f"📋 {question.text}")
-            print()
+            option_id = self.ask_question(question, i, len(questions))
+            if option_id is None:
+                return None
+            answers[question.id] = option_id
             
-            # 显示选项
-            for j, option in enumerate(question.options, 1):
-                print(f"   {j}. {option.text}")
-            
-            # 获取用户选择
-            while True:
-                try:
-                    user_input = input(f"\n请选择 (1-{len(question.options)}): ").strip()
-                    
-                    # 检查是否要退出
-                    if user_input.lower() == 'q':
-                        print("\n用户取消了评估")
-                        return None
-                    
-                    # 验证输入
-                    choice_num = int(user_input)
-                    if 1 <= choice_num <= len(question.options):
-                        selected_option = question.options[choice_num - 1]
-                        answers[question.id] = selected_option.id
-                        print(f"✅ 已选择: {selected_option.text}")
-                        break
-                    else:
-                        print(f"❌ 请输入 1 到 {len(question.options)} 之间的数字")
-                        
-                except ValueError:
-                    print("❌ 请输入有效的数字")
-                except (EOFError, KeyboardInterrupt):
-                    print("\n\n用户取消了评估")
-                    return None
+            if on_answer is not None and on_answer(question.id, answers[question.id]) and i < len(questions):
+                print(f"\n✅ 评估结果已确定，剩余 {len(questions) - i} 个问题不会再改变结果，无需继续作答")
+                print("正在分析您的答案...")
+                return answers
         
         print(f"\n✅ 已完成所有 {len(questions)} 个问题的回答")
         print("正在分析您的答案...")
         
         return answers
     
+    def ask_question(self, question: QuestionConfig, number: int, total: int) -> Optional[str]:
+        """
+        展示一道问题并获取用户选择
+        
+        Args:
+            question: 问题配置
+            number: 问题序号
+            total: 问题总数（自适应模式下为最多题数）
+            
+        Returns:
+            选中的选项ID，如果用户取消则返回None
+        """
+        print(f"\n【问题 {number}/{total}】")
+        print(f"📋 {question.text}")
+        print()
+        
+        # 显示选项
+        for j, option in enumerate(question.options, 1):
+            print(f"   {j}. {option.text}")
+        
+        # 获取用户选择
+        while True:
+            try:
+                user_input = input(f"\n请选择 (1-{len(question.options)}): ").strip()
+                
+                # 检查是否要退出
+                if user_input.lower() == 'q':
+                    print("\n用户取消了评估")
+                    return None
+                
+                # 验证输入
+                choice_num = int(user_input)
+                if 1 <= choice_num <= len(question.options):
+                    selected_option = question.options[choice_num - 1]
+                    print(f"✅ 已选择: {selected_option.text}")
+                    return selected_option.id
+                else:
+                    print(f"❌ 请输入 1 到 {len(question.options)} 之间的数字")
+                    
+            except ValueError:
+                print("❌ 请输入有效的数字")
+            except (EOFError, KeyboardInterrupt):
+                print("\n\n用户取消了评估")
+                return None
+    
     def confirm_continue(self, message: str = "按回车键继续...") -> None:
         """
         等待用户确认继续
@@ -0,0 +1,584 @@
+"""
+评分不变量的随机性质检查
+
+对 NTRPEvaluator 抽样大量随机答案（每题均匀选择，按比例留空），检查评分规则依赖的性质：
+- monotonic：把某题改选为 center_level 更高的选项，最终等级（total_level）不应下降；
+- hard_cap：最终等级不应超过所答选项的最小硬性上限；
+- barrel_penalty：木桶效应的下调量（base_level - barrel_adjusted_level）不超过 MAX_BARREL_PENALTY。
+答案以整数编码矩阵分块生成，在进程池中用 evaluate_many 批量评分；单调性对每行随机改选一道
+可以升档的题，与原答案成对评估。每个不变量保留违反幅度最大的样本，贪心删除其它作答，
+直到删去任一题都不再违反，再用 NTRPEvaluator.evaluate 复算反例的数值。
+
+每次违反归入一个签名：单调性为"题:原选项>新选项"，硬性上限为起作用（上限最低）的选项ID，
+木桶效应只有一个签名。当前配置已知的违反签名及其最大违反幅度，连同生成时的抽样参数，记录在基线文件
+（config/invariant_baseline.json）中；指定基线时，签名不在基线中、或幅度超过基线 BASELINE_MARGIN 以上的
+违反才算作新的违反，反例也只从新的违反中选取。随机答案只取决于种子、留空率、分块大小和各题选项数，
+检查默认沿用基线的抽样参数：样本数不超过基线时正好是基线样本的前缀，未修改的配置一定通过；
+余量用于吸收选项数变化（样本随之改变）时最大幅度的抽样波动。
+有（新的）违反时命令行返回 1，可作为 questions.json 修改的检查关卡。需要 NumPy。
+
+用法:
+    python invariant_checker.py --samples 1000000
+    python invariant_checker.py --config-dir /tmp/new_config --baseline ../config/invariant_baseline.json
+    python invariant_checker.py --write-baseline ../config/invariant_baseline.json
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config_manager import ConfigManager
+from ntrp_evaluator import NTRPEvaluator
+from data_models import (
+    EvaluationDetail, InvariantCounterexample, InvariantReport, InvariantResult, NTRPConstants
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+INVARIANTS = ("monotonic", "hard_cap", "barrel_penalty")
+# 批量路径与逐条 evaluate 的浮点累加顺序不同，比较时留出余量
+TOLERANCE = 1e-9
+# 基线签名允许的幅度余量：不同样本下同一签名的最大幅度相差约 0.15 以内
+BASELINE_MARGIN = 0.25
+# 没有基线时的默认抽样参数
+DEFAULT_SAMPLING = {"seed": 0, "skip_rate": 0.2, "chunk_size": 50_000}
+
+
+class _Tables:
+    """问卷的选项表：各题选项的硬性上限、每个选项可以升档到的选项，以及违反签名的编号"""
+    
+    def __init__(self, evaluator: NTRPEvaluator) -> None:
+        self.evaluator = evaluator
+        self.questions = evaluator.questions
+        self.caps = [
+            np.array([o.hard_cap if o.hard_cap is not None else np.inf for o in q.options])
+            for q in self.questions
+        ]
+        # 签名编号：单调性 (题×width + 原选项)×width + 新选项，硬性上限 题×width + 选项，木桶效应 0
+        self.width = max([len(q.options) for q in self.questions] or [1])
+        self.signature_names: Dict[str, Dict[int, str]] = {
+            "monotonic": {}, "hard_cap": {}, "barrel_penalty": {0: "barrel_penalty"},
+        }
+        # upgrades[j][k] = center_level 高于选项 k 的选项下标，补齐为方阵；counts[j][k] 为个数
+        self.upgrades = []
+        self.upgrade_counts = []
+        for j, q in enumerate(self.questions):
+            size = len(q.options)
+            table = np.zeros((size, max(size, 1)), dtype=np.int64)
+            counts = np.zeros(size, dtype=np.int64)
+            for k, option in enumerate(q.options):
+                higher = [i for i, other in enumerate(q.options) if other.center_level > option.center_level]
+                table[k, :len(higher)] = higher
+                counts[k] = len(higher)
+                for i in higher:
+                    key = (j * self.width + k) * self.width + i
+                    self.signature_names["monotonic"][key] = f"{q.id}:{option.id}>{q.options[i].id}"
+                if option.hard_cap is not None:
+                    self.signature_names["hard_cap"][j * self.width + k] = option.id
+            self.upgrades.append(table)
+            self.upgrade_counts.append(counts)
+        self.signature_keys = {
+            name: {text: key for key, text in names.items()} for name, names in self.signature_names.items()
+        }
+    
+    def signatures(self, invariant: str, codes, questions=None, options=None):
+        """每行的违反签名编号（只对违反的行有意义）"""
+        rows = np.arange(len(codes))
+        if invariant == "monotonic":
+            return (questions * self.width + codes[rows, questions]) * self.width + options
+        if invariant == "hard_cap":
+            caps = np.full(codes.shape, np.inf)
+            for j, table in enumerate(self.caps):
+                answered = codes[:, j] >= 0
+                caps[answered, j] = table[codes[answered, j]]
+            binding = caps.argmin(axis=1)
+            return binding * self.width + codes[rows, binding]
+        return np.zeros(len(codes), dtype=np.int64)
+    
+    def known_limits(self, invariant: str, baseline: Dict[str, Dict[str, float]]):
+        """
+        基线中该不变量的 (按编号排序的签名编号, 对应的最大违反幅度)（本问卷中已不存在的签名被忽略）
+        """
+        keys = self.signature_keys[invariant]
+        known = sorted((keys[name], limit) for name, limit in baseline.get(invariant, {}).items() if name in keys)
+        return (
+            np.array([key for key, _ in known], dtype=np.int64),
+            np.array([limit for _, limit in known], dtype=float),
+        )
+    
+    def hard_cap(self, codes):
+        cap = np.full(len(codes), np.inf)
+        for j, caps in enumerate(self.caps):
+            answered = codes[:, j] >= 0
+            cap[answered] = np.minimum(cap[answered], caps[codes[answered, j]])
+        return cap
+    
+    def sample_upgrades(self, codes, rng):
+        """
+        每行随机选一道可以升档的已答题，并随机选一个 center_level 更高的选项
+        
+        Returns:
+            (行下标, 题目下标, 新选项下标)，没有可升档题的行不出现
+        """
+        n = len(codes)
+        keys = np.full(codes.shape, -1.0)
+        for j, counts in enumerate(self.upgrade_counts):
+            answered = codes[:, j] >= 0
+            can = np.zeros(n, dtype=bool)
+            can[answered] = counts[codes[answered, j]] > 0
+            keys[can, j] = rng.random(int(can.sum()))
+        rows = np.flatnonzero(keys.max(axis=1) >= 0)
+        questions = keys[rows].argmax(axis=1)
+        options = np.empty(len(rows), dtype=np.int64)
+        for j in np.unique(questions).tolist():
+            mask = questions == j
+            current = codes[rows[mask], j]
+            picks = (rng.random(int(mask.sum())) * self.upgrade_counts[j][current]).astype(np.int64)
+            options[mask] = self.upgrades[j][current, picks]
+        return rows, questions, options
+
+
+def _new_violations(tables: _Tables, invariant: str, known, codes, questions, options, magnitude, violated):
+    """
+    违反中签名不在基线里、或幅度超过基线的部分
+    
+    Returns:
+        (新违反掩码, 违反行的签名编号)
+    """
+    rows = np.flatnonzero(violated)
+    keys = tables.signatures(
+        invariant, codes[rows], None if questions is None else questions[rows], None if options is None else options[rows]
+    )
+    known_keys, limits = known
+    if not len(known_keys):
+        return violated, keys
+    index = np.minimum(np.searchsorted(known_keys, keys), len(known_keys) - 1)
+    allowed = (known_keys[index] == keys) & (magnitude[rows] <= limits[index] + TOLERANCE)
+    new = violated.copy()
+    new[rows[allowed]] = False
+    return new, keys
+
+
+def _measure(tables: _Tables, invariant: str, codes, questions=None, options=None, result=None):
+    """
+    批量计算不变量两侧的值
+    
+    Args:
+        result: codes 已有的 evaluate_many 结果（None 时在这里计算）
+    
+    Returns:
+        (实际值, 界, 违反掩码)；单调性时 questions/options 为每行改选的题和新选项
+    """
+    if result is None:
+        result = tables.evaluator.evaluate_many(codes)
+    if invariant == "hard_cap":
+        observed, bound = result.total_level, tables.hard_cap(codes)
+        return observed, bound, observed > bound + TOLERANCE
+    if invariant == "barrel_penalty":
+        observed = result.base_level - result.barrel_adjusted_level
+        bound = np.full(len(codes), NTRPConstants.MAX_BARREL_PENALTY)
+        return observed, bound, observed > bound + TOLERANCE
+    upgraded = codes.copy()
+    upgraded[np.arange(len(codes)), questions] = options
+    observed, bound = tables.evaluator.evaluate_many(upgraded).total_level, result.total_level
+    return observed, bound, observed < bound - TOLERANCE
+
+
+def _select(result, rows):
+    """只保留 _measure 用到的字段的指定行"""
+    return SimpleNamespace(
+        total_level=result.total_level[rows],
+        base_level=result.base_level[rows],
+        barrel_adjusted_level=result.barrel_adjusted_level[rows],
+    )
+
+
+def check_codes(
+    tables: _Tables, codes, rng, invariants: Sequence[str], baseline: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    检查一块答案编码
+    
+    Args:
+        baseline: {不变量: {签名: 允许的最大违反幅度}}
+    
+    Returns:
+        {"rows", "evaluations", "results": {不变量: (检查数, 违反数, 新违反数, 最坏样本或 None,
+        {签名: 最大违反幅度}, 有新违反的签名集合)}}
+        最坏样本为新的违反中幅度最大的 (违反幅度, 编码, 题目下标, 新选项下标)
+    """
+    baseline = baseline or {}
+    results: Dict[str, Tuple[int, int, int, Optional[tuple], Dict[str, float], set]] = {}
+    # 原答案只评估一次，各不变量共用
+    base = tables.evaluator.evaluate_many(codes) if len(codes) else None
+    evaluations = len(codes)
+    for invariant in invariants:
+        questions = options = None
+        sample, result = codes, base
+        if invariant == "monotonic":
+            rows, questions, options = tables.sample_upgrades(codes, rng)
+            sample = codes[rows]
+            result = _select(base, rows) if len(rows) else None
+            evaluations += len(rows)
+        if not len(sample):
+            results[invariant] = (0, 0, 0, None, {}, set())
+            continue
+        observed, bound, violated = _measure(tables, invariant, sample, questions, options, result)
+        magnitude = np.abs(observed - bound)
+        new = violated
+        signatures: Dict[str, float] = {}
+        new_signatures = set()
+        if violated.any():
+            known = tables.known_limits(invariant, baseline)
+            new, keys = _new_violations(tables, invariant, known, sample, questions, options, magnitude, violated)
+            names = tables.signature_names[invariant]
+            peaks = magnitude[violated]
+            for key in np.unique(keys):
+                signatures[names[int(key)]] = float(peaks[keys == key].max())
+            new_signatures = {names[int(key)] for key in np.unique(tables.signatures(
+                invariant, sample[new],
+                None if questions is None else questions[new], None if options is None else options[new],
+            ))}
+        worst = None
+        if new.any():
+            magnitude = np.where(new, magnitude, -1.0)
+            i = int(magnitude.argmax())
+            worst = (
+                float(magnitude[i]),
+                sample[i].tolist(),
+                None if questions is None else int(questions[i]),
+                None if options is None else int(options[i]),
+            )
+        results[invariant] = (len(sample), int(violated.sum()), int(new.sum()), worst, signatures, new_signatures)
+    return {"rows": len(codes), "evaluations": evaluations, "results": results}
+
+
+def random_codes(tables: _Tables, count: int, rng, skip_rate: float):
+    """每题均匀随机作答，按 skip_rate 留空（全部留空的行会被去掉）"""
+    codes = np.stack([rng.integers(0, len(q.options), count) for q in tables.questions], axis=1)
+    codes[rng.random(codes.shape) < skip_rate] = -1
+    return codes[(codes >= 0).any(axis=1)]
+
+
+# =========================
+#  反例缩减
+# =========================
+
+def shrink(tables: _Tables, invariant: str, codes: List[int], question=None, option=None, known=None) -> List[int]:
+    """
+    贪心删除作答，直到删去任何一题（单调性时改选的题除外）都不再违反
+    
+    Args:
+        known: tables.known_limits 的结果；删去作答后只剩基线内的违反视为不再违反
+    
+    Returns:
+        缩减后的答案编码
+    """
+    current = list(codes)
+    while True:
+        removable = [j for j, c in enumerate(current) if c >= 0 and j != question]
+        if not removable or (question is None and len(removable) == 1):
+            return current
+        trials = np.array([current] * len(removable), dtype=np.int64)
+        trials[np.arange(len(removable)), removable] = -1
+        repeat = None if question is None else np.full(len(removable), question)
+        chosen = None if option is None else np.full(len(removable), option)
+        observed, bound, violated = _measure(tables, invariant, trials, repeat, chosen)
+        if known is not None and violated.any():
+            violated, _ = _new_violations(
+                tables, invariant, known, trials, repeat, chosen, np.abs(observed - bound), violated
+            )
+        hits = np.flatnonzero(violated)
+        if not len(hits):
+            return current
+        current = trials[hits[0]].tolist()
+
+
+def counterexample(
+    tables: _Tables, invariant: str, codes: List[int], question=None, option=None, known=None
+) -> InvariantCounterexample:
+    """缩减反例（有基线时保持为新的违反），并用 NTRPEvaluator.evaluate 复算"""
+    evaluator = tables.evaluator
+    codes = shrink(tables, invariant, codes, question, option, known)
+    answers = evaluator.decode_answers(codes)
+    result = evaluator.evaluate(answers, EvaluationDetail.SCORES)
+    if invariant == "hard_cap":
+        return InvariantCounterexample(
+            invariant, answers, result.total_level, float(tables.hard_cap(np.array([codes]))[0])
+        )
+    if invariant == "barrel_penalty":
+        return InvariantCounterexample(
+            invariant, answers, result.base_level - result.barrel_adjusted_level,
+            NTRPConstants.MAX_BARREL_PENALTY,
+        )
+    q = evaluator.questions[question]
+    upgraded = dict(answers)
+    upgraded[q.id] = q.options[option].id
+    return InvariantCounterexample(
+        invariant,
+        answers,
+        evaluator.evaluate(upgraded, EvaluationDetail.LEVEL).total_level,
+        result.total_level,
+        question_id=q.id,
+        from_option=answers[q.id],
+        to_option=q.options[option].id,
+    )
+
+
+# =========================
+#  基线
+# =========================
+
+def load_baseline(path: pathlib.Path) -> Dict[str, Any]:
+    """
+    读取基线文件
+    
+    Returns:
+        {"sampling": {"seed", "skip_rate", "chunk_size", "samples"}, "violations": {不变量: {违反签名: 最大违反幅度}}}
+    
+    Raises:
+        ValueError: 文件格式错误或包含未知的不变量
+    """
+    try:
+        data = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"无法读取不变量基线 {path}: {e}") from e
+    sampling = data.get("sampling") if isinstance(data, dict) else None
+    violations = data.get("violations") if isinstance(data, dict) else None
+    if not isinstance(sampling, dict) or not all(key in sampling for key in DEFAULT_SAMPLING):
+        raise ValueError(f"不变量基线 {path} 缺少抽样参数 sampling（{', '.join(DEFAULT_SAMPLING)}）")
+    if not isinstance(violations, dict) or not all(
+        isinstance(limits, dict)
+        and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in limits.values())
+        for limits in violations.values()
+    ):
+        raise ValueError(f"不变量基线 {path} 的 violations 必须是 {{不变量: {{签名: 最大违反幅度}}}} 的对象")
+    unknown = [name for name in violations if name not in INVARIANTS]
+    if unknown:
+        raise ValueError(f"不变量基线 {path} 包含未知的不变量: {', '.join(unknown)}")
+    return data
+
+
+def write_baseline(report: InvariantReport, path: pathlib.Path) -> None:
+    """把报告的抽样参数、全部违反签名及其最大违反幅度写成基线文件"""
+    data = {
+        "sampling": dict(report.sampling, samples=report.rows),
+        "violations": {name: result.signatures for name, result in report.results.items()},
+    }
+    pathlib.Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+# =========================
+#  主流程
+# =========================
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _build_tables(config_dir: Optional[pathlib.Path]) -> _Tables:
+    config_manager = ConfigManager(config_dir)
+    return _Tables(NTRPEvaluator(
+        config_manager.load_questions(), config_manager.load_suggestions(), config_manager
+    ))
+
+
+def _init_worker(config_dir: Optional[pathlib.Path]) -> None:
+    _worker_state["tables"] = _build_tables(config_dir)
+
+
+def _check_chunk(task: Tuple[int, int, float, Tuple[str, ...], Dict[str, Dict[str, float]]]) -> Dict[str, Any]:
+    count, seed, skip_rate, invariants, baseline = task
+    tables = _worker_state["tables"]
+    rng = np.random.default_rng(seed)
+    return check_codes(tables, random_codes(tables, count, rng, skip_rate), rng, invariants, baseline)
+
+
+def run_check(
+    config_dir: Optional[pathlib.Path] = None,
+    samples: int = 1_000_000,
+    invariants: Sequence[str] = INVARIANTS,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    skip_rate: Optional[float] = None,
+    chunk_size: Optional[int] = None,
+    baseline: Optional[pathlib.Path] = None,
+    margin: float = BASELINE_MARGIN,
+) -> InvariantReport:
+    """
+    在进程池中检查不变量
+    
+    Args:
+        config_dir: 配置目录，None 表示默认配置
+        samples: 随机答案数
+        invariants: 要检查的不变量（见 INVARIANTS）
+        workers: 工作进程数，0 表示在当前进程内执行
+        seed: 随机种子（同样的参数得到同样的报告）
+        skip_rate: 每题留空的概率
+        chunk_size: 每个任务的行数
+            （这三项为 None 时沿用基线的抽样参数，没有基线时使用 DEFAULT_SAMPLING）
+        baseline: 基线文件（见 load_baseline），签名在基线中且幅度不超过基线 margin 以上的违反不算作新的违反
+        margin: 基线幅度的余量
+    
+    Raises:
+        ValueError: 未安装 NumPy、不变量名未知或基线文件格式错误
+    """
+    if np is None:
+        raise ValueError("未安装 NumPy，无法运行不变量检查")
+    invariants = tuple(invariants)
+    unknown = [name for name in invariants if name not in INVARIANTS]
+    if unknown:
+        raise ValueError(f"未知的不变量: {', '.join(unknown)}（可选: {', '.join(INVARIANTS)}）")
+    sampling = dict(DEFAULT_SAMPLING)
+    known: Dict[str, Dict[str, float]] = {}
+    if baseline is not None:
+        data = load_baseline(baseline)
+        sampling.update((key, data["sampling"][key]) for key in DEFAULT_SAMPLING)
+        known = {
+            name: {signature: peak + margin for signature, peak in limits.items()}
+            for name, limits in data["violations"].items()
+        }
+    for key, value in (("seed", seed), ("skip_rate", skip_rate), ("chunk_size", chunk_size)):
+        if value is not None:
+            sampling[key] = value
+    seed, skip_rate, chunk_size = sampling["seed"], sampling["skip_rate"], sampling["chunk_size"]
+    
+    start = time.perf_counter()
+    tasks = []
+    remaining = samples
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        tasks.append((count, seed * 1_000_003 + len(tasks), skip_rate, invariants, known))
+        remaining -= count
+    
+    rows = evaluations = 0
+    totals: Dict[str, List[Any]] = {name: [0, 0, 0, None, {}, set()] for name in invariants}
+    
+    def merge(part: Dict[str, Any]) -> None:
+        nonlocal rows, evaluations
+        rows += part["rows"]
+        evaluations += part["evaluations"]
+        for name, (checked, violations, new, worst, signatures, new_signatures) in part["results"].items():
+            total = totals[name]
+            total[0] += checked
+            total[1] += violations
+            total[2] += new
+            if worst is not None and (total[3] is None or worst[0] > total[3][0]):
+                total[3] = worst
+            for signature, peak in signatures.items():
+                total[4][signature] = max(total[4].get(signature, 0.0), peak)
+            total[5] |= new_signatures
+    
+    if workers == 0:
+        _init_worker(config_dir)
+        for task in tasks:
+            merge(_check_chunk(task))
+        tables = _worker_state["tables"]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(config_dir,)
+        ) as pool:
+            for part in pool.map(_check_chunk, tasks):
+                merge(part)
+        tables = _build_tables(config_dir)
+    
+    results: Dict[str, InvariantResult] = {}
+    for name, (checked, violations, new, worst, signatures, new_signatures) in totals.items():
+        example = None
+        if worst is not None:
+            _, codes, question, option = worst
+            limits = tables.known_limits(name, known) if known else None
+            example = counterexample(tables, name, codes, question, option, limits)
+        results[name] = InvariantResult(
+            name, checked, violations, example,
+            new_violations=new,
+            signatures=dict(sorted(signatures.items())),
+            new_signatures=sorted(new_signatures),
+        )
+    
+    return InvariantReport(
+        config_dir=str(tables.evaluator.config_manager.config_dir),
+        rows=rows,
+        evaluations=evaluations,
+        seconds=time.perf_counter() - start,
+        results=results,
+        baseline=None if baseline is None else str(baseline),
+        sampling=sampling,
+    )
+
+
+def format_report(report: InvariantReport) -> str:
+    """检查报告的文本形式"""
+    lines = [
+        f"{report.config_dir}：{report.rows} 份随机答案，{report.evaluations} 次评估，"
+        f"耗时 {report.seconds:.1f} 秒（{report.evaluations / max(report.seconds, 1e-9):,.0f} 次/秒）",
+        "",
+    ]
+    if report.baseline is not None:
+        lines.insert(1, f"基线：{report.baseline}（签名不在基线中或幅度超过基线余量的违反算作新的违反）")
+    for result in report.results.values():
+        status = "通过" if result.violations == 0 else f"违反 {result.violations} 次"
+        rate = result.violations / max(result.checked, 1)
+        lines.append(f"{result.invariant:<16}{result.checked:>10} 个样本  {status}（{rate:.2%}）")
+        if report.baseline is not None and result.violations:
+            lines.append(
+                f"    基线之外 {result.new_violations} 次，涉及 {len(result.new_signatures)} 个签名"
+                + (f"：{', '.join(result.new_signatures[:10])}" if result.new_signatures else "")
+            )
+        example = result.example
+        if example is None:
+            continue
+        answers = " ".join(f"{qid}={oid}" for qid, oid in example.answers.items())
+        if example.invariant == "monotonic":
+            lines.append(
+                f"    {example.question_id}: {example.from_option} → {example.to_option}，"
+                f"等级 {example.bound:.3f} → {example.observed:.3f}"
+            )
+        elif example.invariant == "hard_cap":
+            lines.append(f"    等级 {example.observed:.3f} 超过硬性上限 {example.bound:.1f}")
+        else:
+            lines.append(f"    下调 {example.observed:.3f} 超过 {example.bound:.2f}")
+        lines.append(f"    最小反例：{answers}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="随机检查评分规则的不变量，有违反时返回 1")
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--check", default=",".join(INVARIANTS), help=f"逗号分隔的不变量（{', '.join(INVARIANTS)}）")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（0 表示单进程）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子（默认沿用基线，没有基线时为 0）")
+    parser.add_argument("--skip-rate", type=float, default=None, help="每题留空的概率（默认沿用基线，没有基线时为 0.2）")
+    parser.add_argument("--chunk-size", type=int, default=None, help="每个任务的行数（默认沿用基线，没有基线时为 50000）")
+    parser.add_argument("--baseline", type=pathlib.Path, default=None, help="基线文件，只在出现基线之外的违反时返回 1")
+    parser.add_argument("--write-baseline", type=pathlib.Path, default=None, help="把本次的违反签名及最大幅度写成基线文件")
+    args = parser.parse_args(argv)
+    
+    report = run_check(
+        args.config_dir,
+        args.samples,
+        [name.strip() for name in args.check.split(",") if name.strip()],
+        args.workers,
+        args.seed,
+        args.skip_rate,
+        args.chunk_size,
+        args.baseline,
+    )
+    print(format_report(report))
+    if args.write_baseline is not None:
+        write_baseline(report, args.write_baseline)
+        print(f"\n已写入基线: {args.write_baseline}")
+        return 0
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,645 @@
+"""
+分级反应（graded response）IRT 评分模型
+
+与 NTRPEvaluator 共用 questions.json：每道题的选项按 center_level 排成有序类别，
+题目 j 有区分度 a_j 和递增阈值 b_j1 < ... < b_j(K-1)（与 NTRP 等级同一刻度），
+    P(类别 >= k | θ) = 1 / (1 + exp(-a_j (θ - b_jk)))
+相邻两项之差即选到第 k 个类别的概率。区分度越高，选项对能力的区分越陡峭。
+
+- 评分：能力 θ 离散在 LEVELS 首尾之间的等距网格上，每个选项的似然向量在构建时算好，
+  一次评估只是若干向量逐元素相乘，再与正态先验合成后验取期望（EAP）；
+  维度分数是只用该维度题目得到的 EAP，硬性上限规则与 NTRPEvaluator 相同；
+- 拟合：Bock–Aitkin 边际极大似然 EM。E 步对全部作答记录一次算出网格后验（NumPy 向量化），
+  M 步用期望类别计数逐题做带回溯的梯度上升；区分度带对数正态先验、阈值带以初值为中心的正态先验，
+  使 θ 保持在 NTRP 等级刻度上；
+- 初始参数由配置推出（阈值取相邻 center_level 的中点，区分度与题目权重成正比），
+  只用于影子比对；作为主引擎（scoring.json 的 primary_engine）时必须提供拟合参数文件。
+
+用法：
+    python irt_engine.py history.json -o irt_parameters.json
+"""
+
+import argparse
+import json
+import math
+import pathlib
+import sys
+import time
+from operator import mul
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+from data_models import IRTFitReport, NTRPConstants, QuestionConfig
+
+# 能力网格步长
+GRID_STEP = 0.1
+# 能力先验（正态）
+PRIOR_MEAN = 3.5
+PRIOR_SD = 1.25
+# 权重为 1 的题目的初始区分度
+DEFAULT_DISCRIMINATION = 1.7
+# 初始阈值之间的最小间隔（center_level 相同的选项）
+MIN_THRESHOLD_GAP = 0.05
+# 拟合时参数先验的标准差：log(区分度) 与阈值
+DISCRIMINATION_PRIOR_SD = 0.5
+THRESHOLD_PRIOR_SD = 0.5
+# 类别概率下限，避免 log(0)
+PROBABILITY_FLOOR = 1e-9
+# 参数文件格式版本
+PARAMETERS_VERSION = 1
+
+class _Entry(NamedTuple):
+    """选项在网格上的预编译数据"""
+    row: int                                      # 在对数似然矩阵中的行号（题目顺序 × 选项配置顺序）
+    dim: int                                      # 维度下标
+    log_likelihood: Tuple[float, ...]             # 对数似然（批量评分和拟合使用）
+    likelihood: Tuple[float, ...]                 # 似然，缩放到峰值为 1
+    weighted: Tuple[float, ...]                   # 先验 × 似然，缩放到峰值为 1
+    mean: float                                   # 只答这一题时的后验期望
+    hard_cap: float                               # 硬性上限（无上限为 inf）
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def category_order(question: QuestionConfig) -> List[int]:
+    """题目选项按 center_level 排序后的下标（同分保持配置顺序）"""
+    return sorted(range(len(question.options)), key=lambda k: question.options[k].center_level)
+
+
+def initial_parameters(question: QuestionConfig) -> Tuple[float, List[float]]:
+    """
+    由配置推出初始参数
+    
+    Returns:
+        (区分度, 阈值列表)：阈值为相邻类别 center_level 的中点
+    """
+    centers = [question.options[k].center_level for k in category_order(question)]
+    thresholds: List[float] = []
+    for low, high in zip(centers, centers[1:]):
+        value = (low + high) / 2
+        if thresholds and value < thresholds[-1] + MIN_THRESHOLD_GAP:
+            value = thresholds[-1] + MIN_THRESHOLD_GAP
+        thresholds.append(value)
+    return DEFAULT_DISCRIMINATION * question.weight, thresholds
+
+
+def category_probabilities(
+    discrimination: float,
+    thresholds: Sequence[float],
+    grid: Sequence[float],
+) -> List[List[float]]:
+    """
+    各类别在能力网格上的概率（纯 Python）
+    
+    Returns:
+        [类别][网格点] 概率，类别按 center_level 从低到高
+    """
+    probabilities: List[List[float]] = [[] for _ in range(len(thresholds) + 1)]
+    for theta in grid:
+        upper = 1.0
+        for k, threshold in enumerate(thresholds):
+            lower = _sigmoid(discrimination * (theta - threshold))
+            probabilities[k].append(upper - lower)
+            upper = lower
+        probabilities[-1].append(upper)
+    return probabilities
+
+
+class IRTModel:
+    """分级反应模型：参数、预编译的对数似然表和 EM 拟合"""
+    
+    def __init__(
+        self,
+        questions: Sequence[QuestionConfig],
+        discrimination: Optional[Dict[str, float]] = None,
+        thresholds: Optional[Dict[str, Sequence[float]]] = None,
+        prior_mean: float = PRIOR_MEAN,
+        prior_sd: float = PRIOR_SD,
+        grid_step: float = GRID_STEP,
+    ) -> None:
+        """
+        Args:
+            questions: 问题配置列表（列顺序与 NTRPEvaluator.questions 一致）
+            discrimination: {问题ID: 区分度}，缺省的题目使用初始参数
+            thresholds: {问题ID: 递增阈值}，长度为选项数 - 1
+            prior_mean: 能力先验均值
+            prior_sd: 能力先验标准差
+            grid_step: 能力网格步长
+        
+        Raises:
+            ValueError: 参数个数不符、阈值不递增或区分度不为正
+        """
+        if prior_sd <= 0 or grid_step <= 0:
+            raise ValueError("先验标准差和网格步长必须为正")
+        self.questions = list(questions)
+        self.prior_mean = prior_mean
+        self.prior_sd = prior_sd
+        self.grid_step = grid_step
+        
+        low, high = NTRPConstants.LEVELS[0], NTRPConstants.LEVELS[-1]
+        points = int(round((high - low) / grid_step))
+        self.grid: Tuple[float, ...] = tuple(round(low + i * grid_step, 10) for i in range(points + 1))
+        log_prior = [-0.5 * ((theta - prior_mean) / prior_sd) ** 2 for theta in self.grid]
+        log_norm = max(log_prior) + math.log(sum(math.exp(v - max(log_prior)) for v in log_prior))
+        self.log_prior: Tuple[float, ...] = tuple(v - log_norm for v in log_prior)
+        self._prior: Tuple[float, ...] = tuple(math.exp(v) for v in self.log_prior)
+        if np is not None:
+            self._grid_array = np.asarray(self.grid)
+            self._log_prior_array = np.asarray(self.log_prior)
+        
+        # 每个网格点归入最近的 LEVELS 刻度（等距时取较低的一档），用于支持度分布；
+        # 网格有序，每个刻度对应一段连续的网格下标：(刻度, 起, 止)
+        levels = NTRPConstants.LEVELS
+        nearest = [min(levels, key=lambda level: abs(level - theta)) for theta in self.grid]
+        self._buckets: List[Tuple[float, int, int]] = []
+        for level in levels:
+            indices = [i for i, value in enumerate(nearest) if value == level]
+            start = indices[0] if indices else 0
+            self._buckets.append((level, start, start + len(indices)))
+        
+        self.discrimination: Dict[str, float] = {}
+        self.thresholds: Dict[str, List[float]] = {}
+        discrimination = discrimination or {}
+        thresholds = thresholds or {}
+        for question in self.questions:
+            a, b = initial_parameters(question)
+            a = float(discrimination.get(question.id, a))
+            b = [float(v) for v in thresholds.get(question.id, b)]
+            if a <= 0:
+                raise ValueError(f"问题 {question.id} 的区分度必须为正: {a}")
+            if len(b) != len(question.options) - 1:
+                raise ValueError(f"问题 {question.id} 需要 {len(question.options) - 1} 个阈值，实际 {len(b)} 个")
+            if any(high <= low for low, high in zip(b, b[1:])):
+                raise ValueError(f"问题 {question.id} 的阈值必须严格递增: {b}")
+            self.discrimination[question.id] = a
+            self.thresholds[question.id] = b
+        
+        self.compile()
+    
+    # ---------- 预编译与评分 ----------
+    
+    def compile(self) -> None:
+        """按当前参数重建每个选项的似然表（参数修改后调用）"""
+        self.dimensions: List[str] = []
+        dimension_index: Dict[str, int] = {}
+        self._tables: Dict[str, Dict[str, _Entry]] = {}
+        grid = self.grid
+        row_index = 0
+        for question in self.questions:
+            if question.dimension not in dimension_index:
+                dimension_index[question.dimension] = len(self.dimensions)
+                self.dimensions.append(question.dimension)
+            dim = dimension_index[question.dimension]
+            probabilities = category_probabilities(
+                self.discrimination[question.id], self.thresholds[question.id], grid
+            )
+            table: Dict[str, _Entry] = {}
+            for rank, k in enumerate(category_order(question)):
+                option = question.options[k]
+                row = [max(p, PROBABILITY_FLOOR) for p in probabilities[rank]]
+                # 后验与缩放无关：似然和 先验 × 似然 都缩放到峰值为 1，连乘多题时不易下溢
+                peak = max(row)
+                likelihood = tuple(p / peak for p in row)
+                weighted = list(map(mul, self._prior, likelihood))
+                peak = max(weighted)
+                weighted = tuple(w / peak for w in weighted)
+                table[option.id] = _Entry(
+                    row=row_index + k,
+                    dim=dim,
+                    log_likelihood=tuple(math.log(p) for p in row),
+                    likelihood=likelihood,
+                    weighted=weighted,
+                    mean=sum(map(mul, grid, weighted)) / sum(weighted),
+                    hard_cap=option.hard_cap if option.hard_cap is not None else float("inf"),
+                )
+            row_index += len(question.options)
+            self._tables[question.id] = table
+        
+        if np is not None:
+            # 全部选项的对数似然矩阵（行号见 _Entry.row）和各行所属维度的 one-hot
+            entries = sorted(
+                (entry for table in self._tables.values() for entry in table.values()),
+                key=lambda entry: entry.row,
+            )
+            self._log_likelihood = np.array([entry.log_likelihood for entry in entries])
+            self._row_onehot = np.eye(len(self.dimensions))[[entry.dim for entry in entries]]
+    
+    def score(
+        self,
+        answers: Dict[str, str],
+        use_numpy: Optional[bool] = None,
+    ) -> Tuple[float, Dict[str, float], Dict[float, float], float]:
+        """
+        单份答案的后验期望
+        
+        Args:
+            answers: {问题ID: 选项ID}，选项必须属于所答问题
+            use_numpy: 是否使用 NumPy，None 表示可用时自动使用（两条路径结果一致）
+        
+        Returns:
+            (能力 EAP, {维度: 维度 EAP}, 按 LEVELS 汇总的后验分布, 硬性上限)
+        
+        Raises:
+            ValueError: 空答案、未知问题，或选项不属于所答问题
+        """
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ValueError("未安装 NumPy，无法使用向量化评分")
+        if not answers:
+            raise ValueError("答案格式错误或包含无效选项")
+        
+        entries: List[_Entry] = []
+        tables = self._tables
+        for question_id, option_id in answers.items():
+            table = tables.get(question_id)
+            entry = table.get(option_id) if table is not None else None
+            if entry is None:
+                raise ValueError("答案格式错误或包含无效选项")
+            entries.append(entry)
+        hard_cap = min(entry.hard_cap for entry in entries)
+        
+        if use_numpy:
+            return self._score_numpy(entries) + (hard_cap,)
+        return self._score_python(entries) + (hard_cap,)
+    
+    def _score_python(self, entries: List[_Entry]) -> Tuple[float, Dict[str, float], Dict[float, float]]:
+        """总后验和各维度后验都从第一题的 先验 × 似然 出发，其余题只乘似然"""
+        total = None
+        dims: Dict[int, list] = {}
+        for entry in entries:
+            total = entry.weighted if total is None else list(map(mul, total, entry.likelihood))
+            state = dims.get(entry.dim)
+            if state is None:
+                # 维度只答了一题时，后验期望直接取预先算好的值
+                dims[entry.dim] = [entry.weighted, entry.mean]
+            else:
+                state[0] = list(map(mul, state[0], entry.likelihood))
+                state[1] = None
+        
+        grid = self.grid
+        dimension_scores: Dict[str, float] = {}
+        for dim in sorted(dims):
+            posterior, mean = dims[dim]
+            if mean is None:
+                mean = sum(map(mul, grid, posterior)) / sum(posterior)
+            dimension_scores[self.dimensions[dim]] = mean
+        
+        norm = sum(total)
+        level = sum(map(mul, grid, total)) / norm
+        support = {value: sum(total[start:stop]) / norm for value, start, stop in self._buckets}
+        return level, dimension_scores, support
+    
+    def _score_numpy(self, entries: List[_Entry]) -> Tuple[float, Dict[str, float], Dict[float, float]]:
+        """一次取出作答选项的对数似然行，按维度求和后与先验合成"""
+        rows = [entry.row for entry in entries]
+        onehot = self._row_onehot[rows]
+        dim_log = onehot.T @ self._log_likelihood[rows]
+        log_prior = self._log_prior_array
+        grid = self._grid_array
+        
+        total = dim_log.sum(axis=0) + log_prior
+        weights = np.exp(total - total.max())
+        weights /= weights.sum()
+        
+        answered = np.flatnonzero(onehot.any(axis=0))
+        dim_posterior = dim_log[answered] + log_prior
+        dim_weights = np.exp(dim_posterior - dim_posterior.max(axis=1, keepdims=True))
+        means = (dim_weights @ grid) / dim_weights.sum(axis=1)
+        
+        cumulative = np.concatenate(([0.0], np.cumsum(weights))).tolist()
+        support = {value: cumulative[stop] - cumulative[start] for value, start, stop in self._buckets}
+        dimension_scores = {self.dimensions[dim]: mean for dim, mean in zip(answered.tolist(), means.tolist())}
+        return float(weights @ grid), dimension_scores, support
+    
+    def score_many(self, codes) -> "np.ndarray":
+        """
+        批量计算应用硬性上限后的能力 EAP
+        
+        Args:
+            codes: 整数编码的答案矩阵（见 NTRPEvaluator.encode_answers，-1 表示未作答）
+        
+        Raises:
+            ValueError: NumPy 不可用或编码矩阵形状不符
+        """
+        if np is None:
+            raise ValueError("批量 IRT 评分需要 NumPy")
+        codes = self._check_codes(codes)
+        log_posterior = np.tile(np.asarray(self.log_prior), (len(codes), 1))
+        hard_cap = np.full(len(codes), np.inf)
+        for j, question in enumerate(self.questions):
+            table = self._tables[question.id]
+            log_likelihood = np.array([table[opt.id].log_likelihood for opt in question.options])
+            caps = np.array([table[opt.id].hard_cap for opt in question.options])
+            answered = codes[:, j] >= 0
+            log_posterior[answered] += log_likelihood[codes[answered, j]]
+            hard_cap[answered] = np.minimum(hard_cap[answered], caps[codes[answered, j]])
+        weights = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+        level = weights @ np.asarray(self.grid) / weights.sum(axis=1)
+        return np.minimum(level, hard_cap)
+    
+    def _check_codes(self, codes) -> "np.ndarray":
+        codes = np.asarray(codes, dtype=np.int64)
+        if codes.ndim != 2 or codes.shape[1] != len(self.questions):
+            raise ValueError(f"答案编码应为 n × {len(self.questions)} 的矩阵，实际形状 {codes.shape}")
+        for j, question in enumerate(self.questions):
+            if codes.shape[0] and codes[:, j].max() >= len(question.options):
+                raise ValueError(f"问题 {question.id} 的选项编码超出范围")
+        return codes
+    
+    # ---------- EM 拟合 ----------
+    
+    def fit(
+        self,
+        codes,
+        iterations: int = 100,
+        tolerance: float = 1e-6,
+        steps: int = 10,
+    ) -> IRTFitReport:
+        """
+        用历史作答做 EM 拟合，原地更新参数并重新编译
+        
+        Args:
+            codes: 整数编码的答案矩阵（见 NTRPEvaluator.encode_answers）
+            iterations: EM 迭代上限
+            tolerance: 每条记录平均目标函数的提升小于该值时停止
+            steps: 每轮 M 步中每道题的梯度上升步数
+        
+        Returns:
+            拟合报告
+        
+        Raises:
+            ValueError: NumPy 不可用、编码形状不符或没有有效记录
+        """
+        if np is None:
+            raise ValueError("IRT 拟合需要 NumPy")
+        start = time.perf_counter()
+        codes = self._check_codes(codes)
+        codes = codes[(codes >= 0).any(axis=1)]
+        n = len(codes)
+        if n == 0:
+            raise ValueError("没有可用于拟合的作答记录")
+        
+        # 选项下标 → 类别序号（按 center_level 从低到高）
+        categories = np.full(codes.shape, -1, dtype=np.int64)
+        for j, question in enumerate(self.questions):
+            rank = np.empty(len(question.options), dtype=np.int64)
+            rank[category_order(question)] = np.arange(len(question.options))
+            answered = codes[:, j] >= 0
+            categories[answered, j] = rank[codes[answered, j]]
+        
+        grid = np.asarray(self.grid)
+        log_prior = np.asarray(self.log_prior)
+        items = []
+        for j, question in enumerate(self.questions):
+            a0, b0 = initial_parameters(question)
+            answered = categories[:, j] >= 0
+            items.append({
+                "rows": np.flatnonzero(answered),
+                "onehot": (categories[answered, j][:, None] == np.arange(len(question.options))).astype(float),
+                "params": _pack(self.discrimination[question.id], np.asarray(self.thresholds[question.id])),
+                "prior": (math.log(a0), np.asarray(b0)),
+                "rate": 0.5,
+            })
+        
+        trace: List[float] = []
+        converged = False
+        iteration = 0
+        for iteration in range(1, iterations + 1):
+            # E 步：全部记录的网格后验
+            log_posterior = np.tile(log_prior, (n, 1))
+            penalty = 0.0
+            for j, item in enumerate(items):
+                log_probs = np.log(_probabilities(item["params"], grid))
+                log_posterior[item["rows"]] += item["onehot"] @ log_probs
+                penalty += _penalty(item["params"], item["prior"])
+            peak = log_posterior.max(axis=1, keepdims=True)
+            weights = np.exp(log_posterior - peak)
+            norm = weights.sum(axis=1, keepdims=True)
+            trace.append(float((peak + np.log(norm)).sum() - penalty) / n)
+            if len(trace) > 1 and trace[-1] - trace[-2] < tolerance:
+                converged = True
+                break
+            posterior = weights / norm
+            
+            # M 步：逐题最大化期望完全数据对数似然
+            for item in items:
+                if item["onehot"].shape[1] < 2 or not len(item["rows"]):
+                    continue
+                counts = item["onehot"].T @ posterior[item["rows"]]
+                item["params"], item["rate"] = _maximize_item(
+                    item["params"], counts, grid, item["prior"], n, item["rate"], steps
+                )
+        
+        for question, item in zip(self.questions, items):
+            a, b = _unpack(item["params"])
+            self.discrimination[question.id] = float(a)
+            self.thresholds[question.id] = [float(v) for v in b]
+        self.compile()
+        
+        return IRTFitReport(
+            respondents=n,
+            iterations=iteration,
+            converged=converged,
+            log_likelihood=trace,
+            discrimination=dict(self.discrimination),
+            seconds=time.perf_counter() - start,
+        )
+    
+    # ---------- 持久化 ----------
+    
+    def to_dict(self) -> Dict:
+        """参数的 JSON 表示（记录选项的类别顺序，用于加载时核对问卷）"""
+        return {
+            "version": PARAMETERS_VERSION,
+            "prior_mean": self.prior_mean,
+            "prior_sd": self.prior_sd,
+            "grid_step": self.grid_step,
+            "questions": {
+                question.id: {
+                    "categories": [question.options[k].id for k in category_order(question)],
+                    "discrimination": round(self.discrimination[question.id], 6),
+                    "thresholds": [round(v, 6) for v in self.thresholds[question.id]],
+                }
+                for question in self.questions
+            },
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict, questions: Sequence[QuestionConfig]) -> "IRTModel":
+        """
+        由 to_dict 的结果构建模型（文件中没有的题目使用初始参数）
+        
+        Raises:
+            ValueError: 版本不符，或某题的选项与参数文件记录的不一致
+        """
+        if data.get("version") != PARAMETERS_VERSION:
+            raise ValueError(f"不支持的 IRT 参数文件版本: {data.get('version')}")
+        saved = data.get("questions", {})
+        discrimination: Dict[str, float] = {}
+        thresholds: Dict[str, Sequence[float]] = {}
+        for question in questions:
+            entry = saved.get(question.id)
+            if entry is None:
+                continue
+            expected = [question.options[k].id for k in category_order(question)]
+            if entry.get("categories") != expected:
+                raise ValueError(f"问题 {question.id} 的选项与 IRT 参数文件不一致，需要重新拟合")
+            discrimination[question.id] = entry["discrimination"]
+            thresholds[question.id] = entry["thresholds"]
+        return cls(
+            questions,
+            discrimination,
+            thresholds,
+            prior_mean=data.get("prior_mean", PRIOR_MEAN),
+            prior_sd=data.get("prior_sd", PRIOR_SD),
+            grid_step=data.get("grid_step", GRID_STEP),
+        )
+    
+    def save(self, path: pathlib.Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    
+    @classmethod
+    def load(cls, path: pathlib.Path, questions: Sequence[QuestionConfig]) -> "IRTModel":
+        """
+        Raises:
+            FileNotFoundError: 参数文件不存在
+            ValueError: 参数文件格式错误或与问卷不一致
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"IRT 参数文件格式错误: {e}")
+        return cls.from_dict(data, questions)
+
+
+# ---------- 单题 M 步（NumPy） ----------
+# 参数向量 u = [log a, b_1, log(b_2 - b_1), ..., log(b_{K-1} - b_{K-2})]，保证 a > 0 且阈值递增
+
+def _pack(discrimination: float, thresholds: "np.ndarray") -> "np.ndarray":
+    if not len(thresholds):
+        return np.array([math.log(discrimination)])
+    return np.concatenate(([math.log(discrimination), thresholds[0]], np.log(np.diff(thresholds))))
+
+
+def _unpack(params: "np.ndarray") -> Tuple[float, "np.ndarray"]:
+    if len(params) == 1:
+        return math.exp(params[0]), np.empty(0)
+    return math.exp(params[0]), params[1] + np.concatenate(([0.0], np.cumsum(np.exp(params[2:]))))
+
+
+def _probabilities(params: "np.ndarray", grid: "np.ndarray") -> "np.ndarray":
+    """类别 × 网格的概率（已截断到 PROBABILITY_FLOOR）"""
+    return _cumulative_terms(params, grid)[0]
+
+
+def _cumulative_terms(params: "np.ndarray", grid: "np.ndarray"):
+    a, b = _unpack(params)
+    z = np.clip(a * (grid[None, :] - b[:, None]), -50.0, 50.0)
+    s = 1.0 / (1.0 + np.exp(-z))
+    ones = np.ones((1, len(grid)))
+    cumulative = np.vstack([ones, s, np.zeros_like(ones)])
+    probabilities = np.maximum(cumulative[:-1] - cumulative[1:], PROBABILITY_FLOOR)
+    return probabilities, a, b, s
+
+
+def _penalty(params: "np.ndarray", prior: Tuple[float, "np.ndarray"]) -> float:
+    a, b = _unpack(params)
+    log_a0, b0 = prior
+    value = (math.log(a) - log_a0) ** 2 / (2 * DISCRIMINATION_PRIOR_SD ** 2)
+    return value + float(((b - b0) ** 2).sum()) / (2 * THRESHOLD_PRIOR_SD ** 2)
+
+
+def _item_objective(params, counts, grid, prior, n):
+    """单题期望完全数据对数似然减先验惩罚（除以记录数），及其对 params 的梯度"""
+    probabilities, a, b, s = _cumulative_terms(params, grid)
+    value = (float((counts * np.log(probabilities)).sum()) - _penalty(params, prior)) / n
+    
+    ratio = counts / probabilities / n
+    slope = (ratio[1:] - ratio[:-1]) * s * (1.0 - s)
+    log_a0, b0 = prior
+    grad_log_a = a * float((slope * (grid[None, :] - b[:, None])).sum())
+    grad_log_a -= (math.log(a) - log_a0) / DISCRIMINATION_PRIOR_SD ** 2 / n
+    grad_b = -a * slope.sum(axis=1) - (b - b0) / THRESHOLD_PRIOR_SD ** 2 / n
+    
+    # b_k = u_1 + Σ_{i<k} exp(u_{i+2})
+    tail = np.cumsum(grad_b[::-1])[::-1]
+    grad = np.concatenate(([grad_log_a, tail[0]], np.exp(params[2:]) * tail[1:]))
+    return value, grad
+
+
+def _maximize_item(params, counts, grid, prior, n, rate, steps):
+    """带回溯的梯度上升；返回新参数和下一轮的初始步长（目标函数不会下降）"""
+    value, grad = _item_objective(params, counts, grid, prior, n)
+    for _ in range(steps):
+        while rate > 1e-8:
+            candidate = params + rate * grad
+            candidate_value, candidate_grad = _item_objective(candidate, counts, grid, prior, n)
+            if candidate_value >= value:
+                params, value, grad = candidate, candidate_value, candidate_grad
+                rate *= 1.5
+                break
+            rate *= 0.5
+        else:
+            break
+    return params, max(rate, 1e-4)
+
+
+def format_report(report: IRTFitReport) -> str:
+    """拟合报告的文本表格"""
+    lines = [
+        f"记录数 {report.respondents}，EM 迭代 {report.iterations} 轮"
+        f"（{'已收敛' if report.converged else '未收敛'}），耗时 {report.seconds:.2f}s",
+        f"平均对数似然 {report.log_likelihood[0]:.4f} → {report.log_likelihood[-1]:.4f}",
+        "",
+        f"{'问题':<8}{'区分度':>10}",
+    ]
+    for question_id, a in sorted(report.discrimination.items(), key=lambda item: -item[1]):
+        lines.append(f"{question_id:<8}{a:>10.3f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from config_manager import ConfigManager
+    from ntrp_evaluator import NTRPEvaluator
+    from parity_harness import load_history
+    
+    parser = argparse.ArgumentParser(description="用历史作答拟合分级反应 IRT 模型参数")
+    parser.add_argument("history", type=pathlib.Path, help="历史作答记录（JSON 或 JSON Lines）")
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=pathlib.Path("irt_parameters.json"))
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args(argv)
+    
+    config_manager = ConfigManager(args.config_dir)
+    questions = config_manager.load_questions()
+    evaluator = NTRPEvaluator(questions, config_manager.load_suggestions(), config_manager)
+    batch = evaluator.validate_many(load_history(args.history))
+    codes = [batch.matrix[i] for i in batch.valid_rows]
+    
+    model = IRTModel(questions)
+    report = model.fit(codes, iterations=args.iterations, tolerance=args.tolerance)
+    model.save(args.output)
+    skipped = len(batch.results) - len(codes)
+    print(format_report(report))
+    if skipped:
+        print(f"\n跳过 {skipped} 条无效记录")
+    print(f"\n参数已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+提前终止边界
+
+在部分作答的会话状态上，计算剩余问题所有可能作答组合下最终等级的上下界：
+- 支持度期望是各题 (Σ等级×支持度, Σ支持度) 之和的比值，其极值用 Dinkelbach 迭代精确求出；
+- 硬性上限按各题可选的最小/最大上限求界；
+- 各维度分数在剩余题全部作答时权重固定，其区间逐维度精确求出；
+- 木桶效应和全面型加成在上述区间上做保守（可靠）的区间运算。
+四舍五入后的上下界相同时，剩余问题已无法改变展示等级。
+"""
+
+import weakref
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_models import LevelBounds, NTRPConstants, round_to_half
+
+# 区间两端的放宽量，抵消与逐项累加之间的浮点舍入差异
+_EPSILON = 1e-9
+
+# 每个评估器的按题汇总只构建一次
+_question_summaries_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _get_question_summaries(evaluator) -> Dict[str, tuple]:
+    """
+    各题的求界汇总（按评估器缓存）
+    
+    Returns:
+        {问题ID: ([(Σ等级×支持度, Σ支持度) 每个选项], 最小上限, 最大上限, 最低 center_level, 最高 center_level)}
+    """
+    summaries = _question_summaries_cache.get(evaluator)
+    if summaries is None:
+        levels = evaluator._levels
+        summaries = {}
+        for question in evaluator.questions:
+            compiled = [evaluator._compiled_options[opt.id] for opt in question.options]
+            summaries[question.id] = (
+                [(sum(level * s for level, s in zip(levels, c.support)), sum(c.support)) for c in compiled],
+                min(c.hard_cap for c in compiled),
+                max(c.hard_cap for c in compiled),
+                min(c.center_level for c in compiled),
+                max(c.center_level for c in compiled),
+            )
+        _question_summaries_cache[evaluator] = summaries
+    return summaries
+
+
+def compute_level_bounds(session, remaining: Optional[Iterable[str]] = None) -> LevelBounds:
+    """
+    计算会话在剩余问题全部作答后的最终等级上下界
+    
+    Args:
+        session: EvaluationSession
+        remaining: 剩余待答的问题ID，None 表示评估器中所有尚未作答的问题
+    
+    Returns:
+        等级上下界
+    """
+    evaluator = session.evaluator
+    if remaining is None:
+        remaining_questions = [q for q in evaluator.questions if q.id not in session]
+    else:
+        remaining_questions = [
+            evaluator._question_dict[q_id] for q_id in remaining if q_id not in session
+        ]
+    
+    levels = evaluator._levels
+    known_a = sum(level * s for level, s in zip(levels, session._support))
+    known_w = sum(session._support)
+    
+    choices: List[List[Tuple[float, float]]] = []
+    cap_lo = cap_hi = session._hard_cap
+    dim_lo: Dict[str, List[float]] = {}
+    dim_hi: Dict[str, List[float]] = {}
+    for dim, (weight, weighted, _, count) in session._dim_sums.items():
+        if count:
+            dim_lo[dim] = [weight, weighted]
+            dim_hi[dim] = [weight, weighted]
+    
+    summaries = _get_question_summaries(evaluator)
+    for question in remaining_questions:
+        options, min_cap, max_cap, min_center, max_center = summaries[question.id]
+        choices.append(options)
+        cap_lo = min(cap_lo, min_cap)
+        cap_hi = min(cap_hi, max_cap)
+        
+        lo = dim_lo.setdefault(question.dimension, [0.0, 0.0])
+        hi = dim_hi.setdefault(question.dimension, [0.0, 0.0])
+        lo[0] += question.weight
+        hi[0] += question.weight
+        lo[1] += question.weight * min_center
+        hi[1] += question.weight * max_center
+    
+    if known_w <= 0 and not choices:
+        raise ValueError("答案格式错误或包含无效选项")
+    
+    # 1) 基础等级区间
+    expectation_lo = _extreme_ratio(known_a, known_w, choices, maximize=False)
+    expectation_hi = _extreme_ratio(known_a, known_w, choices, maximize=True)
+    base_lo = min(expectation_lo, cap_lo) - _EPSILON
+    base_hi = min(expectation_hi, cap_hi) + _EPSILON
+    
+    # 2) 维度分数区间
+    intervals = [
+        (dim_lo[dim][1] / dim_lo[dim][0] - _EPSILON, dim_hi[dim][1] / dim_hi[dim][0] + _EPSILON)
+        for dim in dim_lo
+    ]
+    
+    # 3) 木桶效应与全面型加成
+    lower, upper = _barrel_bounds(base_lo, base_hi, intervals)
+    
+    rounded_lower = round_to_half(lower)
+    rounded_upper = round_to_half(upper)
+    return LevelBounds(
+        lower_level=lower,
+        upper_level=upper,
+        rounded_lower=rounded_lower,
+        rounded_upper=rounded_upper,
+        decided=rounded_lower == rounded_upper,
+        remaining=len(remaining_questions),
+    )
+
+
+def _extreme_ratio(
+    known_a: float,
+    known_w: float,
+    choices: List[List[Tuple[float, float]]],
+    maximize: bool,
+) -> float:
+    """
+    Dinkelbach 迭代：在每题独立选一个 (a, w) 时求 (A + Σa) / (W + Σw) 的极值
+    """
+    sign = 1.0 if maximize else -1.0
+    pick = [options[0] for options in choices]
+    a = known_a + sum(p[0] for p in pick)
+    w = known_w + sum(p[1] for p in pick)
+    ratio = a / w
+    
+    for _ in range(64):
+        pick = [max(options, key=lambda o: sign * (o[0] - ratio * o[1])) for options in choices]
+        a = known_a + sum(p[0] for p in pick)
+        w = known_w + sum(p[1] for p in pick)
+        new_ratio = a / w
+        if sign * (new_ratio - ratio) <= 1e-15:
+            break
+        ratio = new_ratio
+    return ratio
+
+
+def _balance_factor(variance: float) -> float:
+    """与 NTRPEvaluator._compute_barrel_effect 相同的均衡度因子"""
+    low = NTRPConstants.VARIANCE_LOW
+    high = NTRPConstants.VARIANCE_HIGH
+    if variance <= low:
+        return 1.0
+    if variance >= high:
+        return 0.0
+    return max(0.0, min(1.0, 1.0 - (variance - low) / (high - low)))
+
+
+def _variance_bounds(intervals: List[Tuple[float, float]]) -> Tuple[float, float]:
+    """
+    各维度分数在区间内独立取值时，维度方差的下界和上界
+    
+    下界精确：min_x var(x) = min_t (1/n)·Σ dist(t, [lo, hi])²，在断点分段上解析求解。
+    上界保守：对任意 c 有 var(x) ≤ (1/n)·Σ (x - c)² ≤ (1/n)·Σ max((lo - c)², (hi - c)²)。
+    """
+    n = len(intervals)
+    points = sorted({p for interval in intervals for p in interval})
+    
+    def spread(t: float) -> float:
+        total = 0.0
+        for lo, hi in intervals:
+            if t < lo:
+                total += (lo - t) ** 2
+            elif t > hi:
+                total += (t - hi) ** 2
+        return total / n
+    
+    candidates = list(points)
+    for left, right in zip(points, points[1:]):
+        # 区间 (left, right) 内函数为二次，驻点为越界端点的平均
+        above = [hi for lo, hi in intervals if hi <= left]
+        below = [lo for lo, hi in intervals if lo >= right]
+        if above or below:
+            t = (sum(above) + sum(below)) / (len(above) + len(below))
+            if left < t < right:
+                candidates.append(t)
+    variance_lo = min(spread(t) for t in candidates)
+    
+    center = sum(lo + hi for lo, hi in intervals) / (2 * n)
+    variance_hi = sum(max((lo - center) ** 2, (hi - center) ** 2) for lo, hi in intervals) / n
+    return variance_lo, max(variance_lo, variance_hi)
+
+
+def _barrel_bounds(
+    base_lo: float,
+    base_hi: float,
+    intervals: List[Tuple[float, float]],
+) -> Tuple[float, float]:
+    """在基础等级区间和维度分数区间上对木桶效应调整做区间运算"""
+    if not intervals:
+        return base_lo, base_hi
+    
+    n = len(intervals)
+    mean_lo = sum(lo for lo, _ in intervals) / n
+    mean_hi = sum(hi for _, hi in intervals) / n
+    min_lo = min(lo for lo, _ in intervals)
+    min_hi = min(hi for _, hi in intervals)
+    variance_lo, variance_hi = _variance_bounds(intervals)
+    balance_hi = _balance_factor(variance_lo)
+    balance_lo = _balance_factor(variance_hi)
+    
+    max_penalty = NTRPConstants.MAX_BARREL_PENALTY
+    # B·L_base + (1 - B)·D_min 对 L_base、D_min 单调递增，对 B 为线性，极值在 B 的端点
+    blend_lo = min(b * base_lo + (1 - b) * min_lo for b in (balance_lo, balance_hi))
+    blend_hi = max(b * base_hi + (1 - b) * min_hi for b in (balance_lo, balance_hi))
+    barrel_lo = max(base_lo - max_penalty, blend_lo)
+    barrel_hi = max(base_hi - max_penalty, blend_hi)
+    
+    threshold = NTRPConstants.HIGH_LEVEL_THRESHOLD
+    balance_threshold = NTRPConstants.BALANCE_THRESHOLD
+    bonus = NTRPConstants.COMPREHENSIVE_BONUS
+    bonus_lo = bonus if mean_lo >= threshold and balance_lo >= balance_threshold else 0.0
+    bonus_hi = bonus if mean_hi >= threshold and balance_hi >= balance_threshold else 0.0
+    
+    return barrel_lo + bonus_lo, barrel_hi + bonus_hi
@@ -6,10 +6,19 @@ NTRP 网球等级评估核心计算器
 """
 
 import math
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
+from answer_validator import AnswerValidator
+import batch_evaluation
+from evaluation_session import EvaluationSession
+import sensitivity
+from upgrade_solver import UpgradeSolver
+from specialized_evaluator import SpecializedEvaluator
+from chart_generator import ChartGenerator
 from data_models import (
-    QuestionConfig, OptionConfig, EvaluateResult,
+    QuestionConfig, OptionConfig, CompiledOption, EvaluateResult, BatchEvaluateResult,
+    EvaluationDetail, LevelResult, ScoreResult, SensitivityEntry, UpgradePlan, LevelBounds,
+    PosteriorSummary, AnswerValidation, BatchAnswerValidation,
     NTRPConstants, get_level_label, round_to_half
 )
 
@@ -37,23 +46,48 @@ class NTRPEvaluator:
         self.suggestion_rules = suggestion_rules
         self.config_manager = config_manager
         self.spread = spread
+        self.chart_generator = ChartGenerator(config_manager)
         
         # 创建问题和选项的快速查找字典
         self._question_dict = {q.id: q for q in questions}
+        self.validator = AnswerValidator(questions)
         self._option_dict: Dict[str, OptionConfig] = {}
         for q in questions:
             for opt in q.options:
                 self._option_dict[opt.id] = opt
+        
+        # 预编译问卷：每个选项的加权支持度向量、维度下标和硬性上限只与选项有关，
+        # 构造时算好，evaluate 时只需做向量累加
+        self._levels: Tuple[float, ...] = tuple(NTRPConstants.LEVELS)
+        self._dimensions: List[str] = []
+        self._dimension_index: Dict[str, int] = {}
+        for q in questions:
+            if q.dimension not in self._dimension_index:
+                self._dimension_index[q.dimension] = len(self._dimensions)
+                self._dimensions.append(q.dimension)
+        
+        self._compiled_options: Dict[str, CompiledOption] = {}
+        for q in questions:
+            for opt in q.options:
+                self._compiled_options[opt.id] = self._compile_option(q, opt)
+        
+        # 专用评分函数（按需生成后缓存）
+        self._specialized: Optional[SpecializedEvaluator] = None
     
-    def evaluate(self, answers: Dict[str, str]) -> EvaluateResult:
+    def evaluate(
+        self,
+        answers: Dict[str, str],
+        detail: EvaluationDetail = EvaluationDetail.FULL,
+    ) -> Union[EvaluateResult, ScoreResult, LevelResult]:
         """
         核心评估方法
         
         Args:
             answers: 用户答案字典，key为问题ID，value为选项ID
+            detail: 结果详细程度，LEVEL/SCORES 跳过评语、总结和图表数据的生成
             
         Returns:
-            评估结果
+            评估结果（类型由 detail 决定：LevelResult / ScoreResult / EvaluateResult）
             
         Raises:
             ValueError: 答案格式错误或包含无效选项
@@ -62,36 +96,264 @@ class NTRPEvaluator:
         if not self._validate_answers(answers):
             raise ValueError("答案格式错误或包含无效选项")
         
-        # 2) 计算支持度分布
-        support, dim_scores, hard_cap = self._compute_support_distribution(answers)
+        # 2)-5) 支持度分布、基础等级、维度分数、木桶效应统计
+        numbers = self._evaluate_numbers(answers)
         
-        # 3) 计算基础等级（Anchor机制后的结果）
+        # 6)-9) 等级调整、评语、图表与结果组装
+        return self._build_result(*numbers, detail=detail)
+    
+    def evaluate_many(self, answer_sets, use_numpy: Optional[bool] = None) -> BatchEvaluateResult:
+        """
+        批量评估（只计算数值结果，不生成评语）
+        
+        Args:
+            answer_sets: 答案字典列表，或整数编码的答案矩阵（见 encode_answers）
+            use_numpy: 是否使用 NumPy 向量化计算，None 表示 NumPy 可用时自动使用
+            
+        Returns:
+            批量评估结果，各字段与逐条调用 evaluate 的同名数值一致
+            
+        Raises:
+            ValueError: 某条答案格式错误或包含无效选项
+        """
+        return batch_evaluation.evaluate_many(self, answer_sets, use_numpy)
+    
+    def sensitivity(self, answers: Dict[str, str]) -> Dict[str, Dict[str, SensitivityEntry]]:
+        """
+        单题改答敏感度矩阵：每道题每个备选选项对应的等级和木桶效应统计
+        
+        Args:
+            answers: 当前答案字典
+            
+        Returns:
+            {问题ID: {备选选项ID: SensitivityEntry}}
+            
+        Raises:
+            ValueError: 答案格式错误或包含无效选项
+        """
+        return sensitivity.compute_sensitivity(self, answers)
+    
+    def plan_upgrade(
+        self,
+        answers: Dict[str, str],
+        target_level: Optional[float] = None,
+        max_changes: int = 3,
+    ) -> UpgradePlan:
+        """
+        寻找达到目标等级所需改动最少的答案升级方案
+        
+        Args:
+            answers: 当前答案字典
+            target_level: 目标展示等级，None 表示下一个 0.5 档
+            max_changes: 最多改动的题数
+            
+        Returns:
+            升级方案
+            
+        Raises:
+            ValueError: 答案格式错误或包含无效选项
+        """
+        return UpgradeSolver(self, max_changes=max_changes).solve(answers, target_level)
+    
+    def level_bounds(
+        self,
+        answers: Dict[str, str],
+        remaining: Optional[List[str]] = None,
+    ) -> LevelBounds:
+        """
+        已作答部分固定时，剩余问题所有可能作答下最终等级的上下界
+        
+        Args:
+            answers: 已作答的答案字典
+            remaining: 剩余待答的问题ID，None 表示所有尚未作答的问题
+            
+        Returns:
+            等级上下界；decided 为 True 时可以不再询问剩余问题
+            
+        Raises:
+            ValueError: 答案包含无效选项
+        """
+        if answers and not self._validate_answers(answers):
+            raise ValueError("答案格式错误或包含无效选项")
+        return EvaluationSession(self, answers).level_bounds(remaining)
+    
+    def specialize(self) -> SpecializedEvaluator:
+        """
+        获取（必要时生成）针对当前配置的专用评估器
+        
+        专用评估器的 evaluate(answers) 与 evaluate(answers, EvaluationDetail.LEVEL) 逐位一致，
+        生成的代码按配置哈希缓存在磁盘上，配置不变时后续启动直接加载。
+        
+        Returns:
+            专用评估器
+            
+        Raises:
+            RuntimeError: 新生成的代码与通用路径结果不一致
+        """
+        if self._specialized is None:
+            self._specialized = SpecializedEvaluator(self)
+        return self._specialized
+    
+    def encode_answers(self, answer_sets: List[Dict[str, str]]) -> List[List[int]]:
+        """
+        将答案字典编码为整数矩阵
+        
+        每行对应一份答案，每列对应 self.questions 中的一道题，
+        取值为所选选项在该题 options 中的下标，未作答为 -1。
+        
+        Args:
+            answer_sets: 答案字典列表
+            
+        Returns:
+            整数编码的答案矩阵
+            
+        Raises:
+            ValueError: 答案包含无效问题或不属于该问题的选项
+        """
+        batch = self.validator.validate_many(answer_sets, allow_empty=True)
+        for row, result in enumerate(batch.results):
+            if not result.ok:
+                raise ValueError(f"第{row}条答案无法编码: {result.question_id}={result.option_id}")
+        return batch.matrix
+    
+    def validate_answers(
+        self,
+        answers: Dict[str, str],
+        required_tiers: Sequence[str] = (),
+        allow_empty: bool = False,
+    ) -> AnswerValidation:
+        """
+        严格校验一份答案（选项必须属于所答问题，见 AnswerValidator）
+        
+        evaluate 等评估入口使用同一个校验器，遇到无效答案只抛出 ValueError；需要具体错误码时调用本方法。
+        
+        Args:
+            answers: 答案字典，或 (问题ID, 选项ID) 序列
+            required_tiers: 必须全部作答的层级
+            allow_empty: 是否接受空答案
+            
+        Returns:
+            校验结果
+        """
+        return self.validator.validate(answers, required_tiers, allow_empty)
+    
+    def validate_many(
+        self,
+        answer_sets,
+        required_tiers: Sequence[str] = (),
+        allow_empty: bool = False,
+    ) -> BatchAnswerValidation:
+        """
+        批量严格校验，逐行给出错误码和有效行的整数编码
+        
+        有效行的编码可直接交给 evaluate_many：
+            batch = evaluator.validate_many(rows)
+            result = evaluator.evaluate_many([batch.matrix[i] for i in batch.valid_rows])
+        """
+        return self.validator.validate_many(answer_sets, required_tiers, allow_empty)
+    
+    def decode_answers(self, codes) -> Dict[str, str]:
+        """
+        将一行整数编码还原为答案字典（-1 表示未作答）
+        
+        Raises:
+            ValueError: 编码超出该问题的选项范围
+        """
+        answers: Dict[str, str] = {}
+        for question, code in zip(self.questions, codes):
+            code = int(code)
+            if code >= len(question.options) or code < -1:
+                raise ValueError(f"答案编码超出选项范围: {question.id}={code}")
+            if code >= 0:
+                answers[question.id] = question.options[code].id
+        return answers
+    
+    def _evaluate_numbers(
+        self,
+        answers: Dict[str, str]
+    ) -> Tuple[Dict[float, float], float, Dict[str, float], Dict[str, float]]:
+        """
+        计算评估的全部数值部分
+        
+        Returns:
+            (支持度分布, 基础等级, 维度分数, 木桶效应统计)
+        """
+        # 计算支持度分布
+        support, dim_sums, hard_cap = self._compute_support_distribution(answers)
+        
+        return self._finish_numbers(support, dim_sums, hard_cap)
+    
+    def _finish_numbers(
+        self,
+        support: Dict[float, float],
+        dim_sums: Dict[str, List[float]],
+        hard_cap: float
+    ) -> Tuple[Dict[float, float], float, Dict[str, float], Dict[str, float]]:
+        """
+        由累积好的支持度、维度累积量和硬性上限计算数值结果
+        
+        Returns:
+            (支持度分布, 基础等级, 维度分数, 木桶效应统计)
+        """
+        # 计算基础等级（Anchor机制后的结果）
         base_level = self._compute_raw_level(support, hard_cap)
         
-        # 4) 计算维度分数
-        dimension_scores = self._compute_dimension_scores(dim_scores)
+        # 计算维度分数
+        dimension_scores = self._compute_dimension_scores(dim_sums)
         
-        # 5) 计算木桶效应统计数据
+        # 计算木桶效应统计数据
         barrel_stats = self._compute_barrel_effect(dimension_scores, base_level)
         
-        # 6) 应用木桶效应调整
+        return support, base_level, dimension_scores, barrel_stats
+    
+    def _build_result(
+        self,
+        support: Dict[float, float],
+        base_level: float,
+        dimension_scores: Dict[str, float],
+        barrel_stats: Dict[str, float],
+        detail: EvaluationDetail = EvaluationDetail.FULL
+    ) -> Union[EvaluateResult, ScoreResult, LevelResult]:
+        """按详细程度由数值结果组装评估结果，只有 FULL 才生成评语和图表数据"""
+        # 应用木桶效应调整
         final_level = barrel_stats['final_level']
         rounded_level = round_to_half(final_level)
+        
+        if detail is EvaluationDetail.LEVEL:
+            return LevelResult(total_level=final_level, rounded_level=rounded_level)
+        
+        if detail is EvaluationDetail.SCORES:
+            return ScoreResult(
+                total_level=final_level,
+                rounded_level=rounded_level,
+                dimension_scores=dimension_scores,
+                support_distribution=support.copy(),
+                base_level=base_level,
+                dimension_mean=barrel_stats['mean'],
+                dimension_variance=barrel_stats['variance'],
+                dimension_min=barrel_stats['min'],
+                dimension_max=barrel_stats['max'],
+                balance_factor=barrel_stats['balance_factor'],
+                barrel_adjusted_level=barrel_stats['barrel_adjusted'],
+                comprehensive_bonus=barrel_stats['bonus'],
+                posterior=self._summarize_posterior(support, rounded_level)
+            )
+        
         level_label = get_level_label(rounded_level, self.config_manager)
         
-        # 5) 生成评语
+        # 生成评语
         dimension_comments = self._build_dimension_comments(dimension_scores, rounded_level)
         
-        # 6) 分析优势和短板
+        # 分析优势和短板
         advantages, weaknesses = self._analyze_strengths_weaknesses(dimension_scores)
         
-        # 7) 生成总体评语
+        # 生成总体评语
         summary_text = self._build_summary_text(
             rounded_level, level_label, dimension_scores, 
             dimension_comments, advantages, weaknesses
         )
         
-        return EvaluateResult(
+        result = EvaluateResult(
             total_level=final_level,
             rounded_level=rounded_level,
             level_label=level_label,
@@ -101,7 +363,7 @@ class NTRPEvaluator:
             weaknesses=weaknesses,
             summary_text=summary_text,
             support_distribution=support.copy(),
-            chart_data=None,  # 将由 chart_generator 生成
+            chart_data=None,  # 下面由 chart_generator 生成
             # 木桶效应统计数据
             base_level=base_level,
             dimension_mean=barrel_stats['mean'],
@@ -110,70 +372,105 @@ class NTRPEvaluator:
             dimension_max=barrel_stats['max'],
             balance_factor=barrel_stats['balance_factor'],
             barrel_adjusted_level=barrel_stats['barrel_adjusted'],
-            comprehensive_bonus=barrel_stats['bonus']
+            comprehensive_bonus=barrel_stats['bonus'],
+            posterior=self._summarize_posterior(support, rounded_level)
         )
+        
+        # 生成图表数据
+        result.chart_data = self.chart_generator.generate_chart_data(result)
+        return result
     
     def _validate_answers(self, answers: Dict[str, str]) -> bool:
-        """验证答案有效性"""
-        # 检查至少有一些答案
-        if not answers:
-            return False
+        """验证答案有效性（非空；问题、选项存在，选项属于所答问题，同一道题只答一次）"""
+        return self.validator.validate(answers).ok
+    
+    def _compile_option(self, question: QuestionConfig, option: OptionConfig) -> CompiledOption:
+        """
+        将选项编译为加权支持度向量
         
-        # 检查每个答案是否有效
-        for question_id, option_id in answers.items():
-            # 验证问题ID是否存在
-            if question_id not in self._question_dict:
-                return False
-            # 验证选项ID是否有效
-            if option_id not in self._option_dict:
-                return False
-        
-        return True
+        Args:
+            question: 选项所在（作答）的问题
+            option: 选项配置
+            
+        Returns:
+            预编译的选项数据
+        """
+        weight_factor = question.weight
+        if option.anchor_type == "locator":
+            # 如果是locator类型，应用加成系数
+            weight_factor *= NTRPConstants.LOCATOR_BOOST
+        
+        support = tuple(
+            self._compute_membership_by_anchor(level, option) * weight_factor
+            for level in self._levels
+        )
+        
+        return CompiledOption(
+            option_id=option.id,
+            question_id=question.id,
+            support=support,
+            dimension=question.dimension,
+            dimension_index=self._dimension_index.get(question.dimension, -1),
+            center_level=option.center_level,
+            weight=question.weight,
+            hard_cap=option.hard_cap if option.hard_cap is not None else float('inf'),
+        )
+    
+    def _get_compiled_option(self, question_id: str, option_id: str) -> CompiledOption:
+        """
+        获取作答 (问题, 选项) 对应的预编译数据
+        
+        Raises:
+            ValueError: 选项不存在或不属于该问题
+        """
+        compiled = self._compiled_options.get(option_id)
+        if compiled is None or compiled.question_id != question_id:
+            raise ValueError(f"答案格式错误或包含无效选项: {question_id}={option_id}")
+        return compiled
     
     def _compute_support_distribution(
         self, 
         answers: Dict[str, str]
-    ) -> Tuple[Dict[float, float], Dict[str, List[Tuple[float, float]]], float]:
+    ) -> Tuple[Dict[float, float], Dict[str, List[float]], float]:
         """
         计算支持度分布和维度分数
         
         Returns:
             (支持度分布, 维度分数累积, 硬性上限)
+            维度分数累积为 {dimension: [权重和, 加权分数和, 分数和, 题数]}
         """
-        # 初始化支持度分布
-        support: Dict[float, float] = {L: 0.0 for L in NTRPConstants.LEVELS}
+        # 初始化支持度向量（与 NTRPConstants.LEVELS 一一对应）
+        n_levels = len(self._levels)
+        support = [0.0] * n_levels
         
-        # 维度分数累积：{dimension: [(score, weight), ...]}
-        dim_scores: Dict[str, List[Tuple[float, float]]] = {}
+        # 维度分数累积，按作答顺序保留维度出现次序
+        dim_sums: Dict[str, List[float]] = {}
         
         # 硬性上限
         hard_cap = float('inf')
         
         for question_id, option_id in answers.items():
-            question = self._question_dict[question_id]
-            option = self._option_dict[option_id]
+            compiled = self._get_compiled_option(question_id, option_id)
             
             # 更新硬性上限
-            if option.hard_cap is not None:
-                hard_cap = min(hard_cap, option.hard_cap)
+            if compiled.hard_cap < hard_cap:
+                hard_cap = compiled.hard_cap
             
-            # 计算该选项对各等级的隔属度
-            for level in NTRPConstants.LEVELS:
-                membership = self._compute_membership_by_anchor(level, option)
-                
-                # 如果是locator类型，应用加成系数
-                weight_factor = question.weight
-                if option.anchor_type == "locator":
-                    weight_factor *= NTRPConstants.LOCATOR_BOOST
-                
-                support[level] += membership * weight_factor
+            # 累加预编译的加权支持度
+            option_support = compiled.support
+            for i in range(n_levels):
+                support[i] += option_support[i]
             
             # 记录维度分数
-            if question.dimension not in dim_scores:
-                dim_scores[question.dimension] = []
-            dim_scores[question.dimension].append((option.center_level, question.weight))
-        
-        return support, dim_scores, hard_cap
+            sums = dim_sums.get(compiled.dimension)
+            if sums is None:
+                sums = dim_sums[compiled.dimension] = [0.0, 0.0, 0.0, 0]
+            sums[0] += compiled.weight
+            sums[1] += compiled.center_level * compiled.weight
+            sums[2] += compiled.center_level
+            sums[3] += 1
+        
+        return dict(zip(self._levels, support)), dim_sums, hard_cap
     
     def _compute_membership(self, level: float, center: float, spread: float) -> float:
         """
@@ -239,24 +536,64 @@ class NTRPEvaluator:
         expectation = sum(level * support[level] for level in NTRPConstants.LEVELS) / total_support
         return min(expectation, hard_cap)
     
+    def _summarize_posterior(self, support: Dict[float, float], rounded_level: float) -> PosteriorSummary:
+        """
+        将支持度分布归一化为等级后验，并计算可信区间和熵
+        
+        可信区间取包含展示等级、覆盖概率不低于 CREDIBLE_MASS 的最短连续等级段
+        （等宽时取覆盖概率更高的），只用已算好的支持度向量，不做任何重采样。
+        """
+        levels = self._levels
+        total_support = sum(support.values())
+        if total_support > 0:
+            probabilities = [support[level] / total_support for level in levels]
+        else:
+            probabilities = [1.0 / len(levels)] * len(levels)
+        
+        mean = sum(level * p for level, p in zip(levels, probabilities))
+        entropy = -sum(p * math.log2(p) for p in probabilities if p > 0)
+        
+        # 展示等级在刻度上对应的位置（超出刻度或落在 6.5 时取最近的等级）
+        anchor = min(range(len(levels)), key=lambda i: abs(levels[i] - rounded_level))
+        
+        # 整段刻度的覆盖概率为 1，作为兜底
+        lower, upper, mass = 0, len(levels) - 1, 1.0
+        best_key = (levels[upper] - levels[lower], -mass)
+        for start in range(anchor + 1):
+            window_mass = sum(probabilities[start:anchor])
+            for end in range(anchor, len(levels)):
+                window_mass += probabilities[end]
+                if window_mass >= NTRPConstants.CREDIBLE_MASS - 1e-12:
+                    key = (levels[end] - levels[start], -window_mass)
+                    if key < best_key:
+                        lower, upper, mass, best_key = start, end, window_mass, key
+                    break
+        
+        return PosteriorSummary(
+            probabilities=dict(zip(levels, probabilities)),
+            mean=mean,
+            credible_lower=levels[lower],
+            credible_upper=levels[upper],
+            credible_mass=min(mass, 1.0),
+            entropy=entropy,
+        )
+    
     def _compute_dimension_scores(
         self, 
-        dim_scores: Dict[str, List[Tuple[float, float]]]
+        dim_sums: Dict[str, List[float]]
     ) -> Dict[str, float]:
         """计算各维度的加权平均分数"""
         dimension_scores: Dict[str, float] = {}
         
-        for dimension, score_weight_pairs in dim_scores.items():
-            if not score_weight_pairs:
+        for dimension, (total_weight, weighted_sum, score_sum, count) in dim_sums.items():
+            if not count:
                 continue
             
-            total_weight = sum(weight for _, weight in score_weight_pairs)
             if total_weight > 0:
-                weighted_sum = sum(score * weight for score, weight in score_weight_pairs)
                 dimension_scores[dimension] = weighted_sum / total_weight
             else:
                 # fallback
-                dimension_scores[dimension] = sum(score for score, _ in score_weight_pairs) / len(score_weight_pairs)
+                dimension_scores[dimension] = score_sum / count
         
         return dimension_scores
     
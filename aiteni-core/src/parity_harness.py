@@ -0,0 +1,545 @@
+"""
+新旧评估器的大规模对比（回归）工具
+
+在改动评分规则之前，找出哪些作答模式的展示等级会变化：
+- 答案来源：均匀随机、按目标等级分层（每题按选项 center_level 与目标等级的距离加权抽样），
+  或回放历史作答记录；
+- 两侧模型：ntrp_evaluator_old 的旧版评估器（legacy）或当前 NTRPEvaluator（current），
+  各自可以指定配置目录，因此也可用来比较同一模型的两份配置；
+- 答案以整数编码矩阵分块生成，在进程池中由两侧分别批量评分（旧版评估器的数值部分
+  也按列向量化，与逐条 evaluate 的累加顺序一致）；
+- 汇总等级迁移矩阵、原始等级差最大的样本，并对每种迁移贪心删除作答，
+  得到删去任一题都不再复现该迁移的最小样例。
+需要 NumPy。
+
+用法:
+    python parity_harness.py --samples 2000000
+    python parity_harness.py --mode stratified --baseline legacy --candidate current
+    python parity_harness.py --mode replay --history answers.jsonl
+    python parity_harness.py --baseline current:../config --candidate current:/tmp/new_config
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config_manager import ConfigManager
+from ntrp_evaluator import NTRPEvaluator
+from data_models import NTRPConstants
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+# 分层抽样：选项被选中的概率 ∝ exp(-(center_level - 目标等级)² / (2·σ²))
+STRATIFY_SIGMA = 0.75
+# 每块保留的最大等级差样本数
+TOP_DELTAS = 20
+
+# 问卷布局：[(问题ID, [选项ID, ...]), ...]
+Layout = List[Tuple[str, List[str]]]
+
+
+# =========================
+#  两侧模型
+# =========================
+
+class CurrentModel:
+    """当前 NTRPEvaluator（evaluate_many 批量路径）"""
+    
+    def __init__(self, config_dir: Optional[pathlib.Path] = None) -> None:
+        config_manager = ConfigManager(config_dir)
+        self.evaluator = NTRPEvaluator(
+            config_manager.load_questions(), config_manager.load_suggestions(), config_manager
+        )
+        self.layout: Layout = [(q.id, [o.id for o in q.options]) for q in self.evaluator.questions]
+        self.centers = [[o.center_level for o in q.options] for q in self.evaluator.questions]
+    
+    def score(self, codes):
+        """返回 (最终等级, 展示等级)；全空行的展示等级为 nan"""
+        answered = (codes >= 0).any(axis=1)
+        total = np.full(len(codes), np.nan)
+        rounded = np.full(len(codes), np.nan)
+        if answered.any():
+            result = self.evaluator.evaluate_many(codes[answered])
+            total[answered] = result.total_level
+            rounded[answered] = result.rounded_level
+        return total, rounded
+
+
+class LegacyModel:
+    """ntrp_evaluator_old 的旧版评估器（只对比数值部分：支持度期望 + 硬性上限）"""
+    
+    def __init__(self, config_dir: Optional[pathlib.Path] = None, spread: float = 1.0) -> None:
+        import ntrp_evaluator_old
+        
+        config_dir = config_dir or ConfigManager().config_dir
+        legacy = ntrp_evaluator_old.NTRPEvaluator
+        self.evaluator = legacy(legacy.load_questions(config_dir / "questions.json"), {}, spread=spread)
+        self.layout: Layout = [(q.id, [o.id for o in q.options]) for q in self.evaluator.questions]
+        self.centers = [[o.center_level for o in q.options] for q in self.evaluator.questions]
+        
+        levels = legacy.LEVELS
+        self._levels = np.array(levels)
+        # 每列的查表数组，最后一行对应未作答（下标 -1）
+        self._tables = []
+        for q in self.evaluator.questions:
+            support = [
+                [legacy._membership(level, o.center_level, spread) * q.weight for level in levels]
+                for o in q.options
+            ] + [[0.0] * len(levels)]
+            caps = [o.hard_cap if o.hard_cap is not None else np.inf for o in q.options] + [np.inf]
+            self._tables.append((np.array(support), np.array(caps)))
+        self._fallback = levels[len(levels) // 2]
+        self._initial_cap = max(levels)
+    
+    def score(self, codes):
+        """返回 (等级, 展示等级)，与旧版 evaluate 的 total_level / rounded_level 逐位一致"""
+        n = len(codes)
+        support = np.zeros((n, len(self._levels)))
+        hard_cap = np.full(n, float(self._initial_cap))
+        for j, (t_support, t_cap) in enumerate(self._tables):
+            col = codes[:, j]
+            support += t_support[col]
+            np.minimum(hard_cap, t_cap[col], out=hard_cap)
+        total_support = np.zeros(n)
+        weighted = np.zeros(n)
+        for k, level in enumerate(self._levels):
+            total_support += support[:, k]
+            weighted += level * support[:, k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expectation = np.where(total_support > 0, weighted / total_support, self._fallback)
+        total = np.minimum(expectation, hard_cap)
+        return total, np.round(total * 2) / 2
+
+
+MODELS = {"current": CurrentModel, "legacy": LegacyModel}
+
+
+def build_model(spec: str):
+    """
+    按 "名称[:配置目录]" 创建模型
+    
+    Raises:
+        ValueError: 未知的模型名
+    """
+    name, _, config_dir = spec.partition(":")
+    if name not in MODELS:
+        raise ValueError(f"未知的模型: {name}（可选: {', '.join(MODELS)}）")
+    return MODELS[name](pathlib.Path(config_dir) if config_dir else None)
+
+
+def translate_codes(codes, source: Layout, target: Layout):
+    """
+    把 source 布局的答案编码转换到 target 布局（按问题ID和选项ID对应）
+    
+    target 中不存在的问题被丢弃，不存在的选项视为未作答。
+    """
+    if source == target:
+        return codes
+    out = np.full((len(codes), len(target)), -1, dtype=codes.dtype)
+    source_index = {qid: (j, options) for j, (qid, options) in enumerate(source)}
+    for j_target, (qid, target_options) in enumerate(target):
+        if qid not in source_index:
+            continue
+        j_source, source_options = source_index[qid]
+        position = {oid: k for k, oid in enumerate(target_options)}
+        lookup = np.array([position.get(oid, -1) for oid in source_options] + [-1])
+        out[:, j_target] = lookup[codes[:, j_source]]
+    return out
+
+
+# =========================
+#  答案生成
+# =========================
+
+def uniform_codes(layout: Layout, count: int, rng):
+    """每题均匀随机作答"""
+    return np.stack([rng.integers(0, len(options), count) for _, options in layout], axis=1)
+
+
+def stratified_codes(centers: List[List[float]], count: int, rng):
+    """
+    按目标等级分层抽样
+    
+    Returns:
+        (答案编码, 每行的目标等级)
+    """
+    targets = np.array(NTRPConstants.LEVELS[:-1])
+    strata = rng.integers(0, len(targets), count)
+    codes = np.empty((count, len(centers)), dtype=np.int64)
+    for j, option_centers in enumerate(centers):
+        c = np.array(option_centers)
+        weights = np.exp(-((c[None, :] - targets[:, None]) ** 2) / (2 * STRATIFY_SIGMA ** 2))
+        cumulative = np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+        u = rng.random(count)
+        codes[:, j] = np.minimum((u[:, None] > cumulative[strata]).sum(axis=1), len(c) - 1)
+    return codes, targets[strata]
+
+
+def load_history(path: pathlib.Path) -> List[Dict[str, str]]:
+    """
+    加载历史作答记录
+    
+    支持 JSON（列表，或 {"records"/"players": [...]}）和 JSON Lines（.jsonl），
+    每条记录为答案字典，或带 "answers" 字段的对象。
+    """
+    path = pathlib.Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            records = [json.loads(line) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get("records", data.get("players", []))
+            records = data
+    return [dict(r["answers"]) if isinstance(r, dict) and "answers" in r else r for r in records]
+
+
+def encode_history(records: Sequence, layout: Layout) -> Tuple[Any, int]:
+    """
+    把历史记录编码为整数矩阵
+    
+    Returns:
+        (答案编码, 被跳过的无效记录数)
+    """
+    column = {qid: (j, {oid: k for k, oid in enumerate(options)}) for j, (qid, options) in enumerate(layout)}
+    rows = []
+    skipped = 0
+    for answers in records:
+        codes = [-1] * len(layout)
+        try:
+            for qid, oid in answers.items():
+                j, options = column[qid]
+                codes[j] = options[oid]
+        except (AttributeError, KeyError, TypeError):
+            skipped += 1
+            continue
+        if max(codes) < 0:
+            skipped += 1
+            continue
+        rows.append(codes)
+    return np.array(rows, dtype=np.int64).reshape(len(rows), len(layout)), skipped
+
+
+# =========================
+#  工作进程
+# =========================
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(baseline: str, candidate: str) -> None:
+    _worker_state["baseline"] = build_model(baseline)
+    _worker_state["candidate"] = build_model(candidate)
+
+
+def _compare_chunk(task: Tuple[str, Any, int]) -> Dict[str, Any]:
+    mode, payload, seed = task
+    baseline = _worker_state["baseline"]
+    candidate = _worker_state["candidate"]
+    rng = np.random.default_rng(seed)
+    
+    strata = None
+    if mode == "uniform":
+        codes = uniform_codes(baseline.layout, payload, rng)
+    elif mode == "stratified":
+        codes, strata = stratified_codes(baseline.centers, payload, rng)
+    else:
+        codes = payload
+    return compare_codes(baseline, candidate, codes, strata)
+
+
+def compare_codes(baseline, candidate, codes, strata=None) -> Dict[str, Any]:
+    """
+    对一块答案编码做两侧评分并汇总
+    
+    Returns:
+        {"rows", "transitions": {(旧等级, 新等级): 次数}, "examples": {(旧, 新): 编码},
+         "top": [(|差|, 旧等级, 新等级, 编码), ...], "strata": {目标等级: (行数, 变化行数)}}
+    """
+    old_total, old_level = baseline.score(codes)
+    new_total, new_level = candidate.score(translate_codes(codes, baseline.layout, candidate.layout))
+    valid = ~(np.isnan(old_level) | np.isnan(new_level))
+    
+    keys = (old_level * 2).round().astype(np.int64) * 100 + (new_level * 2).round().astype(np.int64)
+    keys = np.where(valid, keys, -1)
+    unique, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    transitions: Dict[Tuple[float, float], int] = {}
+    examples: Dict[Tuple[float, float], List[int]] = {}
+    for key, index, count in zip(unique.tolist(), first.tolist(), counts.tolist()):
+        if key < 0:
+            continue
+        cell = (key // 100 / 2, key % 100 / 2)
+        transitions[cell] = count
+        if cell[0] != cell[1]:
+            examples[cell] = codes[index].tolist()
+    
+    delta = np.where(valid, np.abs(new_total - old_total), -1.0)
+    top_index = np.argsort(-delta, kind="stable")[:TOP_DELTAS]
+    top = [
+        (float(delta[i]), float(old_total[i]), float(new_total[i]), codes[i].tolist())
+        for i in top_index if delta[i] >= 0
+    ]
+    
+    stratum_stats: Dict[float, Tuple[int, int]] = {}
+    if strata is not None:
+        changed = valid & (old_level != new_level)
+        for level in np.unique(strata).tolist():
+            mask = strata == level
+            stratum_stats[level] = (int(mask.sum()), int(changed[mask].sum()))
+    
+    return {
+        "rows": int(valid.sum()),
+        "transitions": transitions,
+        "examples": examples,
+        "top": top,
+        "strata": stratum_stats,
+    }
+
+
+def _merge(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+    total["rows"] += part["rows"]
+    for cell, count in part["transitions"].items():
+        total["transitions"][cell] = total["transitions"].get(cell, 0) + count
+    for cell, codes in part["examples"].items():
+        total["examples"].setdefault(cell, codes)
+    total["top"] = sorted(total["top"] + part["top"], key=lambda t: -t[0])[:TOP_DELTAS]
+    for level, (rows, changed) in part["strata"].items():
+        r, c = total["strata"].get(level, (0, 0))
+        total["strata"][level] = (r + rows, c + changed)
+
+
+# =========================
+#  最小复现样例
+# =========================
+
+def minimize_example(baseline, candidate, codes: List[int], cell: Tuple[float, float]) -> List[int]:
+    """
+    贪心删除作答，直到删去任何一题都不再得到同样的 (旧等级, 新等级) 迁移
+    
+    Returns:
+        最小化后的答案编码
+    """
+    current = list(codes)
+    changed = True
+    while changed:
+        changed = False
+        answered = [j for j, c in enumerate(current) if c >= 0]
+        if len(answered) <= 1:
+            break
+        # 一次性评估所有"删去一题"的候选
+        trials = np.array([current] * len(answered), dtype=np.int64)
+        for row, j in enumerate(answered):
+            trials[row, j] = -1
+        _, old_level = baseline.score(trials)
+        _, new_level = candidate.score(translate_codes(trials, baseline.layout, candidate.layout))
+        for row in range(len(answered)):
+            if old_level[row] == cell[0] and new_level[row] == cell[1]:
+                current = trials[row].tolist()
+                changed = True
+                break
+    return current
+
+
+def decode(codes: Sequence[int], layout: Layout) -> Dict[str, str]:
+    """答案编码 → 答案字典"""
+    return {layout[j][0]: layout[j][1][c] for j, c in enumerate(codes) if c >= 0}
+
+
+# =========================
+#  主流程
+# =========================
+
+def run_comparison(
+    baseline: str = "legacy",
+    candidate: str = "current",
+    mode: str = "uniform",
+    samples: int = 1_000_000,
+    history: Optional[pathlib.Path] = None,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = 50_000,
+    examples: int = 10,
+) -> Dict[str, Any]:
+    """
+    在进程池中比较两侧模型
+    
+    Args:
+        baseline / candidate: 模型规格 "名称[:配置目录]"
+        mode: uniform / stratified / replay
+        samples: 生成的答案数（replay 模式忽略）
+        history: replay 模式的历史作答文件
+        workers: 工作进程数，0 表示在当前进程内执行
+        seed: 随机种子
+        chunk_size: 每个任务的行数
+        examples: 最小化的迁移样例数（按迁移次数从多到少）
+    
+    Returns:
+        汇总报告（见 format_report）
+    
+    Raises:
+        ValueError: 未安装 NumPy、模型或模式未知、replay 缺少历史文件
+    """
+    if np is None:
+        raise ValueError("未安装 NumPy，无法运行对比工具")
+    if mode not in ("uniform", "stratified", "replay"):
+        raise ValueError(f"未知的答案来源: {mode}")
+    
+    start = time.perf_counter()
+    base_model = build_model(baseline)
+    candidate_model = build_model(candidate)
+    
+    skipped = 0
+    if mode == "replay":
+        if history is None:
+            raise ValueError("replay 模式需要指定历史作答文件")
+        codes, skipped = encode_history(load_history(history), base_model.layout)
+        tasks = [
+            (mode, codes[i:i + chunk_size], seed)
+            for i in range(0, len(codes), chunk_size)
+        ]
+    else:
+        tasks = []
+        remaining = samples
+        while remaining > 0:
+            count = min(chunk_size, remaining)
+            tasks.append((mode, count, seed * 1_000_003 + len(tasks)))
+            remaining -= count
+    
+    total: Dict[str, Any] = {"rows": 0, "transitions": {}, "examples": {}, "top": [], "strata": {}}
+    if workers == 0:
+        _init_worker(baseline, candidate)
+        for task in tasks:
+            _merge(total, _compare_chunk(task))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(baseline, candidate)
+        ) as pool:
+            for part in pool.map(_compare_chunk, tasks):
+                _merge(total, part)
+    compare_seconds = time.perf_counter() - start
+    
+    changed_cells = sorted(
+        (cell for cell in total["transitions"] if cell[0] != cell[1]),
+        key=lambda cell: -total["transitions"][cell],
+    )
+    minimal = []
+    for cell in changed_cells[:examples]:
+        codes = minimize_example(base_model, candidate_model, total["examples"][cell], cell)
+        minimal.append({
+            "transition": cell,
+            "count": total["transitions"][cell],
+            "answers": decode(codes, base_model.layout),
+        })
+    
+    return {
+        "baseline": baseline,
+        "candidate": candidate,
+        "mode": mode,
+        "rows": total["rows"],
+        "skipped": skipped,
+        "changed": sum(total["transitions"][cell] for cell in changed_cells),
+        "transitions": total["transitions"],
+        "largest_deltas": [
+            {"delta": d, "baseline_level": a, "candidate_level": b, "answers": decode(codes, base_model.layout)}
+            for d, a, b, codes in total["top"]
+        ],
+        "minimal_examples": minimal,
+        "strata": dict(sorted(total["strata"].items())),
+        "seconds": time.perf_counter() - start,
+        "compare_seconds": compare_seconds,
+    }
+
+
+def format_report(report: Dict[str, Any], show_deltas: int = 5) -> str:
+    """对比报告的文本形式"""
+    rows = report["rows"]
+    lines = [
+        f"{report['baseline']} → {report['candidate']}（{report['mode']}）："
+        f"{rows} 份答案，耗时 {report['compare_seconds']:.1f} 秒（{rows / max(report['compare_seconds'], 1e-9):,.0f} 份/秒）",
+    ]
+    if report["skipped"]:
+        lines.append(f"跳过无效历史记录 {report['skipped']} 条")
+    lines.append(f"展示等级变化 {report['changed']} 份（{report['changed'] / max(rows, 1):.2%}）")
+    lines.append("")
+    
+    transitions = report["transitions"]
+    old_levels = sorted({a for a, _ in transitions})
+    new_levels = sorted({b for _, b in transitions})
+    lines.append("等级迁移矩阵（行：旧等级，列：新等级）")
+    lines.append(f"{'':>6}" + "".join(f"{b:>9.1f}" for b in new_levels))
+    for a in old_levels:
+        lines.append(f"{a:>6.1f}" + "".join(f"{transitions.get((a, b), 0):>9}" for b in new_levels))
+    
+    if report["strata"]:
+        lines.append("")
+        lines.append("按目标等级分层：")
+        for level, (n, changed) in report["strata"].items():
+            lines.append(f"  {level:>4.1f}  {n:>9} 份，变化 {changed / max(n, 1):>7.2%}")
+    
+    if report["largest_deltas"]:
+        lines.append("")
+        lines.append("等级差最大的样本：")
+        for item in report["largest_deltas"][:show_deltas]:
+            lines.append(
+                f"  {item['baseline_level']:.2f} → {item['candidate_level']:.2f}"
+                f"（差 {item['delta']:.2f}）{_format_answers(item['answers'])}"
+            )
+    
+    if report["minimal_examples"]:
+        lines.append("")
+        lines.append("最小复现样例：")
+        for item in report["minimal_examples"]:
+            a, b = item["transition"]
+            lines.append(f"  {a:.1f} → {b:.1f}（{item['count']} 份）{_format_answers(item['answers'])}")
+    return "\n".join(lines)
+
+
+def _format_answers(answers: Dict[str, str]) -> str:
+    return " ".join(f"{qid}={oid}" for qid, oid in answers.items())
+
+
+def _to_json(report: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(report)
+    data["transitions"] = [
+        {"baseline": a, "candidate": b, "count": n} for (a, b), n in sorted(report["transitions"].items())
+    ]
+    data["minimal_examples"] = [dict(item, transition=list(item["transition"])) for item in report["minimal_examples"]]
+    data["strata"] = {str(level): {"rows": n, "changed": c} for level, (n, c) in report["strata"].items()}
+    return data
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="比较两个评估器（或两份配置）的展示等级")
+    parser.add_argument("--baseline", default="legacy", help="基准模型 名称[:配置目录]（legacy / current）")
+    parser.add_argument("--candidate", default="current", help="候选模型 名称[:配置目录]")
+    parser.add_argument("--mode", choices=["uniform", "stratified", "replay"], default="uniform")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--history", type=pathlib.Path, default=None, help="replay 模式的历史作答（JSON / JSON Lines）")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（0 表示单进程）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--examples", type=int, default=10, help="最小化的迁移样例数")
+    parser.add_argument("--json", type=pathlib.Path, default=None, help="把完整报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    report = run_comparison(
+        args.baseline, args.candidate, args.mode, args.samples, args.history,
+        args.workers, args.seed, args.chunk_size, args.examples,
+    )
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(_to_json(report), f, ensure_ascii=False, indent=2)
+        print(f"\n完整报告已写入 {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
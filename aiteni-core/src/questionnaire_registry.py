@@ -0,0 +1,348 @@
+"""
+多版本问卷注册表（A/B 实验）
+
+experiments.json 中的多个问卷版本（questions.json、questions-simple.json 等）同时驻留内存，
+请求按用户ID的稳定哈希分流到某个版本：
+- 网球知识、维度建议及其区间索引、评分/路由/实验配置与问卷无关，只加载一次，各版本共享同一份对象；
+- 各版本中字段完全相同的选项、问题和文本在内存中只保留一份（见 config_manager._intern_questions）；
+- 每个版本的 NTRPEvaluator 在注册表构造时编译一次，之后所有请求复用；
+- 用户分到哪个版本只取决于 (salt, 用户ID) 的 SHA-256，与进程、重启和请求顺序无关；
+  流量权重为 0 的版本照常加载，只能显式指定使用（例如回放或人工比对）；
+- 每个版本累计评估次数、耗时分位数和展示等级分布，可随时导出比较。
+
+用法:
+    registry = QuestionnaireRegistry(config_dir)
+    questions = registry.questions_for(user_id)     # 展示给该用户的问卷
+    result = registry.evaluate(user_id, answers)    # 用同一版本评估
+    registry.summary()
+    
+    python questionnaire_registry.py --users 5000
+"""
+
+import argparse
+import bisect
+import collections
+import dataclasses
+import hashlib
+import json
+import pathlib
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config_manager import ConfigManager
+from ntrp_evaluator import NTRPEvaluator
+from scoring_engines import LATENCY_SAMPLES, _percentile
+from data_models import EvaluationDetail, QuestionConfig, VersionStats
+
+# 分流桶数：流量比例的分辨率为 0.01%
+TRAFFIC_BUCKETS = 10000
+
+
+class _Version:
+    """已加载的问卷版本及其累计统计（统计由注册表的锁保护）"""
+    
+    __slots__ = (
+        "name", "questions_file", "traffic", "config_manager", "evaluator",
+        "calls", "errors", "total_ms", "max_ms", "recent_ms", "levels",
+    )
+    
+    def __init__(self, name: str, questions_file: str, traffic: float, config_manager: ConfigManager) -> None:
+        self.name = name
+        self.questions_file = questions_file
+        self.traffic = traffic
+        self.config_manager = config_manager
+        self.evaluator = NTRPEvaluator(config_manager.load_questions(), config_manager.load_suggestions(), config_manager)
+        self.reset()
+    
+    def reset(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent_ms: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.levels: Dict[float, int] = {}
+    
+    def record(self, elapsed_ms: float, level: float) -> None:
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent_ms.append(elapsed_ms)
+        self.levels[level] = self.levels.get(level, 0) + 1
+
+
+class QuestionnaireRegistry:
+    """多个问卷版本的注册表：共享不变的配置，按用户哈希分流，按版本统计"""
+    
+    def __init__(self, config_dir: Optional[pathlib.Path] = None, experiment: Optional[Dict[str, Any]] = None) -> None:
+        """
+        加载全部版本并编译各自的评估器
+        
+        Args:
+            config_dir: 配置目录
+            experiment: 实验配置（结构同 ConfigManager.load_experiment_config 的返回值），None 时读取 experiments.json
+        
+        Raises:
+            FileNotFoundError / ValueError: 配置文件缺失或格式错误，或实验配置中没有分到流量的版本
+        """
+        self.config_manager = ConfigManager(config_dir)
+        if experiment is None:
+            experiment = self.config_manager.load_experiment_config()
+        self.salt: str = experiment["salt"]
+        
+        versions = experiment["versions"]
+        total = sum(spec["traffic"] for spec in versions.values())
+        if not versions or total <= 0:
+            raise ValueError("问卷实验配置中没有分到流量的版本")
+        
+        # 同一问题文件只加载一次；所有版本共用一个对象池
+        self._pool: Dict[Any, Any] = {}
+        managers: Dict[str, ConfigManager] = {}
+        self._versions: Dict[str, _Version] = {}
+        for name, spec in versions.items():
+            questions_file = spec["questions"]
+            if questions_file not in managers:
+                managers[questions_file] = self.config_manager.with_questions(questions_file, self._pool)
+            self._versions[name] = _Version(name, questions_file, spec["traffic"] / total, managers[questions_file])
+        
+        # 各版本占用的分流桶区间上界（流量为 0 的版本不占桶）
+        self._bounds: List[int] = []
+        self._bucket_versions: List[str] = []
+        cumulative = 0.0
+        for name, spec in versions.items():
+            if spec["traffic"] > 0:
+                cumulative += spec["traffic"]
+                self._bounds.append(round(cumulative / total * TRAFFIC_BUCKETS))
+                self._bucket_versions.append(name)
+        self._bounds[-1] = TRAFFIC_BUCKETS
+        
+        self._lock = threading.Lock()
+    
+    @property
+    def versions(self) -> List[str]:
+        """全部版本名（配置顺序）"""
+        return list(self._versions)
+    
+    def bucket(self, user_id: str) -> int:
+        """用户所在的分流桶（0 ~ TRAFFIC_BUCKETS-1）"""
+        digest = hashlib.sha256(f"{self.salt}:{user_id}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % TRAFFIC_BUCKETS
+    
+    def assign(self, user_id: str) -> str:
+        """用户分到的版本名（同一 salt 下恒定）"""
+        return self._bucket_versions[bisect.bisect_right(self._bounds, self.bucket(user_id))]
+    
+    def _version(self, name: str) -> _Version:
+        version = self._versions.get(name)
+        if version is None:
+            raise ValueError(f"未知的问卷版本: {name}（可选: {', '.join(self._versions)}）")
+        return version
+    
+    def evaluator(self, version: str) -> NTRPEvaluator:
+        """
+        指定版本的评估器
+        
+        Raises:
+            ValueError: 未知的版本名
+        """
+        return self._version(version).evaluator
+    
+    def config_manager_for(self, version: str) -> ConfigManager:
+        """
+        指定版本的配置管理器
+        
+        Raises:
+            ValueError: 未知的版本名
+        """
+        return self._version(version).config_manager
+    
+    def questions_for(self, user_id: str, version: Optional[str] = None) -> List[QuestionConfig]:
+        """
+        用户应作答的问卷
+        
+        Args:
+            user_id: 用户ID
+            version: 显式指定的版本名，None 时按分流结果
+        """
+        return self._version(version or self.assign(user_id)).evaluator.questions
+    
+    def evaluate(
+        self,
+        user_id: str,
+        answers: Dict[str, str],
+        detail: EvaluationDetail = EvaluationDetail.FULL,
+        version: Optional[str] = None,
+    ) -> Any:
+        """
+        用用户所在版本的评估器评估，并记录该版本的耗时和展示等级
+        
+        Args:
+            user_id: 用户ID
+            answers: 答案字典
+            detail: 评估结果的详细程度
+            version: 显式指定的版本名，None 时按分流结果
+        
+        Returns:
+            评估结果（同 NTRPEvaluator.evaluate）
+        
+        Raises:
+            ValueError: 未知的版本名，或答案对该版本无效（计入该版本的 errors）
+        """
+        entry = self._version(version or self.assign(user_id))
+        start = time.perf_counter()
+        try:
+            result = entry.evaluator.evaluate(answers, detail)
+        except Exception:
+            with self._lock:
+                entry.errors += 1
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            entry.record(elapsed_ms, result.rounded_level)
+        return result
+    
+    # ---------- 统计 ----------
+    
+    def summary(self) -> Dict[str, VersionStats]:
+        """各版本的统计快照"""
+        with self._lock:
+            snapshot = {
+                name: (v.calls, v.errors, v.total_ms, v.max_ms, sorted(v.recent_ms), dict(v.levels))
+                for name, v in self._versions.items()
+            }
+        
+        stats: Dict[str, VersionStats] = {}
+        for name, (calls, errors, total_ms, max_ms, recent, levels) in snapshot.items():
+            version = self._versions[name]
+            stats[name] = VersionStats(
+                version=name,
+                questions_file=version.questions_file,
+                traffic=version.traffic,
+                calls=calls,
+                errors=errors,
+                mean_ms=total_ms / calls if calls else 0.0,
+                p50_ms=_percentile(recent, 0.50),
+                p95_ms=_percentile(recent, 0.95),
+                max_ms=max_ms,
+                mean_level=sum(level * n for level, n in levels.items()) / calls if calls else 0.0,
+                level_distribution=dict(sorted(levels.items())),
+            )
+        return stats
+    
+    def dump(self) -> str:
+        """统计快照的 JSON 文本"""
+        return json.dumps(
+            {name: dataclasses.asdict(s) for name, s in self.summary().items()},
+            ensure_ascii=False,
+            indent=2,
+        )
+    
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            for version in self._versions.values():
+                version.reset()
+    
+    def sharing(self) -> Dict[str, int]:
+        """
+        各版本问卷对象的去重情况
+        
+        Returns:
+            {'questions', 'unique_questions', 'options', 'unique_options'}（跨版本合计与实际对象数）
+        """
+        questions = [q for m in {id(v.config_manager): v.config_manager for v in self._versions.values()}.values()
+                     for q in m.load_questions()]
+        options = [o for q in questions for o in q.options]
+        return {
+            'questions': len(questions),
+            'unique_questions': len({id(q) for q in questions}),
+            'options': len(options),
+            'unique_options': len({id(o) for o in options}),
+        }
+
+
+# =========================
+#  模拟与内存对比
+# =========================
+
+def synthetic_answers(questions: List[QuestionConfig], rng: random.Random, noise: float = 0.5) -> Dict[str, str]:
+    """以随机目标等级作答：每题选中心等级最接近（目标等级 + 高斯噪声）的选项"""
+    target = rng.uniform(1.0, 6.0)
+    return {
+        q.id: min(q.options, key=lambda o: abs(o.center_level - target - rng.gauss(0.0, noise))).id
+        for q in questions
+    }
+
+
+def simulate(registry: QuestionnaireRegistry, users: int, seed: int = 0) -> Dict[str, VersionStats]:
+    """模拟 users 个用户按分流作答并评估，返回各版本统计"""
+    rng = random.Random(seed)
+    for i in range(users):
+        user_id = f"user-{i}"
+        registry.evaluate(user_id, synthetic_answers(registry.questions_for(user_id), rng), EvaluationDetail.LEVEL)
+    return registry.summary()
+
+
+def measure_memory(config_dir: Optional[pathlib.Path] = None) -> Tuple[float, float]:
+    """
+    比较注册表与各版本各自独立加载（每个版本一个 ConfigManager 和评估器）的内存占用
+    
+    Returns:
+        (注册表 KB, 独立加载 KB)
+    """
+    def allocated(build) -> float:
+        tracemalloc.start()
+        try:
+            kept = build()
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        del kept
+        return size / 1024
+    
+    def separate():
+        experiment = ConfigManager(config_dir).load_experiment_config()
+        kept = []
+        for spec in experiment["versions"].values():
+            manager = ConfigManager(config_dir, use_snapshot=False, questions_file=spec["questions"])
+            manager.load_all()
+            kept.append(NTRPEvaluator(manager.load_questions(), manager.load_suggestions(), manager))
+        return kept
+    
+    return allocated(lambda: QuestionnaireRegistry(config_dir)), allocated(separate)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="模拟问卷 A/B 实验的分流与各版本统计")
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出各版本统计")
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    registry = QuestionnaireRegistry(args.config_dir)
+    load_ms = (time.perf_counter() - start) * 1000
+    stats = simulate(registry, args.users, args.seed)
+    if args.json:
+        print(registry.dump())
+        return 0
+    
+    print(f"加载 {len(registry.versions)} 个问卷版本: {load_ms:.1f} ms")
+    sharing = registry.sharing()
+    print(f"问题对象 {sharing['unique_questions']}/{sharing['questions']}，选项对象 {sharing['unique_options']}/{sharing['options']}")
+    shared_kb, separate_kb = measure_memory(args.config_dir)
+    print(f"内存: 注册表 {shared_kb:.0f} KB，各版本独立加载 {separate_kb:.0f} KB")
+    print()
+    print(f"{'版本':<12}{'流量':>8}{'评估数':>8}{'p50 ms':>9}{'p95 ms':>9}{'平均等级':>10}  等级分布")
+    for s in stats.values():
+        distribution = " ".join(f"{level:.1f}:{n}" for level, n in s.level_distribution.items())
+        print(f"{s.version:<12}{s.traffic:>8.1%}{s.calls:>8}{s.p50_ms:>9.3f}{s.p95_ms:>9.3f}{s.mean_level:>10.2f}  {distribution}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
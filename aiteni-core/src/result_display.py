@@ -32,6 +32,9 @@ class ResultDisplay:
         # 卡片顶部 - 总体等级
         print(f"🎾 NTRP {result.rounded_level:.1f}")
         print(f"{result.level_label}")
+        posterior = result.posterior
+        if posterior is not None and posterior.credible_lower < posterior.credible_upper:
+            print(f"（很可能在 {posterior.credible_lower:.1f}–{posterior.credible_upper:.1f} 之间）")
         
         # 中部 - 能力雷达图概要
         print("\n📊 技术能力概览:")
@@ -0,0 +1,474 @@
+"""
+多阶段路由策略
+
+把交互式评估"先答基础题、初步等级达到 3.0 才问进阶题"的固定流程推广为 routing.json 中的声明式策略：
+- 策略由若干阶段组成，每个阶段是一批问题（按 tier 或显式问题ID列表），作答后一次提交；
+- 阶段按顺序询问，进入条件为当前等级（木桶效应调整后、未四舍五入）落在 [min_level, max_level)，
+  以及进入前的置信度未达到 skip_confidence；尚未作答任何问题时不检查进入条件；
+- 作答中置信度达到 stop_confidence 时提前结束本阶段；stop_when_decided 时，
+  按各后续阶段的进入条件推算出此后仍可能被询问的问题，这些问题都已无法改变展示等级时结束整个问卷
+  （进入条件依赖置信度或无法由等级上下界确定的阶段视为可能改变结果；等级上下界假定可达问题全部作答，
+  而设置了 stop_confidence 的阶段可能只答其中一部分，所以此类阶段仍有未答问题时也不提前结束）；
+- 置信度与 AdaptiveTest 相同：作答似然累乘得到等级后验，取后验在期望等级 ± tolerance 内的概率质量。
+模拟器在完整作答（历史记录，或按目标等级分层抽样的合成作答）上按策略重放，阶段内题序随机打乱
+（与 InteractiveUI 一致），统计平均作答题数、提交次数，以及与作答全部问题相比的展示等级误差。
+
+用法:
+    python routing_policy.py --samples 2000
+    python routing_policy.py --history answers.jsonl --policy two_stage,confident
+"""
+
+import argparse
+import math
+import pathlib
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config_manager import ConfigManager
+from ntrp_evaluator import NTRPEvaluator
+from evaluation_session import EvaluationSession
+from adaptive_testing import AdaptiveTest
+from data_models import (
+    EvaluationDetail, QuestionConfig, RoutingPolicy, RoutingSimulation, RoutingStage, round_to_half
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 为可选依赖
+    np = None
+
+
+# =========================
+#  策略配置
+# =========================
+
+def _threshold(spec: Dict[str, Any], key: str, low: float, high: float) -> Optional[float]:
+    value = spec.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise ValueError(f"路由阶段 {spec.get('name')} 的 {key} 必须是 {low}~{high} 之间的数值")
+    return float(value)
+
+
+def build_policy(name: str, spec: Dict[str, Any], questions: Sequence[QuestionConfig]) -> RoutingPolicy:
+    """
+    由 routing.json 中的一条策略配置构造 RoutingPolicy
+    
+    Args:
+        name: 策略名
+        spec: {"stages": [{"name", "title", "tier"（一个或多个分层）或 "questions", 阈值...}],
+                "stop_when_decided", "confidence_tolerance"}
+        questions: 问卷的问题列表
+    
+    Raises:
+        ValueError: 结构错误、问题ID不存在、同一问题出现在多个阶段或阈值越界
+    """
+    stages_spec = spec.get("stages") if isinstance(spec, dict) else None
+    if not isinstance(stages_spec, list) or not stages_spec:
+        raise ValueError(f"路由策略 {name} 至少需要一个阶段")
+    
+    question_ids = [q.id for q in questions]
+    seen: Dict[str, str] = {}
+    stages: List[RoutingStage] = []
+    for stage_spec in stages_spec:
+        if not isinstance(stage_spec, dict) or not stage_spec.get("name"):
+            raise ValueError(f"路由策略 {name} 的阶段必须是带 name 的对象")
+        stage_name = stage_spec["name"]
+        if ("tier" in stage_spec) == ("questions" in stage_spec):
+            raise ValueError(f"路由阶段 {stage_name} 必须且只能指定 tier 或 questions 之一")
+        
+        if "tier" in stage_spec:
+            tiers = stage_spec["tier"]
+            tiers = [tiers] if isinstance(tiers, str) else list(tiers)
+            ids = [q.id for q in questions if q.question_tier in tiers]
+        else:
+            ids = list(stage_spec["questions"])
+            unknown = [qid for qid in ids if qid not in question_ids]
+            if unknown:
+                raise ValueError(f"路由阶段 {stage_name} 包含不存在的问题: {', '.join(unknown)}")
+        for qid in ids:
+            if qid in seen:
+                raise ValueError(f"问题 {qid} 同时出现在路由阶段 {seen[qid]} 和 {stage_name}")
+            seen[qid] = stage_name
+        
+        stages.append(RoutingStage(
+            name=stage_name,
+            title=stage_spec.get("title", stage_name),
+            question_ids=ids,
+            min_level=_threshold(stage_spec, "min_level", 0.0, 10.0),
+            max_level=_threshold(stage_spec, "max_level", 0.0, 10.0),
+            skip_confidence=_threshold(stage_spec, "skip_confidence", 0.0, 1.0),
+            stop_confidence=_threshold(stage_spec, "stop_confidence", 0.0, 1.0),
+        ))
+    
+    return RoutingPolicy(
+        name=name,
+        stages=stages,
+        stop_when_decided=bool(spec.get("stop_when_decided", True)),
+        confidence_tolerance=float(spec.get("confidence_tolerance", 0.5)),
+    )
+
+
+def load_policies(config_manager: ConfigManager) -> Tuple[Dict[str, RoutingPolicy], str]:
+    """
+    加载 routing.json 中的全部策略
+    
+    Returns:
+        ({策略名: RoutingPolicy}, 默认策略名)
+    """
+    config = config_manager.load_routing_config()
+    questions = config_manager.load_questions()
+    policies = {name: build_policy(name, spec, questions) for name, spec in config["policies"].items()}
+    return policies, config["default_policy"]
+
+
+# =========================
+#  策略执行
+# =========================
+
+class RoutingRunner:
+    """某个评估器上编译好的路由策略，每位用户用 start() 开始一次作答"""
+    
+    def __init__(self, evaluator, policy: RoutingPolicy) -> None:
+        self.evaluator = evaluator
+        self.policy = policy
+        self._levels = evaluator._levels
+        self._questions = evaluator._question_dict
+        
+        # 只有用到置信度的策略才需要作答似然（与 AdaptiveTest 相同的对数似然表）
+        uses_confidence = any(
+            stage.skip_confidence is not None or stage.stop_confidence is not None
+            for stage in policy.stages
+        )
+        self._log_likelihood = AdaptiveTest(evaluator)._log_likelihood if uses_confidence else None
+    
+    def start(self) -> "RoutingRun":
+        """开始一次新的作答"""
+        return RoutingRun(self)
+
+
+class RoutingRun:
+    """一位用户按路由策略作答的过程"""
+    
+    def __init__(self, runner: RoutingRunner) -> None:
+        self.runner = runner
+        self.policy = runner.policy
+        self.session = EvaluationSession(runner.evaluator)
+        self.entered: List[str] = []                   # 进入过的阶段名
+        self.skipped: List[Tuple[str, str]] = []       # (阶段名, 原因：decided / level / confidence / answered)
+        self.decided = False
+        self.finished = False
+        self._stage_index = -1
+        self._pending: List[str] = []
+        self._log_posterior = [0.0] * len(runner._levels) if runner._log_likelihood is not None else None
+    
+    @property
+    def answers(self) -> Dict[str, str]:
+        """当前已作答的答案（副本）"""
+        return self.session.answers
+    
+    @property
+    def stage(self) -> Optional[RoutingStage]:
+        """当前阶段"""
+        if self._stage_index < 0 or self.finished:
+            return None
+        return self.policy.stages[self._stage_index]
+    
+    def pending_questions(self) -> List[QuestionConfig]:
+        """当前阶段尚未作答的问题"""
+        return [self.runner._questions[qid] for qid in self._pending]
+    
+    def next_stage(self) -> Optional[RoutingStage]:
+        """
+        结束当前阶段，进入下一个满足进入条件的阶段
+        
+        Returns:
+            下一个阶段；没有需要询问的阶段时返回 None
+        """
+        if self.finished:
+            return None
+        
+        stages = self.policy.stages
+        for index in range(self._stage_index + 1, len(stages)):
+            stage = stages[index]
+            reason = self._skip_reason(stage)
+            if reason is not None:
+                self.skipped.append((stage.name, reason))
+                continue
+            self._stage_index = index
+            self._pending = [qid for qid in stage.question_ids if qid not in self.session]
+            self.entered.append(stage.name)
+            return stage
+        
+        self.finished = True
+        self._pending = []
+        return None
+    
+    def answer(self, question_id: str, option_id: str) -> bool:
+        """
+        记录当前阶段一道题的答案（重复作答时替换原答案）
+        
+        Returns:
+            是否应结束当前阶段（结果已确定时 next_stage 不再进入任何阶段）
+        
+        Raises:
+            ValueError: 问题或选项不存在
+        """
+        previous = self.session.answers.get(question_id) if question_id in self.session else None
+        self.session.answer(question_id, option_id)
+        if self._log_posterior is not None:
+            log_likelihood = self.runner._log_likelihood[question_id]
+            if previous is not None:
+                for i, value in enumerate(log_likelihood[previous]):
+                    self._log_posterior[i] -= value
+            for i, value in enumerate(log_likelihood[option_id]):
+                self._log_posterior[i] += value
+        if question_id in self._pending:
+            self._pending.remove(question_id)
+        
+        if self.policy.stop_when_decided and self._is_decided():
+            self.decided = True
+            return True
+        stage = self.stage
+        return (
+            stage is not None
+            and stage.stop_confidence is not None
+            and self.confidence() >= stage.stop_confidence
+        )
+    
+    def confidence(self) -> float:
+        """后验在期望等级 ± confidence_tolerance 内的概率质量（同 AdaptiveTest.confidence）"""
+        if self._log_posterior is None:
+            raise ValueError(f"路由策略 {self.policy.name} 未使用置信度")
+        peak = max(self._log_posterior)
+        weights = [math.exp(value - peak) for value in self._log_posterior]
+        total = sum(weights)
+        levels = self.runner._levels
+        center = sum(level * w for level, w in zip(levels, weights)) / total
+        limit = self.policy.confidence_tolerance + 1e-9
+        return sum(w for level, w in zip(levels, weights) if abs(level - center) <= limit) / total
+    
+    def result(self, detail: EvaluationDetail = EvaluationDetail.FULL):
+        """
+        按已作答的问题生成评估结果
+        
+        Raises:
+            ValueError: 尚未作答任何问题
+        """
+        return self.session.snapshot(detail)
+    
+    def _skip_reason(self, stage: RoutingStage) -> Optional[str]:
+        if self.decided:
+            return "decided"
+        if all(qid in self.session for qid in stage.question_ids):
+            return "answered"
+        if not len(self.session):
+            return None
+        
+        level = self.session.current_level()
+        if stage.min_level is not None and level < stage.min_level:
+            return "level"
+        if stage.max_level is not None and level >= stage.max_level:
+            return "level"
+        if stage.skip_confidence is not None and self.confidence() >= stage.skip_confidence:
+            return "confidence"
+        return None
+    
+    def _is_decided(self) -> bool:
+        """
+        此后仍可能被询问的问题是否都已无法改变展示等级
+        
+        从当前阶段的剩余问题出发，逐个后续阶段用已可达问题的等级上下界判断进入条件：
+        一定不满足则该阶段不会被询问，一定满足则把它的问题加入可达集合，无法确定时视为未确定。
+        上下界只覆盖可达问题全部作答的情形，可能因 stop_confidence 只答一部分的阶段视为未确定。
+        另外要求当前已作答部分的展示等级与确定值相同，提前结束后的报告才与完整作答一致。
+        """
+        session = self.session
+        reachable = list(self._pending)
+        if reachable and self.stage.stop_confidence is not None:
+            return False
+        for stage in self.policy.stages[self._stage_index + 1:]:
+            questions = [qid for qid in stage.question_ids if qid not in session]
+            if not questions:
+                continue
+            if stage.min_level is not None or stage.max_level is not None:
+                bounds = session.level_bounds(reachable)
+                if stage.min_level is not None and bounds.upper_level < stage.min_level:
+                    continue
+                if stage.max_level is not None and bounds.lower_level >= stage.max_level:
+                    continue
+                if stage.min_level is not None and bounds.lower_level < stage.min_level:
+                    return False
+                if stage.max_level is not None and bounds.upper_level >= stage.max_level:
+                    return False
+            if stage.skip_confidence is not None or stage.stop_confidence is not None:
+                return False
+            reachable.extend(questions)
+        
+        bounds = session.level_bounds(reachable)
+        return bounds.decided and round_to_half(session.current_level()) == bounds.rounded_lower
+
+
+# =========================
+#  模拟
+# =========================
+
+def replay(run: RoutingRun, answers: Dict[str, str], rng: random.Random) -> RoutingRun:
+    """按策略重放一份完整作答（阶段内题序随机，答案中缺少的问题视为跳过）"""
+    stage = run.next_stage()
+    while stage is not None:
+        order = [q.id for q in run.pending_questions() if q.id in answers]
+        rng.shuffle(order)
+        for qid in order:
+            if run.answer(qid, answers[qid]):
+                break
+        stage = run.next_stage()
+    return run
+
+
+def simulate(runner: RoutingRunner, answer_sets: Sequence[Dict[str, str]], seed: int = 0) -> RoutingSimulation:
+    """
+    在一组作答上模拟路由策略
+    
+    Args:
+        runner: 编译好的路由策略
+        answer_sets: 答案字典列表（视为用户对全部问题的真实作答）
+        seed: 阶段内题序的随机种子
+    
+    Returns:
+        与作答全部问题相比的模拟结果（策略下一题未答的作答不计入）
+    """
+    rng = random.Random(seed)
+    evaluator = runner.evaluator
+    questions = stages = respondents = exact = within = 0
+    abs_errors = 0.0
+    max_error = 0.0
+    stage_counts = {stage.name: 0 for stage in runner.policy.stages}
+    
+    for answers in answer_sets:
+        run = replay(runner.start(), answers, rng)
+        if not len(run.session):
+            continue
+        full = evaluator.evaluate(answers, EvaluationDetail.LEVEL).rounded_level
+        error = abs(run.result(EvaluationDetail.LEVEL).rounded_level - full)
+        respondents += 1
+        questions += len(run.session)
+        stages += len(run.entered)
+        exact += error == 0
+        within += error <= 0.5
+        abs_errors += error
+        max_error = max(max_error, error)
+        for name in run.entered:
+            stage_counts[name] += 1
+    
+    n = max(respondents, 1)
+    return RoutingSimulation(
+        policy=runner.policy.name,
+        respondents=respondents,
+        mean_questions=questions / n,
+        mean_stages=stages / n,
+        exact_rate=exact / n,
+        within_half_rate=within / n,
+        mean_abs_error=abs_errors / n,
+        max_abs_error=max_error,
+        stage_rates={name: count / n for name, count in stage_counts.items()},
+    )
+
+
+def synthetic_answers(evaluator, count: int, seed: int = 0) -> List[Dict[str, str]]:
+    """
+    按目标等级分层抽样的完整作答（同 parity_harness 的 stratified 模式）
+    
+    Raises:
+        ValueError: 未安装 NumPy
+    """
+    if np is None:
+        raise ValueError("未安装 NumPy，无法生成合成作答，请指定历史作答文件")
+    from parity_harness import stratified_codes
+    
+    questions = evaluator.questions
+    centers = [[o.center_level for o in q.options] for q in questions]
+    codes, _ = stratified_codes(centers, count, np.random.default_rng(seed))
+    return [
+        {q.id: q.options[c].id for q, c in zip(questions, row)}
+        for row in codes.tolist()
+    ]
+
+
+def run_simulation(
+    config_dir: Optional[pathlib.Path] = None,
+    policies: Optional[Sequence[str]] = None,
+    history: Optional[pathlib.Path] = None,
+    samples: int = 2000,
+    seed: int = 0,
+) -> Tuple[List[RoutingSimulation], int, float]:
+    """
+    在历史作答或合成作答上比较 routing.json 中的策略
+    
+    Args:
+        config_dir: 配置目录
+        policies: 要比较的策略名，None 表示全部
+        history: 历史作答文件（JSON / JSON Lines），None 时生成 samples 份合成作答
+        samples: 合成作答数
+        seed: 随机种子
+    
+    Returns:
+        (各策略的模拟结果, 作答数, 耗时秒数)；历史作答中校验失败的记录被丢弃
+    
+    Raises:
+        ValueError: 策略不存在，或无历史文件且未安装 NumPy
+    """
+    start = time.perf_counter()
+    config_manager = ConfigManager(config_dir)
+    evaluator = NTRPEvaluator(config_manager.load_questions(), config_manager.load_suggestions(), config_manager)
+    available, _ = load_policies(config_manager)
+    names = list(policies) if policies else list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"未知的路由策略: {', '.join(unknown)}")
+    
+    if history is not None:
+        from parity_harness import load_history
+        answer_sets = [a for a in load_history(history) if evaluator.validate_answers(a).ok]
+    else:
+        answer_sets = synthetic_answers(evaluator, samples, seed)
+    
+    results = [simulate(RoutingRunner(evaluator, available[name]), answer_sets, seed) for name in names]
+    return results, len(answer_sets), time.perf_counter() - start
+
+
+def format_report(results: Sequence[RoutingSimulation], respondents: int, seconds: float) -> str:
+    """模拟结果的文本形式"""
+    lines = [
+        f"{respondents} 份作答，耗时 {seconds:.1f} 秒",
+        "",
+        f"{'策略':<20}{'平均题数':>8}{'提交次数':>8}{'等级一致':>8}{'±0.5':>8}{'平均误差':>8}{'最大误差':>8}",
+    ]
+    for r in results:
+        lines.append(
+            f"{r.policy:<22}{r.mean_questions:>10.2f}{r.mean_stages:>12.2f}{r.exact_rate:>12.1%}"
+            f"{r.within_half_rate:>8.1%}{r.mean_abs_error:>12.3f}{r.max_abs_error:>12.1f}"
+        )
+        lines.append("    进入阶段：" + "  ".join(f"{name} {rate:.0%}" for name, rate in r.stage_rates.items()))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="模拟 routing.json 中路由策略的作答题数与等级准确率")
+    parser.add_argument("--config-dir", type=pathlib.Path, default=None)
+    parser.add_argument("--policy", default=None, help="逗号分隔的策略名（默认全部）")
+    parser.add_argument("--history", type=pathlib.Path, default=None, help="历史作答（JSON / JSON Lines），默认生成合成作答")
+    parser.add_argument("--samples", type=int, default=2000, help="合成作答数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    
+    policies = [name.strip() for name in args.policy.split(",") if name.strip()] if args.policy else None
+    print(format_report(*run_simulation(args.config_dir, policies, args.history, args.samples, args.seed)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+"""
+评分引擎注册表与影子执行
+
+把评分模型抽象为 ScoringEngine，由 EngineRegistry 统一管理：
+- 主引擎在调用线程中同步计算，结果直接返回给调用方；已有增量评估会话时（交互式和自适应流程），
+  主引擎可以直接复用会话状态（见 ScoringEngine.evaluate_session），不必从头重新计算；
+- 影子引擎（候选模型、旧版评估器等）由后台线程计算：请求线程只把 (答案, 主引擎等级, 耗时)
+  非阻塞地放进有界队列（queue.Queue(maxsize=max_pending)），不复制答案；
+  队列已满或注册表已关闭时直接放弃本次影子计算并计数；
+- 每个引擎的耗时、异常次数，以及影子引擎与主引擎展示等级的差异，
+  累积在内存中的紧凑统计里（耗时只保留最近若干样本用于分位数），可随时导出。
+"""
+
+import collections
+import dataclasses
+import json
+import pathlib
+import queue
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from data_models import EngineStats, EvaluationDetail, round_to_half
+from irt_engine import IRTModel
+
+# 每个引擎保留的最近耗时样本数
+LATENCY_SAMPLES = 1024
+
+
+class ScoringEngine(ABC):
+    """评分引擎接口"""
+    
+    name: str = ""
+    
+    @abstractmethod
+    def evaluate(self, answers: Dict[str, str]) -> Any:
+        """完整评估（作为主引擎时返回给调用方的结果）"""
+    
+    def evaluate_session(self, session) -> Any:
+        """
+        对一个增量评估会话的当前答案做完整评估
+        
+        默认按会话的答案从头评估；能复用会话累积状态的引擎应覆盖此方法。
+        """
+        return self.evaluate(session.answers)
+    
+    def level(self, answers: Dict[str, str]) -> float:
+        """展示等级（影子比对使用，引擎可提供更轻量的实现）"""
+        return self.evaluate(answers).rounded_level
+
+
+class NTRPEngine(ScoringEngine):
+    """当前的 NTRPEvaluator"""
+    
+    name = "ntrp"
+    
+    def __init__(self, evaluator) -> None:
+        self.evaluator = evaluator
+    
+    def evaluate(self, answers: Dict[str, str]) -> Any:
+        return self.evaluator.evaluate(answers)
+    
+    def evaluate_session(self, session) -> Any:
+        # 同一评估器的会话已累积好支持度和维度状态，只需生成完整结果
+        if session.evaluator is not self.evaluator:
+            return self.evaluate(session.answers)
+        return session.snapshot(EvaluationDetail.FULL)
+    
+    def level(self, answers: Dict[str, str]) -> float:
+        return self.evaluator.evaluate(answers, EvaluationDetail.LEVEL).rounded_level
+
+
+class LegacyEngine(ScoringEngine):
+    """ntrp_evaluator_old 中的旧版评估器（无锚点机制和木桶效应）"""
+    
+    name = "legacy"
+    
+    def __init__(self, config_dir: pathlib.Path, spread: float = 1.0) -> None:
+        import ntrp_evaluator_old
+        
+        legacy = ntrp_evaluator_old.NTRPEvaluator
+        self.evaluator = legacy(
+            legacy.load_questions(config_dir / "questions.json"),
+            legacy.load_suggestions(config_dir / "dimension_suggestions.json"),
+            spread=spread,
+        )
+    
+    def evaluate(self, answers: Dict[str, str]) -> Any:
+        return self.evaluator.evaluate(answers)
+
+
+class IRTEngine(ScoringEngine):
+    """
+    分级反应 IRT 模型（见 irt_engine）
+    
+    等级和维度分数取后验期望；硬性上限、木桶效应、评语和图表沿用 NTRPEvaluator 的规则，
+    输出与主评估器相同的结果结构。
+    """
+    
+    name = "irt"
+    
+    def __init__(self, evaluator, model: IRTModel) -> None:
+        self.evaluator = evaluator
+        self.model = model
+    
+    @classmethod
+    def from_config(cls, config_manager, evaluator, primary: bool = False) -> "IRTEngine":
+        """
+        按 scoring.json 的 irt.parameters 加载拟合参数
+        
+        参数文件不存在时：作为主引擎直接报错（不能用未拟合的模型服务请求）；
+        作为影子引擎时发出 RuntimeWarning，并用由配置推出的初始参数比对。
+        
+        Args:
+            primary: 是否作为主引擎
+        
+        Raises:
+            ValueError: 参数文件格式错误或与问卷不一致，或作为主引擎时参数文件不存在
+        """
+        settings = config_manager.load_scoring_config()["irt"]
+        path = config_manager.config_dir / settings["parameters"]
+        if path.exists():
+            model = IRTModel.load(path, evaluator.questions)
+        elif primary:
+            raise ValueError(f"IRT 参数文件不存在: {path}（设为主引擎前先用 irt_engine.py 拟合参数）")
+        else:
+            warnings.warn(f"IRT 参数文件不存在: {path}，影子比对使用未拟合的初始参数", RuntimeWarning)
+            model = IRTModel(evaluator.questions)
+        return cls(evaluator, model)
+    
+    def evaluate(self, answers: Dict[str, str], detail: EvaluationDetail = EvaluationDetail.FULL) -> Any:
+        level, dimension_scores, support, hard_cap = self.model.score(answers)
+        base_level = min(level, hard_cap)
+        barrel_stats = self.evaluator._compute_barrel_effect(dimension_scores, base_level)
+        return self.evaluator._build_result(support, base_level, dimension_scores, barrel_stats, detail)
+    
+    def level(self, answers: Dict[str, str]) -> float:
+        return self.evaluate(answers, EvaluationDetail.LEVEL).rounded_level
+
+
+# 可按名称创建的引擎：{名称: factory(config_manager, evaluator, primary)}
+ENGINE_FACTORIES: Dict[str, Callable[[Any, Any, bool], ScoringEngine]] = {
+    NTRPEngine.name: lambda config_manager, evaluator, primary: NTRPEngine(evaluator),
+    LegacyEngine.name: lambda config_manager, evaluator, primary: LegacyEngine(config_manager.config_dir),
+    IRTEngine.name: IRTEngine.from_config,
+}
+
+
+def create_engine(name: str, config_manager, evaluator, primary: bool = False) -> ScoringEngine:
+    """
+    按名称创建引擎
+    
+    Args:
+        primary: 是否作为主引擎（部分引擎对主引擎有更严格的要求，见 IRTEngine.from_config）
+    
+    Raises:
+        ValueError: 未知的引擎名，或引擎无法按要求创建
+    """
+    factory = ENGINE_FACTORIES.get(name)
+    if factory is None:
+        raise ValueError(f"未知的评分引擎: {name}（可选: {', '.join(ENGINE_FACTORIES)}）")
+    return factory(config_manager, evaluator, primary)
+
+
+def build_registry(config_manager, evaluator, extra_shadows: Sequence[str] = ()) -> "EngineRegistry":
+    """
+    按 scoring.json 组建评分引擎注册表（evaluator 始终注册为 ntrp）
+    
+    Args:
+        config_manager: 配置管理器
+        evaluator: 该配置编译的 NTRPEvaluator
+        extra_shadows: 在 scoring.json 之外追加的影子引擎名
+    
+    Raises:
+        ValueError: 未知的引擎名，或引擎参数与问卷不一致
+    """
+    scoring = config_manager.load_scoring_config()
+    primary = scoring["primary_engine"]
+    shadows = [name for name in dict.fromkeys(list(scoring["shadow_engines"]) + list(extra_shadows)) if name != primary]
+    
+    engines = {NTRPEngine.name: NTRPEngine(evaluator)}
+    for name in [primary] + shadows:
+        if name not in engines:
+            engines[name] = create_engine(name, config_manager, evaluator, primary=(name == primary))
+    
+    registry = EngineRegistry()
+    for name, engine in engines.items():
+        registry.register(engine, primary=(name == primary))
+    registry.set_shadows(shadows)
+    return registry
+
+
+class _EngineCounters:
+    """单个引擎的累计统计（由注册表的锁保护，正常路径上只有影子线程写入）"""
+    
+    __slots__ = ("calls", "errors", "dropped", "total_ms", "max_ms", "recent_ms", "disagreements", "level_deltas")
+    
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.dropped = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent_ms: Deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.disagreements = 0
+        self.level_deltas: Dict[float, int] = {}
+    
+    def record(self, elapsed_ms: float) -> None:
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent_ms.append(elapsed_ms)
+
+
+class EngineRegistry:
+    """
+    评分引擎注册表：主引擎同步服务，影子引擎后台比对
+    
+    有影子引擎时，请求线程在主引擎返回后取一次锁，检查注册表未关闭后做一次 put_nowait；
+    入队与 shutdown 放入结束标记由同一把锁排序，已入队的比对一定在结束标记之前被处理。
+    主引擎的耗时统计随队列交给影子线程记录，队列已满或已关闭时由请求线程直接计数。
+    """
+    
+    def __init__(self, max_workers: int = 1, max_pending: int = 256) -> None:
+        """
+        Args:
+            max_workers: 影子线程数（纯 Python 引擎受 GIL 限制，多线程并不能并行计算）
+            max_pending: 等待比对的请求上限，超过时放弃新请求的影子比对
+        
+        Raises:
+            ValueError: max_pending 小于 1（queue.Queue 的 maxsize=0 表示不设上限）
+        """
+        if max_pending < 1:
+            raise ValueError(f"max_pending 必须至少为 1: {max_pending}")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._engines: Dict[str, ScoringEngine] = {}
+        self._primary: Optional[str] = None
+        self._shadows: List[str] = []
+        self._counters: Dict[str, _EngineCounters] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+    
+    # ---------- 注册与配置 ----------
+    
+    def register(self, engine: ScoringEngine, primary: bool = False, shadow: bool = False) -> None:
+        """
+        注册引擎（同名引擎会被替换）
+        
+        Args:
+            engine: 引擎实例
+            primary: 是否设为主引擎
+            shadow: 是否加入影子引擎
+        """
+        self._engines[engine.name] = engine
+        if primary or self._primary is None:
+            self.set_primary(engine.name)
+        if shadow:
+            self.set_shadows(self._shadows + [engine.name])
+    
+    def set_primary(self, name: str) -> None:
+        """
+        设置主引擎（同名的影子引擎会被移除）
+        
+        Raises:
+            ValueError: 引擎未注册
+        """
+        self._require(name)
+        self._primary = name
+        self._shadows = [s for s in self._shadows if s != name]
+    
+    def set_shadows(self, names: Sequence[str]) -> None:
+        """
+        设置影子引擎列表（主引擎不会作为影子运行）
+        
+        Raises:
+            ValueError: 引擎未注册
+        """
+        for name in names:
+            self._require(name)
+        self._shadows = list(dict.fromkeys(n for n in names if n != self._primary))
+    
+    @property
+    def engines(self) -> List[str]:
+        """已注册的引擎名"""
+        return list(self._engines)
+    
+    @property
+    def primary(self) -> Optional[str]:
+        return self._primary
+    
+    @property
+    def shadows(self) -> List[str]:
+        return list(self._shadows)
+    
+    def _require(self, name: str) -> None:
+        if name not in self._engines:
+            raise ValueError(f"评分引擎未注册: {name}")
+    
+    # ---------- 评估 ----------
+    
+    def evaluate(self, answers: Dict[str, str]) -> Any:
+        """
+        用主引擎评估，并把影子比对放进后台队列
+        
+        影子线程稍后才读取 answers（不复制），调用方在返回后不应再修改它。
+        
+        Returns:
+            主引擎的评估结果
+        
+        Raises:
+            RuntimeError: 没有注册任何引擎
+            主引擎抛出的异常原样抛出（影子引擎的异常只计数）
+        """
+        return self._serve(answers, lambda engine: engine.evaluate(answers))
+    
+    def evaluate_session(self, session) -> Any:
+        """
+        用主引擎评估一个增量评估会话（主引擎复用会话状态），影子引擎按会话答案的副本在后台比对
+        
+        Returns:
+            主引擎的评估结果
+        
+        Raises:
+            RuntimeError: 没有注册任何引擎
+            主引擎抛出的异常原样抛出（影子引擎的异常只计数）
+        """
+        return self._serve(session.answers, lambda engine: engine.evaluate_session(session))
+    
+    def _serve(self, answers: Dict[str, str], call: Callable[[ScoringEngine], Any]) -> Any:
+        if self._primary is None:
+            raise RuntimeError("没有注册评分引擎")
+        name = self._primary
+        start = time.perf_counter()
+        try:
+            result = call(self._engines[name])
+        except Exception:
+            self._record_error(name)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        
+        if not self._shadows:
+            self._record(name, elapsed_ms)
+            return result
+        item = (answers, result.rounded_level, elapsed_ms, name, self._shadows)
+        with self._lock:
+            if not self._closed:
+                if not self._workers:
+                    self._start_workers()
+                try:
+                    self._queue.put_nowait(item)
+                    return result
+                except queue.Full:
+                    pass
+            # 已关闭（例如热更新后被替换）或积压已满：放弃本次影子比对
+            self._drop(item)
+        return result
+    
+    def _start_workers(self) -> None:
+        # 首次比对时启动影子线程（调用方持有 self._lock）
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._drain, name=f"shadow-engine-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+    
+    def _drop(self, item: tuple) -> None:
+        # 调用方持有 self._lock
+        _, _, primary_ms, primary, shadows = item
+        self._counter(primary).record(primary_ms)
+        for name in shadows:
+            self._counter(name).dropped += 1
+    
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:  # shutdown 放入的结束标记
+                    return
+                self._compare(*item)
+            finally:
+                self._queue.task_done()
+    
+    def _compare(
+        self, answers: Dict[str, str], primary_level: float, primary_ms: float, primary: str, shadows: Sequence[str]
+    ) -> None:
+        outcomes = []
+        for name in shadows:
+            start = time.perf_counter()
+            try:
+                level = self._engines[name].level(answers)
+            except Exception:
+                outcomes.append((name, None, 0.0))
+                continue
+            outcomes.append((name, round_to_half(level) - primary_level, (time.perf_counter() - start) * 1000.0))
+        
+        with self._lock:
+            self._counter(primary).record(primary_ms)
+            for name, delta, elapsed_ms in outcomes:
+                counter = self._counter(name)
+                if delta is None:
+                    counter.errors += 1
+                    continue
+                counter.record(elapsed_ms)
+                if delta:
+                    counter.disagreements += 1
+                    counter.level_deltas[delta] = counter.level_deltas.get(delta, 0) + 1
+    
+    def _counter(self, name: str) -> _EngineCounters:
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = _EngineCounters()
+        return counter
+    
+    def _record(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._counter(name).record(elapsed_ms)
+    
+    def _record_error(self, name: str) -> None:
+        with self._lock:
+            self._counter(name).errors += 1
+    
+    # ---------- 统计 ----------
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的影子比对完成（测试和导出前使用）
+        
+        Returns:
+            是否在超时前全部完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = self._queue.all_tasks_done
+        with done:
+            while self._queue.unfinished_tasks:
+                if not any(worker.is_alive() for worker in self._workers):
+                    return True  # 已关闭且影子线程已退出，剩余任务不会再执行
+                remaining = 0.05 if deadline is None else min(0.05, deadline - time.monotonic())
+                if remaining <= 0:
+                    return False
+                done.wait(remaining)
+        return True
+    
+    def summary(self) -> Dict[str, EngineStats]:
+        """各引擎的统计快照"""
+        with self._lock:
+            snapshot = {
+                name: (
+                    c.calls, c.errors, c.dropped, c.total_ms, c.max_ms,
+                    sorted(c.recent_ms), c.disagreements, dict(c.level_deltas),
+                )
+                for name, c in self._counters.items()
+            }
+        
+        stats: Dict[str, EngineStats] = {}
+        for name, (calls, errors, dropped, total_ms, max_ms, recent, disagreements, deltas) in snapshot.items():
+            stats[name] = EngineStats(
+                engine=name,
+                role="primary" if name == self._primary else "shadow",
+                calls=calls,
+                errors=errors,
+                dropped=dropped,
+                mean_ms=total_ms / calls if calls else 0.0,
+                p50_ms=_percentile(recent, 0.50),
+                p95_ms=_percentile(recent, 0.95),
+                max_ms=max_ms,
+                disagreements=disagreements,
+                level_deltas=dict(sorted(deltas.items())),
+            )
+        return stats
+    
+    def dump(self) -> str:
+        """统计快照的 JSON 文本"""
+        return json.dumps(
+            {name: dataclasses.asdict(s) for name, s in self.summary().items()},
+            ensure_ascii=False,
+            indent=2,
+        )
+    
+    def reset(self) -> None:
+        """清空统计"""
+        with self._lock:
+            self._counters.clear()
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """关闭影子线程（已入队的比对先做完，之后的影子比对直接放弃，主引擎仍可使用）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        # 此后不会再有新的比对入队；队列满时等影子线程腾出位置再放结束标记
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
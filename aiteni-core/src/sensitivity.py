@@ -0,0 +1,104 @@
+"""
+答案敏感度分析
+
+对一份答案，计算"只改一道题的答案"时每个备选选项对应的最终等级和木桶效应统计。
+基于 EvaluationSession 的累积状态做增量更新（减去原选项、加上新选项），
+不生成任何评语，整张矩阵的开销约等于几次普通评估。
+"""
+
+from typing import Dict
+
+from data_models import SensitivityEntry, round_to_half
+from evaluation_session import EvaluationSession
+
+
+def compute_sensitivity(evaluator, answers: Dict[str, str]) -> Dict[str, Dict[str, SensitivityEntry]]:
+    """
+    计算单题改答的敏感度矩阵
+    
+    Args:
+        evaluator: NTRPEvaluator 实例
+        answers: 当前答案字典
+    
+    Returns:
+        {问题ID: {备选选项ID: SensitivityEntry}}；已作答的问题列出除当前选项外的所有选项，
+        未作答的问题列出补答每个选项的结果
+    
+    Raises:
+        ValueError: 答案格式错误或包含无效选项
+    """
+    if not evaluator._validate_answers(answers):
+        raise ValueError("答案格式错误或包含无效选项")
+    
+    session = EvaluationSession(evaluator, answers)
+    _, _, _, current_stats = session._numbers()
+    current_level = current_stats['final_level']
+    current_rounded = round_to_half(current_level)
+    
+    levels = evaluator._levels
+    base_support = session._support
+    base_dim_sums = session._dim_sums
+    
+    matrix: Dict[str, Dict[str, SensitivityEntry]] = {}
+    for question in evaluator.questions:
+        old = session._compiled.get(question.id)
+        
+        # 去掉该题后的支持度和硬性上限
+        if old is None:
+            support_without = base_support
+            cap_without = session._hard_cap
+        else:
+            support_without = [b - o for b, o in zip(base_support, old.support)]
+            cap_without = min(
+                (c.hard_cap for q, c in session._compiled.items() if q != question.id),
+                default=float('inf')
+            )
+        
+        row: Dict[str, SensitivityEntry] = {}
+        for option in question.options:
+            if old is not None and option.id == old.option_id:
+                continue
+            new = evaluator._get_compiled_option(question.id, option.id)
+            
+            support = dict(zip(levels, [s + n for s, n in zip(support_without, new.support)]))
+            
+            # 只复制被改动的维度累积量
+            # （题数减到 0 的维度保留在原位，_compute_dimension_scores 会跳过它）
+            dim_sums = dict(base_dim_sums)
+            if old is not None:
+                sums = dim_sums[old.dimension]
+                dim_sums[old.dimension] = [
+                    sums[0] - old.weight,
+                    sums[1] - old.center_level * old.weight,
+                    sums[2] - old.center_level,
+                    sums[3] - 1,
+                ]
+            sums = dim_sums.get(new.dimension, [0.0, 0.0, 0.0, 0])
+            dim_sums[new.dimension] = [
+                sums[0] + new.weight,
+                sums[1] + new.center_level * new.weight,
+                sums[2] + new.center_level,
+                sums[3] + 1,
+            ]
+            
+            _, base_level, _, stats = evaluator._finish_numbers(
+                support, dim_sums, min(cap_without, new.hard_cap)
+            )
+            total_level = stats['final_level']
+            rounded_level = round_to_half(total_level)
+            row[option.id] = SensitivityEntry(
+                question_id=question.id,
+                option_id=option.id,
+                total_level=total_level,
+                rounded_level=rounded_level,
+                level_delta=total_level - current_level,
+                rounded_delta=rounded_level - current_rounded,
+                base_level=base_level,
+                dimension_min=stats['min'],
+                balance_factor=stats['balance_factor'],
+                barrel_adjusted_level=stats['barrel_adjusted'],
+                comprehensive_bonus=stats['bonus'],
+            )
+        matrix[question.id] = row
+    
+    return matrix
@@ -0,0 +1,339 @@
+"""
+专用评估函数生成
+
+questions.json 很少变化，因此可以针对已加载的配置生成一段专用的 Python 评分代码：
+- 每个选项的加权支持度、维度槽位、权重和硬性上限展开为常量表，按选项ID一次查表；
+- 支持度向量展开为局部变量逐项累加，每次调用不构建任何中间字典；
+- 基础等级、维度分数和木桶效应调整内联在同一个函数里，常量直接写成字面量。
+生成的源码用 compile() 编译一次，代码对象按配置哈希缓存在磁盘上（marshal），
+配置或常量不变时后续启动直接加载。累加顺序与 NTRPEvaluator.evaluate 完全相同，
+因此结果逐位一致；首次生成时会和通用路径做一次等价性校验，不一致时抛出 RuntimeError 且不写缓存。
+缓存文件记录生成时源码的 SHA-256 和自身内容的 SHA-256，加载时与按当前配置重新生成的源码比对，
+旧生成器留下的或已损坏的缓存会被丢弃并重新生成、校验。
+"""
+
+import hashlib
+import marshal
+import math
+import pathlib
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from data_models import EvaluationDetail, LevelResult, NTRPConstants, round_to_half
+
+# 生成器版本，修改生成逻辑或缓存格式时递增以使旧缓存失效
+CODEGEN_VERSION = 2
+
+# 默认缓存目录（与 Python 字节码缓存放在一起，已被 .gitignore 忽略）
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).parent / "__pycache__"
+
+
+def _option_rows(evaluator) -> List[tuple]:
+    """每个选项一行：(选项ID, 问题ID, 支持度向量, 维度槽位, 权重, 中心等级, 硬性上限)"""
+    slots = {dim: d for d, dim in enumerate(evaluator._dimensions)}
+    rows = []
+    for question in evaluator.questions:
+        for option in question.options:
+            c = evaluator._compiled_options[option.id]
+            rows.append((
+                c.option_id, c.question_id, tuple(c.support),
+                slots[c.dimension], c.weight, c.center_level, c.hard_cap,
+            ))
+    return rows
+
+
+def _constants() -> tuple:
+    return (
+        tuple(NTRPConstants.LEVELS),
+        NTRPConstants.VARIANCE_LOW,
+        NTRPConstants.VARIANCE_HIGH,
+        NTRPConstants.BALANCE_THRESHOLD,
+        NTRPConstants.HIGH_LEVEL_THRESHOLD,
+        NTRPConstants.MAX_BARREL_PENALTY,
+        NTRPConstants.COMPREHENSIVE_BONUS,
+    )
+
+
+def config_hash(evaluator) -> str:
+    """
+    评估器配置的内容哈希（选项常量表 + 评估常量 + 生成器版本）
+    
+    Args:
+        evaluator: NTRPEvaluator 实例
+    
+    Returns:
+        16 位十六进制哈希
+    """
+    payload = repr((CODEGEN_VERSION, _constants(), list(evaluator._dimensions), _option_rows(evaluator)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def generate_source(evaluator) -> str:
+    """
+    生成专用评分函数的源码
+    
+    生成的模块定义 score(answers) -> (最终等级, 基础等级)；
+    答案为空时抛出 ValueError，包含配置外或跨题的选项时交给 _fallback（通用路径）校验并抛出 ValueError。
+    
+    Args:
+        evaluator: NTRPEvaluator 实例
+    
+    Returns:
+        Python 源码
+    """
+    levels, variance_low, variance_high, balance_threshold, high_level, max_penalty, bonus = _constants()
+    n_levels = len(levels)
+    n_dims = len(evaluator._dimensions)
+    s = [f"s{i}" for i in range(n_levels)]
+    a = [f"a{i}" for i in range(n_levels)]
+    
+    lines = [
+        f'"""由 specialized_evaluator 生成（配置哈希 {config_hash(evaluator)}），请勿手工修改"""',
+        "",
+        "_OPTIONS = {",
+    ]
+    for option_id, question_id, support, slot, weight, center, cap in _option_rows(evaluator):
+        values = ", ".join(repr(v) for v in support)
+        lines.append(
+            f"    {option_id!r}: ({question_id!r}, {values}, {slot}, {weight!r}, "
+            f"{center * weight!r}, {center!r}, {'_INF' if math.isinf(cap) else repr(cap)}),"
+        )
+    lines += [
+        "}",
+        "",
+        "",
+        "def score(answers):",
+        "    if not answers:",
+        "        raise ValueError('答案格式错误或包含无效选项')",
+        f"    {' = '.join(s)} = 0.0",
+        "    cap = _INF",
+        f"    dw = [0.0] * {n_dims}",
+        f"    dws = [0.0] * {n_dims}",
+        f"    dss = [0.0] * {n_dims}",
+        f"    dn = [0] * {n_dims}",
+        "    order = []",
+        "    for qid, oid in answers.items():",
+        "        row = _OPTIONS.get(oid)",
+        "        if row is None or row[0] != qid:",
+        "            return _fallback(answers)",
+        f"        _, {', '.join(a)}, d, w, wc, c, oc = row",
+        "        if oc < cap:",
+        "            cap = oc",
+    ]
+    lines += [f"        {s[i]} += {a[i]}" for i in range(n_levels)]
+    lines += [
+        "        if not dn[d]:",
+        "            order.append(d)",
+        "        dw[d] += w",
+        "        dws[d] += wc",
+        "        dss[d] += c",
+        "        dn[d] += 1",
+        "",
+        f"    total = {' + '.join(s)}",
+        "    if total <= 0:",
+        f"        base = min({levels[n_levels // 2]!r}, cap)",
+        "    else:",
+        f"        base = min(({' + '.join(f'{levels[i]!r} * {s[i]}' for i in range(n_levels))}) / total, cap)",
+        "",
+        "    scores = [dws[d] / dw[d] if dw[d] > 0 else dss[d] / dn[d] for d in order]",
+        "    n = len(scores)",
+        "    mean = sum(scores) / n",
+        "    variance = sum((x - mean) ** 2 for x in scores) / n",
+        f"    if variance <= {variance_low!r}:",
+        "        balance = 1.0",
+        f"    elif variance >= {variance_high!r}:",
+        "        balance = 0.0",
+        "    else:",
+        f"        balance = max(0.0, min(1.0, 1.0 - (variance - {variance_low!r}) / {variance_high - variance_low!r}))",
+        "    barrel = balance * base + (1 - balance) * min(scores)",
+        f"    barrel = max(base - {max_penalty!r}, barrel)",
+        f"    if mean >= {high_level!r} and balance >= {balance_threshold!r}:",
+        f"        return barrel + {bonus!r}, base",
+        "    return barrel + 0.0, base",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+class SpecializedEvaluator:
+    """针对一份问卷配置生成的专用评估器（只计算等级）"""
+    
+    def __init__(
+        self,
+        evaluator,
+        cache_dir: Optional[pathlib.Path] = DEFAULT_CACHE_DIR,
+        verify_samples: int = 200,
+    ) -> None:
+        """
+        生成（或从磁盘缓存加载）专用评分函数
+        
+        Args:
+            evaluator: NTRPEvaluator 实例
+            cache_dir: 代码对象缓存目录，None 表示不使用磁盘缓存
+            verify_samples: 新生成代码时与通用路径比对的随机答案数
+        
+        Raises:
+            RuntimeError: 新生成的代码与通用路径结果不一致（此时不写入缓存）
+        """
+        self.evaluator = evaluator
+        self.config_hash = config_hash(evaluator)
+        self.loaded_from_cache = False
+        
+        # 生成源码只需几毫秒，每次都生成，用其哈希确认缓存的代码对象确实由这份源码编译而来
+        source = generate_source(evaluator)
+        source_digest = hashlib.sha256(source.encode("utf-8")).digest()
+        code = self._load_cached(cache_dir, source_digest)
+        if code is None:
+            code = compile(source, f"<ntrp_specialized {self.config_hash}>", "exec")
+        
+        namespace = {"_INF": float('inf'), "_fallback": self._fallback}
+        exec(code, namespace)
+        self._score = namespace["score"]
+        
+        if not self.loaded_from_cache:
+            if verify_samples:
+                self.verify(verify_samples)
+            self._store_cached(cache_dir, source_digest, code)
+    
+    def _cache_path(self, cache_dir: pathlib.Path) -> pathlib.Path:
+        # marshal 格式与解释器版本相关，文件名带上 cache_tag
+        return cache_dir / f"ntrp_specialized-{self.config_hash}.{sys.implementation.cache_tag}.bin"
+    
+    def _load_cached(self, cache_dir: Optional[pathlib.Path], source_digest: bytes):
+        # 文件格式：SHA-256(payload) + payload，payload = marshal((源码 SHA-256, 代码对象))
+        if cache_dir is None:
+            return None
+        try:
+            data = self._cache_path(cache_dir).read_bytes()
+        except OSError:
+            return None
+        payload = data[32:]
+        if hashlib.sha256(payload).digest() != data[:32]:
+            return None
+        try:
+            cached_digest, code = marshal.loads(payload)
+        except (ValueError, EOFError, TypeError):
+            return None
+        if cached_digest != source_digest:
+            return None
+        self.loaded_from_cache = True
+        return code
+    
+    def _store_cached(self, cache_dir: Optional[pathlib.Path], source_digest: bytes, code) -> None:
+        if cache_dir is None:
+            return
+        path = self._cache_path(cache_dir)
+        payload = marshal.dumps((source_digest, code))
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            # 先写临时文件再替换，避免并发启动读到半个文件
+            temp = path.with_suffix(".tmp")
+            temp.write_bytes(hashlib.sha256(payload).digest() + payload)
+            temp.replace(path)
+        except OSError:
+            pass  # 缓存只是加速手段，写失败不影响使用
+    
+    def _fallback(self, answers: Dict[str, str]) -> Tuple[float, float]:
+        """生成代码无法处理的作答走通用路径（配置外、跨题或重复作答在这里抛出 ValueError）"""
+        if not self.evaluator._validate_answers(answers):
+            raise ValueError("答案格式错误或包含无效选项")
+        _, base_level, _, barrel_stats = self.evaluator._evaluate_numbers(answers)
+        return barrel_stats['final_level'], base_level
+    
+    def score(self, answers: Dict[str, str]) -> float:
+        """
+        计算最终等级（木桶效应调整后、未四舍五入）
+        
+        Raises:
+            ValueError: 答案格式错误或包含无效选项
+        """
+        return self._score(answers)[0]
+    
+    def evaluate(self, answers: Dict[str, str]) -> LevelResult:
+        """
+        与 NTRPEvaluator.evaluate(answers, EvaluationDetail.LEVEL) 等价
+        
+        Raises:
+            ValueError: 答案格式错误或包含无效选项
+        """
+        final_level = self._score(answers)[0]
+        return LevelResult(total_level=final_level, rounded_level=round_to_half(final_level))
+    
+    def verify(self, samples: int = 200, seed: int = 0) -> None:
+        """
+        用随机答案（含部分作答）与通用 evaluate 逐位比对
+        
+        Raises:
+            RuntimeError: 存在不一致的答案
+        """
+        rng = random.Random(seed)
+        for answers in _random_answer_sets(self.evaluator, samples, rng):
+            expected = self.evaluator.evaluate(answers, EvaluationDetail.LEVEL)
+            actual = self.evaluate(answers)
+            if actual != expected:
+                raise RuntimeError(f"专用评估结果与通用路径不一致: {answers} {actual} != {expected}")
+
+
+def _random_answer_sets(evaluator, count: int, rng: random.Random) -> List[Dict[str, str]]:
+    """随机答案：约一半为部分作答，作答顺序随机"""
+    answer_sets = []
+    for _ in range(count):
+        questions = list(evaluator.questions)
+        rng.shuffle(questions)
+        if rng.random() < 0.5:
+            questions = questions[:rng.randint(1, len(questions))]
+        answer_sets.append({q.id: rng.choice(q.options).id for q in questions})
+    return answer_sets
+
+
+def benchmark(evaluator, samples: int = 2000, seed: int = 0) -> Dict[str, float]:
+    """
+    比较通用 evaluate(LEVEL) 与专用评分函数的单次调用耗时
+    
+    Returns:
+        {'generic_us': ..., 'specialized_us': ..., 'speedup': ..., 'build_ms': ..., 'cached_load_ms': ...}
+    """
+    start = time.perf_counter()
+    SpecializedEvaluator(evaluator, cache_dir=None, verify_samples=0)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    specialized = SpecializedEvaluator(evaluator)
+    start = time.perf_counter()
+    SpecializedEvaluator(evaluator)
+    cached_load_ms = (time.perf_counter() - start) * 1000
+    
+    answer_sets = _random_answer_sets(evaluator, samples, random.Random(seed))
+    
+    start = time.perf_counter()
+    for answers in answer_sets:
+        evaluator.evaluate(answers, EvaluationDetail.LEVEL)
+    generic = (time.perf_counter() - start) / samples
+    
+    start = time.perf_counter()
+    for answers in answer_sets:
+        specialized.evaluate(answers)
+    fast = (time.perf_counter() - start) / samples
+    
+    return {
+        'generic_us': generic * 1e6,
+        'specialized_us': fast * 1e6,
+        'speedup': generic / fast,
+        'build_ms': build_ms,
+        'cached_load_ms': cached_load_ms,
+    }
+
+
+if __name__ == "__main__":
+    from config_manager import ConfigManager
+    from ntrp_evaluator import NTRPEvaluator
+    
+    config_manager = ConfigManager()
+    evaluator = NTRPEvaluator(
+        config_manager.load_questions(), config_manager.load_suggestions(), config_manager
+    )
+    SpecializedEvaluator(evaluator).verify(2000, seed=1)
+    print(f"配置哈希 {config_hash(evaluator)}：2000 组随机答案与通用路径逐位一致")
+    for key, value in benchmark(evaluator).items():
+        print(f"  {key}: {value:.2f}")
@@ -0,0 +1,160 @@
+"""
+升级路径求解器
+
+给定当前答案和目标 NTRP 等级，寻找达到目标所需改动最少的一组"答案升级"
+（把某题改为 center_level 更高的选项）。
+每个候选状态都由 EvaluationSession 增量求值，因此硬性上限、木桶效应惩罚和
+全面型加成都按真实评估规则计入；搜索为按改动数分层的有界最优优先（beam）搜索。
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from data_models import UpgradePlan, round_to_half
+from evaluation_session import EvaluationSession
+
+
+class UpgradeSolver:
+    """升级路径求解器"""
+    
+    def __init__(
+        self,
+        evaluator,
+        max_changes: int = 3,
+        beam_width: int = 8,
+        moves_per_state: int = 12,
+    ) -> None:
+        """
+        初始化求解器
+        
+        Args:
+            evaluator: NTRPEvaluator 实例
+            max_changes: 最多改动的题数
+            beam_width: 每层保留的候选状态数
+            moves_per_state: 第二层起每个状态尝试的候选升级数（按单步收益排序）
+        """
+        self.evaluator = evaluator
+        self.max_changes = max_changes
+        self.beam_width = beam_width
+        self.moves_per_state = moves_per_state
+    
+    def solve(self, answers: Dict[str, str], target_level: Optional[float] = None) -> UpgradePlan:
+        """
+        求解升级路径
+        
+        Args:
+            answers: 当前答案字典
+            target_level: 目标展示等级，None 表示当前展示等级的下一个 0.5 档
+        
+        Returns:
+            升级方案；未在 max_changes 步内达到目标时 reached 为 False，
+            changes 为搜索到的最高等级方案
+        
+        Raises:
+            ValueError: 答案格式错误或包含无效选项
+        """
+        evaluator = self.evaluator
+        if not evaluator._validate_answers(answers):
+            raise ValueError("答案格式错误或包含无效选项")
+        
+        root = EvaluationSession(evaluator, answers)
+        current_level = root.current_level()
+        if target_level is None:
+            target_level = round_to_half(current_level) + 0.5
+        
+        evaluations = 0
+        if round_to_half(current_level) >= target_level:
+            return self._plan(target_level, current_level, current_level, [], evaluations)
+        
+        # 第一层：所有单步升级都精确求值
+        moves = self._candidate_moves(root)
+        scored_moves: List[Tuple[float, float, str, str]] = []
+        frontier: List[Tuple[float, float, EvaluationSession, Tuple]] = []
+        best: Tuple[float, float, Tuple] = (current_level, 0.0, ())
+        
+        for question_id, option_id, cost in moves:
+            child = root.copy()
+            child.answer(question_id, option_id)
+            level = child.current_level()
+            evaluations += 1
+            change = (question_id, answers[question_id], option_id)
+            scored_moves.append((level - current_level, cost, question_id, option_id))
+            frontier.append((level, cost, child, (change,)))
+        
+        # 单步收益为正的升级，以及解除当前硬性上限的升级，才在后续层继续尝试
+        capped = {
+            question_id for question_id, compiled in root._compiled.items()
+            if compiled.hard_cap < target_level
+        }
+        scored_moves.sort(key=lambda m: (-m[0], m[1]))
+        expandable = [
+            (q, o, cost) for delta, cost, q, o in scored_moves if delta > 0 or q in capped
+        ][:self.moves_per_state]
+        
+        for depth in range(1, self.max_changes + 1):
+            reached = [s for s in frontier if round_to_half(s[0]) >= target_level]
+            if reached:
+                # 同样改动数下选升级幅度最小的方案，其次选等级最高的
+                level, cost, _, changes = min(reached, key=lambda s: (s[1], -s[0]))
+                return self._plan(target_level, current_level, level, list(changes), evaluations)
+            
+            for level, cost, _, changes in frontier:
+                if level > best[0]:
+                    best = (level, cost, changes)
+            
+            if depth == self.max_changes:
+                break
+            
+            # 保留最有希望的 beam_width 个状态扩展下一层
+            beam = heapq.nlargest(self.beam_width, frontier, key=lambda s: (s[0], -s[1]))
+            seen = set()
+            frontier = []
+            for _, cost, state, changes in beam:
+                changed = {c[0] for c in changes}
+                for question_id, option_id, move_cost in expandable:
+                    if question_id in changed:
+                        continue
+                    key = frozenset((c[0], c[2]) for c in changes) | {(question_id, option_id)}
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    child = state.copy()
+                    child.answer(question_id, option_id)
+                    evaluations += 1
+                    change = (question_id, answers[question_id], option_id)
+                    frontier.append((child.current_level(), cost + move_cost, child, changes + (change,)))
+            if not frontier:
+                break
+        
+        level, _, changes = best
+        return self._plan(target_level, current_level, level, list(changes), evaluations, reached=False)
+    
+    def _candidate_moves(self, session: EvaluationSession) -> List[Tuple[str, str, float]]:
+        """当前答案上所有的单步升级: (问题ID, 新选项ID, center_level 提升幅度)"""
+        moves = []
+        for question_id, compiled in session._compiled.items():
+            question = self.evaluator._question_dict[question_id]
+            for option in question.options:
+                gain = option.center_level - compiled.center_level
+                if gain > 0:
+                    moves.append((question_id, option.id, gain))
+        return moves
+    
+    @staticmethod
+    def _plan(
+        target_level: float,
+        current_level: float,
+        level: float,
+        changes: List[Tuple[str, str, str]],
+        evaluations: int,
+        reached: bool = True,
+    ) -> UpgradePlan:
+        return UpgradePlan(
+            target_level=target_level,
+            reached=reached,
+            changes=changes,
+            current_level=current_level,
+            total_level=level,
+            rounded_level=round_to_half(level),
+            evaluations=evaluations,
+        )
@@ -0,0 +1,1468 @@
+"""
+测试预编译评估路径及构建在其上的各项机制
+
+- 评估核心:预编译支持度向量、批量评估、增量会话、结果详细程度、敏感度矩阵、升级路径、
+  等级上下界、自适应测试、专用评分函数、后验摘要;
+- 离线工具:参数校准、超参数搜索、评估器一致性对比、IRT 引擎、不变量检查、路由策略模拟;
+- 服务与配置:严格答案校验、评分引擎注册表与影子执行、配置索引、维度建议区间索引、
+  配置热更新、二进制配置快照、多版本问卷注册表。
+"""
+
+import itertools
+import json
+import math
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src到路径（仓库根目录下的工具脚本也一并可导入）
+src_path = Path(__file__).parent / "src"
+sys.path.insert(0, str(src_path))
+sys.path.insert(1, str(Path(__file__).parent.parent))
+
+import config_manager as config_manager_module
+from config_manager import ConfigManager
+from ntrp_evaluator import NTRPEvaluator
+from data_models import NTRPConstants, EvaluationDetail, LevelResult, ScoreResult, AnswerErrorCode
+import batch_evaluation
+from evaluation_session import EvaluationSession
+from adaptive_testing import AdaptiveTest
+from specialized_evaluator import SpecializedEvaluator
+import calibration
+import hyperparameter_search
+import scoring_engines
+import parity_harness
+import irt_engine
+import invariant_checker
+import routing_policy
+import hot_reload
+import questionnaire_registry
+from app_controller import AppController
+import config_tools
+
+
+def _build_evaluator():
+    config_manager = ConfigManager()
+    questions = config_manager.load_questions()
+    suggestions = config_manager.load_suggestions()
+    return NTRPEvaluator(
+        questions=questions,
+        suggestion_rules=suggestions,
+        config_manager=config_manager,
+        spread=1.0
+    )
+
+
+def _random_answers(evaluator, rng):
+    return {q.id: rng.choice(q.options).id for q in evaluator.questions}
+
+
+def test_compiled_support_matches_membership():
+    """预编译的支持度向量应等于 membership × 权重(× locator加成)"""
+    evaluator = _build_evaluator()
+    
+    for question in evaluator.questions:
+        for option in question.options:
+            compiled = evaluator._compiled_options[option.id]
+            factor = question.weight
+            if option.anchor_type == "locator":
+                factor *= NTRPConstants.LOCATOR_BOOST
+            
+            for level, value in zip(NTRPConstants.LEVELS, compiled.support):
+                expected = evaluator._compute_membership_by_anchor(level, option) * factor
+                assert value == expected
+            
+            assert compiled.dimension == question.dimension
+            expected_cap = option.hard_cap if option.hard_cap is not None else float('inf')
+            assert compiled.hard_cap == expected_cap
+    
+    print(f"✓ 已校验 {len(evaluator._compiled_options)} 个选项的预编译向量")
+
+
+def test_evaluate_many_matches_evaluate():
+    """批量评估与逐条 evaluate 的数值一致（NumPy 不可用时只测纯 Python 回退）"""
+    evaluator = _build_evaluator()
+    rng = random.Random(7)
+    answer_sets = [_random_answers(evaluator, rng) for _ in range(200)]
+    answer_sets.append({"Q1": "Q1_A3", "Q5": "Q5_A6"})  # 部分作答
+    
+    modes = [False] + ([True] if batch_evaluation.np is not None else [])
+    for use_numpy in modes:
+        batch = evaluator.evaluate_many(answer_sets, use_numpy=use_numpy)
+        assert len(batch) == len(answer_sets)
+        
+        for i, answers in enumerate(answer_sets):
+            result = evaluator.evaluate(answers)
+            assert float(batch.rounded_level[i]) == result.rounded_level
+            assert abs(float(batch.total_level[i]) - result.total_level) < 1e-9
+            assert abs(float(batch.base_level[i]) - result.base_level) < 1e-9
+            assert abs(float(batch.balance_factor[i]) - result.balance_factor) < 1e-9
+            for j, dim in enumerate(batch.dimensions):
+                if dim in result.dimension_scores:
+                    assert abs(float(batch.dimension_scores[i][j]) - result.dimension_scores[dim]) < 1e-9
+    
+    # 整数编码矩阵输入与字典输入结果一致
+    matrix = evaluator.encode_answers(answer_sets)
+    assert evaluator.decode_answers(matrix[0]) == answer_sets[0]
+    by_matrix = evaluator.evaluate_many(matrix, use_numpy=False)
+    assert list(by_matrix.total_level) == list(evaluator.evaluate_many(answer_sets, use_numpy=False).total_level)
+    
+    # 超出选项范围的编码在两条路径上都抛出 ValueError
+    for bad_code in (len(evaluator.questions[0].options), -2):
+        bad = [list(matrix[0])]
+        bad[0][0] = bad_code
+        for use_numpy in modes:
+            try:
+                evaluator.evaluate_many(bad, use_numpy=use_numpy)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"越界编码应抛出 ValueError: {bad_code}")
+    
+    print(f"✓ 批量评估 {len(answer_sets)} 条答案，模式: {modes}")
+
+
+def test_session_reuses_basic_state():
+    """两阶段会话:基础题状态复用后与一次性评估结果一致"""
+    evaluator = _build_evaluator()
+    rng = random.Random(11)
+    
+    for _ in range(50):
+        answers = _random_answers(evaluator, rng)
+        basic = {q: o for q, o in answers.items() if evaluator._question_dict[q].question_tier == "basic"}
+        advanced = {q: o for q, o in answers.items() if q not in basic}
+        
+        session = EvaluationSession(evaluator, basic)
+        assert session.current_level() == evaluator.evaluate(basic).total_level
+        
+        session.answer_many(advanced)
+        assert session.snapshot() == evaluator.evaluate(answers)
+    
+    # 修改和撤回答案后，结果与重新评估一致（允许浮点舍入误差）
+    session.answer("Q1", "Q1_A0")
+    session.remove("Q13")
+    expected = evaluator.evaluate(session.answers)
+    assert abs(session.current_level() - expected.total_level) < 1e-9
+    
+    print("✓ 增量会话与一次性评估一致")
+
+
+def test_detail_levels():
+    """不同详细程度的结果数值一致，且只有 FULL 包含评语和图表"""
+    evaluator = _build_evaluator()
+    rng = random.Random(3)
+    answers = _random_answers(evaluator, rng)
+    
+    full = evaluator.evaluate(answers)
+    scores = evaluator.evaluate(answers, EvaluationDetail.SCORES)
+    level = evaluator.evaluate(answers, EvaluationDetail.LEVEL)
+    
+    assert isinstance(level, LevelResult)
+    assert isinstance(scores, ScoreResult)
+    assert level.rounded_level == scores.rounded_level == full.rounded_level
+    assert scores.dimension_scores == full.dimension_scores
+    assert scores.balance_factor == full.balance_factor
+    assert full.summary_text and full.chart_data is not None
+    
+    print(f"✓ 三种详细程度结果一致: {full.rounded_level:.1f}")
+
+
+def test_sensitivity_matrix():
+    """敏感度矩阵的每个单元与改答后重新评估一致"""
+    evaluator = _build_evaluator()
+    rng = random.Random(13)
+    answers = _random_answers(evaluator, rng)
+    del answers["Q19"]
+    
+    matrix = evaluator.sensitivity(answers)
+    assert set(matrix) == set(evaluator._question_dict)
+    assert answers["Q1"] not in matrix["Q1"]
+    assert len(matrix["Q19"]) == len(evaluator._question_dict["Q19"].options)
+    
+    for question_id, row in matrix.items():
+        for option_id, entry in row.items():
+            changed = dict(answers)
+            changed[question_id] = option_id
+            expected = evaluator.evaluate(changed, EvaluationDetail.SCORES)
+            assert entry.rounded_level == expected.rounded_level
+            assert abs(entry.total_level - expected.total_level) < 1e-9
+    
+    print(f"✓ 敏感度矩阵共 {sum(len(row) for row in matrix.values())} 个单元")
+
+
+def test_upgrade_plan():
+    """升级方案应用后确实达到目标，且多步方案不存在单步可达的替代"""
+    evaluator = _build_evaluator()
+    rng = random.Random(17)
+    
+    for _ in range(30):
+        answers = _random_answers(evaluator, rng)
+        plan = evaluator.plan_upgrade(answers)
+        
+        upgraded = dict(answers)
+        for question_id, old_option, new_option in plan.changes:
+            assert answers[question_id] == old_option
+            upgraded[question_id] = new_option
+        result = evaluator.evaluate(upgraded, EvaluationDetail.LEVEL)
+        assert abs(result.total_level - plan.total_level) < 1e-9
+        
+        if plan.reached:
+            assert result.rounded_level >= plan.target_level
+        if plan.reached and len(plan.changes) > 1:
+            # 只比较升级（降级在木桶效应下也可能提高等级，但不属于升级方案）
+            matrix = evaluator.sensitivity(answers)
+            options = evaluator._option_dict
+            for question_id, row in matrix.items():
+                current = options[answers[question_id]].center_level
+                for option_id, entry in row.items():
+                    if options[option_id].center_level > current:
+                        assert entry.rounded_level < plan.target_level
+    
+    print("✓ 升级方案校验通过")
+
+
+def test_level_bounds_contain_completions():
+    """剩余问题的所有作答组合都落在等级上下界之内"""
+    evaluator = _build_evaluator()
+    rng = random.Random(19)
+    
+    for _ in range(40):
+        questions = list(evaluator.questions)
+        rng.shuffle(questions)
+        remaining, known = questions[:3], questions[3:]
+        answers = {q.id: rng.choice(q.options).id for q in known}
+        bounds = evaluator.level_bounds(answers)
+        assert bounds.remaining == 3
+        
+        levels = []
+        for options in itertools.product(*[q.options for q in remaining]):
+            completed = dict(answers)
+            completed.update({q.id: opt.id for q, opt in zip(remaining, options)})
+            levels.append(evaluator.evaluate(completed, EvaluationDetail.LEVEL).total_level)
+        assert bounds.lower_level <= min(levels)
+        assert max(levels) <= bounds.upper_level
+        if bounds.decided:
+            assert {round(level * 2) / 2 for level in levels} == {bounds.rounded_lower}
+    
+    print("✓ 等级上下界校验通过")
+
+
+def test_adaptive_test():
+    """自适应测试：挑选信息增益最大的题，改答可还原后验，停止后结果与会话一致"""
+    evaluator = _build_evaluator()
+    rng = random.Random(23)
+    
+    for _ in range(20):
+        answers = _random_answers(evaluator, rng)
+        test = AdaptiveTest(evaluator)
+        question = test.next_question()
+        while question is not None:
+            gains = test.information_gain()
+            assert all(gain >= -1e-12 for gain in gains.values())
+            assert gains[question.id] == max(gains.values())
+            test.answer(question.id, answers[question.id])
+            question = test.next_question()
+        
+        assert test.should_stop()
+        assert test.min_questions <= len(test.answers) <= len(evaluator.questions)
+        assert abs(sum(test.posterior().values()) - 1.0) < 1e-9
+        expected = evaluator.evaluate(test.answers, EvaluationDetail.LEVEL)
+        assert abs(test.result(EvaluationDetail.LEVEL).total_level - expected.total_level) < 1e-9
+        
+        # 改答再改回，后验不变
+        question_id = next(iter(test.answers))
+        before = test.posterior()
+        other = next(opt.id for opt in evaluator._question_dict[question_id].options
+                     if opt.id != answers[question_id])
+        test.answer(question_id, other)
+        test.answer(question_id, answers[question_id])
+        after = test.posterior()
+        assert all(abs(before[level] - after[level]) < 1e-9 for level in before)
+    
+    print("✓ 自适应测试校验通过")
+
+
+def test_specialized_evaluator():
+    """生成的专用评分函数与通用 evaluate 逐位一致，并能从磁盘缓存加载"""
+    evaluator = _build_evaluator()
+    rng = random.Random(29)
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        built = SpecializedEvaluator(evaluator, cache_dir=Path(cache_dir))
+        loaded = SpecializedEvaluator(evaluator, cache_dir=Path(cache_dir))
+        assert not built.loaded_from_cache
+        assert loaded.loaded_from_cache
+        
+        for _ in range(200):
+            answers = _random_answers(evaluator, rng)
+            expected = evaluator.evaluate(answers, EvaluationDetail.LEVEL)
+            assert built.evaluate(answers) == expected
+            assert loaded.evaluate(answers) == expected
+        
+        # 损坏的缓存和由其他源码编译的缓存都不被信任，重新生成、校验后覆盖
+        path = built._cache_path(Path(cache_dir))
+        data = bytearray(path.read_bytes())
+        data[-1] ^= 0xFF
+        path.write_bytes(bytes(data))
+        assert not SpecializedEvaluator(evaluator, cache_dir=Path(cache_dir)).loaded_from_cache
+        built._store_cached(Path(cache_dir), b"\0" * 32, compile("def score(answers):\n    return 0.0, 0.0\n", "<stale>", "exec"))
+        regenerated = SpecializedEvaluator(evaluator, cache_dir=Path(cache_dir))
+        assert not regenerated.loaded_from_cache
+        assert SpecializedEvaluator(evaluator, cache_dir=Path(cache_dir)).loaded_from_cache
+    
+    # 与通用路径不一致时抛出 RuntimeError（不依赖 assert，python -O 下同样生效）
+    broken = SpecializedEvaluator(evaluator, cache_dir=None, verify_samples=0)
+    broken._score = lambda answers: (0.0, 0.0)
+    try:
+        broken.verify(10)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("不一致的专用评估器应抛出 RuntimeError")
+    
+    # 空答案、未知问题和跨题作答都被拒绝
+    questions = evaluator.questions
+    for invalid in ({}, {"Q_UNKNOWN": questions[0].options[0].id}, {questions[0].id: questions[1].options[0].id}):
+        try:
+            built.evaluate(invalid)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("无效答案应抛出 ValueError")
+    
+    print("✓ 专用评估器校验通过")
+
+
+def test_posterior_summary():
+    """后验由支持度归一化得到，可信区间包含展示等级且覆盖概率不低于阈值"""
+    evaluator = _build_evaluator()
+    rng = random.Random(31)
+    
+    for _ in range(50):
+        answers = _random_answers(evaluator, rng)
+        result = evaluator.evaluate(answers, EvaluationDetail.SCORES)
+        posterior = result.posterior
+        
+        total = sum(result.support_distribution.values())
+        for level, p in posterior.probabilities.items():
+            assert abs(p - result.support_distribution[level] / total) < 1e-12
+        assert abs(sum(posterior.probabilities.values()) - 1.0) < 1e-9
+        
+        covered = sum(
+            p for level, p in posterior.probabilities.items()
+            if posterior.credible_lower <= level <= posterior.credible_upper
+        )
+        assert abs(covered - posterior.credible_mass) < 1e-9
+        assert posterior.credible_mass >= NTRPConstants.CREDIBLE_MASS - 1e-9
+        if 1.0 <= result.rounded_level <= 6.0:
+            assert posterior.credible_lower <= result.rounded_level <= posterior.credible_upper
+        assert 0.0 <= posterior.entropy <= math.log2(len(NTRPConstants.LEVELS))
+    
+    full = evaluator.evaluate(answers)
+    assert full.posterior == posterior
+    
+    print("✓ 后验摘要校验通过")
+
+def test_calibration():
+    """校准器前向与评估器一致、梯度与数值差分一致，拟合能降低对真实评级的误差（需要 NumPy）"""
+    if calibration.np is None:
+        print("- 未安装 NumPy，跳过校准测试")
+        return
+    np = calibration.np
+    evaluator = _build_evaluator()
+    rng = random.Random(37)
+    
+    # 用扰动后的配置生成"真实评级"，再从原配置出发拟合
+    truth_questions = [
+        calibration.dataclasses.replace(
+            q,
+            weight=q.weight * rng.uniform(0.7, 1.3),
+            options=[
+                calibration.dataclasses.replace(o, center_level=o.center_level + rng.uniform(-0.4, 0.4))
+                for o in q.options
+            ],
+        )
+        for q in evaluator.questions
+    ]
+    truth = NTRPEvaluator(truth_questions, evaluator.suggestion_rules, evaluator.config_manager, evaluator.spread)
+    answer_sets = [_random_answers(evaluator, rng) for _ in range(600)]
+    answer_sets.append({"Q1": "Q1_A3", "Q5": "Q5_A6"})  # 部分作答
+    players = [(a, truth.evaluate(a, EvaluationDetail.LEVEL).total_level) for a in answer_sets]
+    calibrator = calibration.Calibrator(evaluator, players)
+    
+    centers, weights = calibrator.initial_centers, calibrator.initial_weights
+    final = calibrator.forward(centers, weights)
+    for i in range(0, len(players), 50):
+        expected = evaluator.evaluate(players[i][0], EvaluationDetail.LEVEL).total_level
+        assert abs(float(final[i]) - expected) < 1e-9
+    
+    # 随机方向上的方向导数；原配置的维度分数常常并列最低（次梯度不唯一），在附近的随机点上检查
+    rows = list(range(100))
+    centers = centers + np.array([rng.uniform(-0.05, 0.05) for _ in centers])
+    _, d_centers, d_weights = calibrator.loss_and_grad(centers, weights, 0.05, rows)
+    direction_c = np.array([rng.uniform(-1, 1) for _ in centers])
+    direction_w = np.array([rng.uniform(-1, 1) for _ in weights])
+    h = 1e-6
+    plus, _, _ = calibrator.loss_and_grad(centers + h * direction_c, weights + h * direction_w, 0.05, rows)
+    minus, _, _ = calibrator.loss_and_grad(centers - h * direction_c, weights - h * direction_w, 0.05, rows)
+    numeric = (plus - minus) / (2 * h)
+    analytic = float(d_centers @ direction_c + d_weights @ direction_w)
+    assert abs(numeric - analytic) < 1e-4 * max(1.0, abs(analytic))
+    
+    candidate, report = calibrator.fit(iterations=150, holdout=0.25, seed=1)
+    assert len(candidate) == len(evaluator.questions)
+    assert report.train_after.mae < report.train_before.mae
+    assert report.holdout_after.mae < report.holdout_before.mae
+    assert report.center_changes and report.weight_changes
+    
+    try:
+        calibration.Calibrator(evaluator, [({"Q1": "Q2_A1"}, 3.0)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("跨题答案应抛出 ValueError")
+    
+    try:
+        calibration.Calibrator(evaluator, players[:3] + [({}, 3.0)])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("没有作答的选手应抛出 ValueError")
+    
+    print("✓ 校准器校验通过")
+
+def test_hyperparameter_search():
+    """超参数搜索：当前配置的评分与逐条评估一致，进程池结果与单进程一致，检查点可续跑"""
+    evaluator = _build_evaluator()
+    rng = random.Random(41)
+    players = [
+        (_random_answers(evaluator, rng), rng.choice(NTRPConstants.LEVELS[2:10]))
+        for _ in range(120)
+    ]
+    names = list(hyperparameter_search.DEFAULT_SPACE)
+    candidates = [hyperparameter_search.current_params(names)]
+    candidates += hyperparameter_search.random_candidates(hyperparameter_search.DEFAULT_SPACE, 5, seed=2)
+    assert candidates[1:] == hyperparameter_search.random_candidates(hyperparameter_search.DEFAULT_SPACE, 5, seed=2)
+    
+    saved = {name: getattr(NTRPConstants, name) for name in names if name != "spread"}
+    with hyperparameter_search.override_constants(candidates[1]):
+        assert NTRPConstants.LOCATOR_SIGMA == candidates[1]["LOCATOR_SIGMA"]
+    assert {name: getattr(NTRPConstants, name) for name in saved} == saved
+    
+    sequential = hyperparameter_search.run_search(evaluator, players, candidates, workers=0)
+    levels = [evaluator.evaluate(a, EvaluationDetail.LEVEL) for a, _ in players]
+    expected = calibration.compute_metrics(
+        [r.total_level for r in levels], [r.rounded_level for r in levels], [rating for _, rating in players]
+    )
+    assert sequential[0].metrics == expected
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = Path(tmp) / "sweep.jsonl"
+        hyperparameter_search.run_search(evaluator, players, candidates[:3], workers=2, checkpoint=checkpoint)
+        with open(checkpoint, "a", encoding="utf-8") as f:
+            f.write('{"index": 3, "par')  # 中断时写了一半的行
+        resumed = hyperparameter_search.run_search(evaluator, players, candidates, workers=2, checkpoint=checkpoint)
+        assert [t.index for t in resumed] == list(range(len(candidates)))
+        assert [t.metrics for t in resumed] == [t.metrics for t in sequential]
+        
+        try:
+            hyperparameter_search.run_search(evaluator, players, candidates[::-1], workers=0, checkpoint=checkpoint)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("检查点与搜索空间不一致时应抛出 ValueError")
+    
+    ranked = hyperparameter_search.rank_trials(sequential, "mae")
+    assert all(a.metrics.mae <= b.metrics.mae for a, b in zip(ranked, ranked[1:]))
+    
+    print("✓ 超参数搜索校验通过")
+
+def test_answer_validator():
+    """严格校验：跨题、未知、重复、缺题逐行给出错误码，有效行编码与 encode_answers 一致"""
+    evaluator = _build_evaluator()
+    rng = random.Random(43)
+    basic = [q.id for q in evaluator.questions if q.question_tier == "basic"]
+    
+    full = _random_answers(evaluator, rng)
+    rows = [
+        full,
+        {"Q1": "Q5_A3"},
+        {"Q_UNKNOWN": "Q1_A1"},
+        {"Q1": "Q1_A99"},
+        [("Q1", "Q1_A1"), ("Q1", "Q1_A2")],
+        {},
+        "Q1=Q1_A1",
+        {"Q1": 3},
+        {"Q1": "Q1_A1"},
+        {qid: full[qid] for qid in basic},
+    ]
+    batch = evaluator.validate_many(rows, required_tiers=("basic",))
+    assert batch.codes == [
+        AnswerErrorCode.OK,
+        AnswerErrorCode.OPTION_NOT_IN_QUESTION,
+        AnswerErrorCode.UNKNOWN_QUESTION,
+        AnswerErrorCode.UNKNOWN_OPTION,
+        AnswerErrorCode.DUPLICATE_QUESTION,
+        AnswerErrorCode.EMPTY,
+        AnswerErrorCode.MALFORMED,
+        AnswerErrorCode.MALFORMED,
+        AnswerErrorCode.INCOMPLETE,
+        AnswerErrorCode.OK,
+    ]
+    assert batch.results[8].missing == basic[1:]
+    assert batch.valid_rows == [0, 9]
+    assert batch.matrix[0] == evaluator.encode_answers([full])[0]
+    assert batch.matrix[1] is None
+    assert evaluator.validate_answers(rows[9], required_tiers=("basic", "advanced")).code is AnswerErrorCode.INCOMPLETE
+    
+    # 跨题作答和重复作答在所有评估入口都被拒绝（批量的 NumPy 路径与纯 Python 回退一致）
+    full_without_q1 = {q: o for q, o in full.items() if q != "Q1"}
+    for bad in ({"Q1": "Q5_A3"}, {**full_without_q1, "Q1": "Q5_A3"}):
+        entries = [
+            lambda: evaluator.evaluate(bad, EvaluationDetail.LEVEL),
+            lambda: evaluator.evaluate_many([bad], use_numpy=False),
+            lambda: evaluator.level_bounds(bad),
+            lambda: evaluator.sensitivity(bad),
+            lambda: evaluator.plan_upgrade(bad),
+        ]
+        if batch_evaluation.np is not None:
+            entries.append(lambda: evaluator.evaluate_many([bad], use_numpy=True))
+        for entry in entries:
+            try:
+                entry()
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"跨题或重复作答应被拒绝: {bad}")
+    try:
+        evaluator.evaluate([("Q1", "Q1_A1"), ("Q1", "Q1_A2")])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("重复作答应被拒绝")
+    try:
+        EvaluationSession(evaluator).answer("Q1", "Q5_A3")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("会话应拒绝不属于该题的选项")
+    config_manager = evaluator.config_manager
+    assert not config_manager.validate_answers({"Q1": "Q5_A3"}, require_all=False)
+    assert config_manager.validate_answers({}, require_all=False)
+    assert not config_manager.validate_answers(rows[9])
+    assert config_manager.validate_answers(full)
+    assert config_manager.validate_answer("Q1", "Q1_A2") and not config_manager.validate_answer("Q1", "Q2_A1")
+    
+    try:
+        evaluator.validate_many(rows, required_tiers=("expert",))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知层级应抛出 ValueError")
+    
+    print("✓ 严格答案校验通过")
+
+def test_engine_registry_shadow():
+    """主引擎同步返回，影子引擎在后台运行：慢引擎不拖慢调用，分歧、异常和积压都计入统计"""
+    import threading
+    
+    evaluator = _build_evaluator()
+    rng = random.Random(47)
+    started = threading.Event()
+    release = threading.Event()
+    
+    class SlowEngine(scoring_engines.NTRPEngine):
+        name = "slow"
+        def level(self, answers):
+            started.set()
+            release.wait(5)
+            return super().level(answers)
+    
+    class OffsetEngine(scoring_engines.NTRPEngine):
+        name = "offset"
+        def level(self, answers):
+            return min(7.0, super().level(answers) + 0.5)
+    
+    class BrokenEngine(scoring_engines.NTRPEngine):
+        name = "broken"
+        def level(self, answers):
+            raise RuntimeError("boom")
+    
+    registry = scoring_engines.EngineRegistry(max_workers=1, max_pending=2)
+    registry.register(scoring_engines.NTRPEngine(evaluator))
+    for engine in (SlowEngine(evaluator), OffsetEngine(evaluator), BrokenEngine(evaluator)):
+        registry.register(engine, shadow=True)
+    assert registry.primary == "ntrp" and registry.shadows == ["slow", "offset", "broken"]
+    
+    answer_sets = [_random_answers(evaluator, rng) for _ in range(4)]
+    for i, answers in enumerate(answer_sets):
+        result = registry.evaluate(answers)
+        assert result == evaluator.evaluate(answers)
+        if i == 0:
+            assert started.wait(5)
+    release.set()
+    assert registry.wait(timeout=10)
+    
+    summary = registry.summary()
+    assert summary["ntrp"].role == "primary" and summary["ntrp"].calls == 4
+    # 唯一的影子线程被慢引擎占住，队列中已有 max_pending 个请求时后续请求的影子比对被放弃
+    for name in ("slow", "offset", "broken"):
+        stats = summary[name]
+        assert stats.role == "shadow"
+        assert stats.calls + stats.errors + stats.dropped == 4
+        assert stats.dropped == 4 - 1 - 2
+    assert summary["slow"].disagreements == 0
+    assert summary["broken"].calls == 0
+    offset = summary["offset"]
+    assert offset.disagreements == sum(offset.level_deltas.values()) <= offset.calls
+    assert set(offset.level_deltas) <= {0.5, 1.0}
+    
+    dumped = json.loads(registry.dump())
+    assert set(dumped) == {"ntrp", "slow", "offset", "broken"}
+    registry.shutdown()
+    
+    # 多个请求线程与 shutdown 并发：每个请求的影子比对要么完成要么计为放弃，不会滞留在队列中
+    import concurrent.futures
+    
+    racing = scoring_engines.EngineRegistry(max_workers=2, max_pending=8)
+    racing.register(scoring_engines.NTRPEngine(evaluator))
+    racing.register(OffsetEngine(evaluator), shadow=True)
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(racing.evaluate, answer_sets[i % 4]) for i in range(200)]
+        racing.shutdown(wait=False)
+        for future in futures:
+            future.result()
+    assert racing.wait(timeout=10)
+    assert racing._queue.unfinished_tasks == 0
+    stats = racing.summary()["offset"]
+    assert stats.calls + stats.errors + stats.dropped == 200 == racing.summary()["ntrp"].calls
+    try:
+        scoring_engines.EngineRegistry(max_pending=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("max_pending=0 会使队列不设上限，应抛出 ValueError")
+    
+    # 已有增量会话时主引擎直接取会话快照，结果与从头评估一致
+    session = EvaluationSession(evaluator, answer_sets[0])
+    assert registry.evaluate_session(session) == evaluator.evaluate(answer_sets[0])
+    
+    try:
+        registry.set_primary("unknown")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未注册的引擎应抛出 ValueError")
+    
+    # 交互式和自适应评估的最终结果都经过主引擎，影子引擎比对真实流量
+    import builtins
+    import contextlib
+    import io
+    
+    controller = AppController(shadow_engines=["legacy"])
+    try:
+        controller.engine_summary()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("未初始化时应抛出 RuntimeError")
+    assert controller.initialize()
+    # 主引擎直接复用作答过程中的增量会话，不再从头评估全部答案
+    full_evaluations = []
+    flow_evaluator = controller._snapshot.evaluator
+    flow_evaluator.evaluate = lambda answers, *args, **kwargs: full_evaluations.append(answers)
+    original_input = builtins.input
+    try:
+        for handler in (controller._handle_interactive_evaluation, controller._handle_adaptive_evaluation):
+            inputs = iter([""] + ["3"] * len(evaluator.questions) + ["n", ""])
+            builtins.input = lambda *args: next(inputs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                handler()
+    finally:
+        builtins.input = original_input
+    assert controller.engines.wait(timeout=10)
+    summary = controller.engine_summary()
+    assert summary["ntrp"].calls == 2 and summary["legacy"].calls + summary["legacy"].errors == 2
+    assert not full_evaluations
+    controller.engines.shutdown()
+    
+    print("✓ 评分引擎注册表与影子执行校验通过")
+
+def test_parity_harness():
+    """对比工具：向量化旧版模型与旧版 evaluate 逐位一致，迁移矩阵完整，最小样例可复现且不可再删（需要 NumPy）"""
+    if parity_harness.np is None:
+        print("- 未安装 NumPy，跳过对比工具测试")
+        return
+    np = parity_harness.np
+    legacy = parity_harness.LegacyModel()
+    current = parity_harness.CurrentModel()
+    rng = np.random.default_rng(53)
+    
+    codes = parity_harness.uniform_codes(legacy.layout, 300, rng)
+    codes[::5, 12:] = -1
+    total, rounded = legacy.score(codes)
+    for i in range(0, 300, 3):
+        result = legacy.evaluator.evaluate(parity_harness.decode(codes[i], legacy.layout))
+        assert result.total_level == total[i] and result.rounded_level == rounded[i]
+    
+    # 布局按问题ID和选项ID对应
+    reversed_layout = [(qid, options[::-1]) for qid, options in reversed(legacy.layout)]
+    translated = parity_harness.translate_codes(codes, legacy.layout, reversed_layout)
+    assert parity_harness.decode(translated[7], reversed_layout) == parity_harness.decode(codes[7], legacy.layout)
+    
+    same = parity_harness.run_comparison("current", "current", samples=2000, workers=0, chunk_size=700)
+    assert same["rows"] == 2000 and same["changed"] == 0
+    
+    report = parity_harness.run_comparison(
+        "legacy", "current", mode="stratified", samples=3000, workers=2, chunk_size=1000, seed=5, examples=3
+    )
+    assert sum(report["transitions"].values()) == report["rows"] == 3000
+    assert sum(n for n, _ in report["strata"].values()) == 3000
+    assert report["changed"] == sum(n for (a, b), n in report["transitions"].items() if a != b)
+    deltas = [item["delta"] for item in report["largest_deltas"]]
+    assert deltas == sorted(deltas, reverse=True)
+    
+    for item in report["minimal_examples"]:
+        answers = item["answers"]
+        assert legacy.evaluator.evaluate(answers).rounded_level == item["transition"][0]
+        assert current.evaluator.evaluate(answers, EvaluationDetail.LEVEL).rounded_level == item["transition"][1]
+        if len(answers) > 1:
+            for qid in answers:
+                rest = {k: v for k, v in answers.items() if k != qid}
+                assert (
+                    legacy.evaluator.evaluate(rest).rounded_level,
+                    current.evaluator.evaluate(rest, EvaluationDetail.LEVEL).rounded_level,
+                ) != tuple(item["transition"])
+    
+    print("✓ 新旧评估器对比工具校验通过")
+
+
+def test_irt_engine():
+    """分级反应模型：EM 拟合单调并能区分题目区分度，两条评分路径一致，可通过 scoring.json 设为主引擎"""
+    import shutil
+    import warnings
+    
+    evaluator = _build_evaluator()
+    questions = evaluator.questions
+    rng = random.Random(53)
+    
+    # 用已知参数生成作答：前一半题目区分度高，后一半低
+    truth = irt_engine.IRTModel(questions)
+    sharp = {q.id for q in questions[: len(questions) // 2]}
+    for q in questions:
+        truth.discrimination[q.id] = 3.0 if q.id in sharp else 0.6
+    codes = []
+    for _ in range(1500):
+        theta = min(6.8, max(1.2, rng.gauss(3.5, 1.1)))
+        row = []
+        for q in questions:
+            probabilities = irt_engine.category_probabilities(
+                truth.discrimination[q.id], truth.thresholds[q.id], [theta]
+            )
+            rank = rng.choices(range(len(q.options)), [p[0] for p in probabilities])[0]
+            row.append(irt_engine.category_order(q)[rank] if rng.random() < 0.9 else -1)
+        codes.append(row)
+    
+    model = irt_engine.IRTModel(questions)
+    report = model.fit(codes, iterations=40)
+    assert report.respondents == 1500 and report.iterations <= 40
+    assert all(b >= a - 1e-9 for a, b in zip(report.log_likelihood, report.log_likelihood[1:]))
+    high = [model.discrimination[q] for q in sharp]
+    low = [model.discrimination[q.id] for q in questions if q.id not in sharp]
+    assert min(high) > max(low)
+    
+    # 标量评分的两条路径一致，批量评分与标量评分一致
+    answer_sets = [evaluator.decode_answers(row) for row in codes[:40]]
+    answer_sets = [answers for answers in answer_sets if answers]
+    batch = model.score_many(evaluator.encode_answers(answer_sets))
+    for answers, batch_level in zip(answer_sets, batch):
+        level, dims, support, hard_cap = model.score(answers)
+        level_py, dims_py, support_py, _ = model.score(answers, use_numpy=False)
+        assert abs(level - level_py) < 1e-9 and list(dims) == list(dims_py)
+        assert all(abs(dims[d] - dims_py[d]) < 1e-9 for d in dims)
+        assert all(abs(support[l] - support_py[l]) < 1e-9 for l in NTRPConstants.LEVELS)
+        assert abs(sum(support.values()) - 1.0) < 1e-9
+        assert abs(min(level, hard_cap) - batch_level) < 1e-9
+    
+    # 参数文件往返；选项变化后拒绝加载
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "irt_parameters.json"
+        model.save(path)
+        loaded = irt_engine.IRTModel.load(path, questions)
+        assert abs(loaded.score(answer_sets[0])[0] - model.score(answer_sets[0])[0]) < 1e-5
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["questions"][questions[0].id]["categories"].reverse()
+        try:
+            irt_engine.IRTModel.from_dict(data, questions)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("选项顺序与参数文件不一致时应抛出 ValueError")
+    
+    # 引擎输出与主评估器相同的结果结构，并拒绝跨题作答
+    engine = scoring_engines.IRTEngine(evaluator, model)
+    answers = answer_sets[0]
+    result = engine.evaluate(answers)
+    reference = evaluator.evaluate(answers)
+    assert type(result) is type(reference) and result.summary_text and result.chart_data is not None
+    assert set(result.dimension_scores) == set(reference.dimension_scores)
+    assert engine.level(answers) == result.rounded_level
+    assert isinstance(engine.evaluate(answers, EvaluationDetail.LEVEL), LevelResult)
+    first, second = questions[0], questions[1]
+    try:
+        engine.evaluate({first.id: second.options[0].id})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("跨题作答应抛出 ValueError")
+    
+    # scoring.json 选择主引擎
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        (config_dir / "scoring.json").write_text(
+            json.dumps({"primary_engine": "irt", "shadow_engines": ["ntrp"]}), encoding="utf-8"
+        )
+        model.save(config_dir / "irt_parameters.json")
+        controller = AppController(config_dir)
+        assert controller.initialize()
+        assert controller.engines.primary == "irt" and controller.engines.shadows == ["ntrp"]
+        complete = evaluator.decode_answers(next(row for row in codes if min(row) >= 0))
+        result = controller.evaluate_answers(complete)
+        assert abs(result.total_level - engine.evaluate(complete).total_level) < 1e-5
+        controller.engines.shutdown()
+        
+        # 缺少拟合参数：作为主引擎拒绝启动，作为影子引擎告警后仍可比对
+        (config_dir / "irt_parameters.json").unlink()
+        manager = ConfigManager(config_dir, use_snapshot=False)
+        try:
+            scoring_engines.build_registry(manager, evaluator)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("缺少 IRT 参数文件时不应以 IRT 作为主引擎")
+        assert not AppController(config_dir).initialize()
+        (config_dir / "scoring.json").write_text(
+            json.dumps({"primary_engine": "ntrp", "shadow_engines": ["irt"]}), encoding="utf-8"
+        )
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            registry = scoring_engines.build_registry(ConfigManager(config_dir, use_snapshot=False), evaluator)
+        assert registry.shadows == ["irt"] and any(w.category is RuntimeWarning for w in caught)
+        registry.shutdown()
+    
+    print("✓ IRT 评分引擎校验通过")
+
+
+def test_invariant_checker():
+    """不变量检查：反例可由逐条 evaluate 复现且已最小；报告与种子、进程数无关；随附配置在基线下通过关卡"""
+    import contextlib
+    import io
+    import shutil
+    
+    def violated(evaluator, example, answers):
+        level = evaluator.evaluate(answers, EvaluationDetail.SCORES)
+        if example.invariant == "monotonic":
+            upgraded = dict(answers, **{example.question_id: example.to_option})
+            return evaluator.evaluate(upgraded, EvaluationDetail.LEVEL).total_level < level.total_level - 1e-9
+        if example.invariant == "hard_cap":
+            caps = [evaluator._option_dict[o].hard_cap for o in answers.values()]
+            return level.total_level > min([c for c in caps if c is not None] or [math.inf]) + 1e-9
+        return level.base_level - level.barrel_adjusted_level > NTRPConstants.MAX_BARREL_PENALTY + 1e-9
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # 给 Q2 center_level 最高的选项加上很低的硬性上限：改选它必然拉低等级
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        data = json.loads((config_dir / "questions.json").read_text(encoding="utf-8"))
+        question = next(q for q in data["questions"] if q["id"] == "Q2")
+        top = max(question["options"], key=lambda o: o["center_level"])
+        top["hard_cap"] = 1.5
+        (config_dir / "questions.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        
+        report = invariant_checker.run_check(config_dir, samples=6000, workers=0, seed=5, chunk_size=2500)
+        assert report.rows <= 6000 and report.evaluations > report.rows
+        assert not report.ok and report.results["monotonic"].violations > 0
+        assert report.results["barrel_penalty"].violations == 0
+        
+        config_manager = ConfigManager(config_dir)
+        evaluator = NTRPEvaluator(config_manager.load_questions(), config_manager.load_suggestions(), config_manager)
+        for result in report.results.values():
+            example = result.example
+            assert (example is None) == (result.violations == 0)
+            if example is None:
+                continue
+            answers = example.answers
+            assert violated(evaluator, example, answers)
+            # 最小：删去任何一题（单调性时改选的题除外）都不再违反
+            for question_id in answers:
+                if question_id == example.question_id or len(answers) == 1:
+                    continue
+                rest = {q: o for q, o in answers.items() if q != question_id}
+                assert not violated(evaluator, example, rest)
+        
+        again = invariant_checker.run_check(config_dir, samples=6000, workers=1, seed=5, chunk_size=2500)
+        assert {n: r.violations for n, r in again.results.items()} == {n: r.violations for n, r in report.results.items()}
+        assert again.results["monotonic"].example == report.results["monotonic"].example
+        
+        # 随附基线之下，新加的低上限带来基线之外的违反，反例也落在新签名上
+        baseline = ConfigManager().config_dir / "invariant_baseline.json"
+        gated = invariant_checker.run_check(config_dir, samples=6000, workers=0, seed=5, chunk_size=2500, baseline=baseline)
+        assert not gated.ok and top["id"] in gated.results["hard_cap"].new_signatures
+        assert 0 < gated.results["monotonic"].new_violations < gated.results["monotonic"].violations
+        example = gated.results["monotonic"].example
+        assert f"{example.question_id}:{example.from_option}>{example.to_option}" in gated.results["monotonic"].new_signatures
+        # 接受这次修改后重新生成基线，同样的检查即通过
+        invariant_checker.write_baseline(report, config_dir / "invariant_baseline.json")
+        accepted = invariant_checker.run_check(
+            config_dir, samples=6000, workers=0, seed=5, chunk_size=2500, baseline=config_dir / "invariant_baseline.json"
+        )
+        assert accepted.ok and accepted.results["monotonic"].violations == report.results["monotonic"].violations
+    
+    # 随附配置有已知的违反，没有基线时关卡失败；随附基线之下通过（样本取法不同也没有基线之外的违反）
+    baseline = str(ConfigManager().config_dir / "invariant_baseline.json")
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert invariant_checker.main(["--samples", "20000", "--workers", "0"]) == 1
+        assert invariant_checker.main(["--samples", "20000", "--workers", "0", "--baseline", baseline]) == 0
+        assert invariant_checker.main(
+            ["--samples", "20000", "--workers", "0", "--seed", "7", "--chunk-size", "3000", "--baseline", baseline]
+        ) == 0
+    
+    try:
+        invariant_checker.run_check(samples=10, invariants=["unknown"], workers=0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知的不变量应抛出 ValueError")
+    
+    print("✓ 不变量检查工具校验通过")
+
+
+def test_routing_policy():
+    """路由策略：提前结束与完整作答各进入阶段的展示等级一致；配置错误被拒绝；模拟器统计正确"""
+    evaluator = _build_evaluator()
+    policies, default_policy = routing_policy.load_policies(evaluator.config_manager)
+    assert default_policy == "two_stage"
+    assert [s.name for s in policies["two_stage"].stages] == ["basic", "advanced"]
+    assert policies["two_stage"].stages[1].min_level == 3.0
+    
+    two_stage = policies["two_stage"]
+    eager = routing_policy.RoutingRunner(evaluator, two_stage)
+    exhaustive = routing_policy.RoutingRunner(
+        evaluator, routing_policy.RoutingPolicy("exhaustive", two_stage.stages, stop_when_decided=False)
+    )
+    rng = random.Random(20)
+    shortened = 0
+    for _ in range(150):
+        answers = _random_answers(evaluator, rng)
+        full = routing_policy.replay(exhaustive.start(), answers, rng)
+        run = routing_policy.replay(eager.start(), answers, rng)
+        assert run.finished and len(run.session) <= len(full.session)
+        assert run.result(EvaluationDetail.LEVEL).rounded_level == full.result(EvaluationDetail.LEVEL).rounded_level
+        # 不进入进阶阶段当且仅当基础题结束后的等级低于 3.0
+        basic = {q: o for q, o in answers.items() if q in two_stage.stages[0].question_ids}
+        low = evaluator.evaluate(basic, EvaluationDetail.LEVEL).total_level < 3.0
+        assert ("advanced" in full.entered) != low
+        shortened += len(run.session) < len(full.session)
+    assert shortened > 0
+    
+    # 置信度：stop_confidence 提前结束阶段，skip_confidence 跳过阶段
+    confident = routing_policy.build_policy("confident", {
+        "stop_when_decided": False,
+        "stages": [
+            {"name": "basic", "tier": "basic", "stop_confidence": 0.6},
+            {"name": "advanced", "tier": "advanced", "skip_confidence": 0.0},
+        ],
+    }, evaluator.questions)
+    run = routing_policy.replay(routing_policy.RoutingRunner(evaluator, confident).start(), answers, rng)
+    assert run.entered == ["basic"] and run.skipped == [("advanced", "confidence")]
+    assert run.confidence() >= 0.6 and len(run.session) < len(confident.stages[0].question_ids)
+    
+    # 修改答案时替换原答案的似然，置信度与 AdaptiveTest 一致
+    changed = routing_policy.RoutingRunner(evaluator, confident).start()
+    changed.next_stage()
+    adaptive = AdaptiveTest(evaluator)
+    first = changed.pending_questions()[0]
+    for option in (first.options[0], first.options[-1], first.options[0]):
+        changed.answer(first.id, option.id)
+        adaptive.answer(first.id, option.id)
+        assert abs(changed.confidence() - adaptive.confidence()) < 1e-12
+    
+    # 可能因 stop_confidence 只答一部分的阶段不参与"结果已确定"的判断（上下界假定可达问题全部作答）
+    stages = [
+        {"name": "basic", "tier": "basic", "stop_confidence": 1.0},
+        {"name": "advanced", "tier": "advanced", "min_level": 3.0},
+    ]
+    unguarded_stages = [{k: v for k, v in stage.items() if k != "stop_confidence"} for stage in stages]
+    guarded, unguarded = (
+        routing_policy.RoutingRunner(evaluator, routing_policy.build_policy(name, {"stages": spec}, evaluator.questions))
+        for name, spec in (("guarded", stages), ("unguarded", unguarded_stages))
+    )
+    basic_ids = set(guarded.policy.stages[0].question_ids)
+    cut_short = 0
+    for _ in range(60):
+        answers = _random_answers(evaluator, rng)
+        seed = rng.random()
+        run = routing_policy.replay(guarded.start(), answers, random.Random(seed))
+        assert not run.decided or basic_ids <= set(run.answers)
+        run = routing_policy.replay(unguarded.start(), answers, random.Random(seed))
+        cut_short += run.decided and not basic_ids <= set(run.answers)
+    assert cut_short > 0
+    
+    # 单阶段（全部问题）与完整作答完全一致
+    single = routing_policy.build_policy(
+        "single", {"stages": [{"name": "all", "tier": ["basic", "advanced"]}]}, evaluator.questions
+    )
+    answer_sets = [_random_answers(evaluator, rng) for _ in range(40)]
+    report = routing_policy.simulate(routing_policy.RoutingRunner(evaluator, single), answer_sets)
+    assert report.respondents == 40 and report.mean_stages == 1.0
+    assert report.exact_rate == 1.0 and report.max_abs_error == 0.0 and report.stage_rates == {"all": 1.0}
+    report = routing_policy.simulate(eager, answer_sets)
+    assert report.mean_questions < len(evaluator.questions) and 1.0 <= report.mean_stages <= 2.0
+    assert report.within_half_rate >= report.exact_rate
+    
+    for spec in (
+        {"stages": []},
+        {"stages": [{"name": "a", "questions": ["Q1", "Q404"]}]},
+        {"stages": [{"name": "a", "tier": "basic", "questions": ["Q1"]}]},
+        {"stages": [{"name": "a", "tier": "basic"}, {"name": "b", "questions": ["Q1"]}]},
+        {"stages": [{"name": "a", "tier": "basic", "skip_confidence": 1.5}]},
+    ):
+        try:
+            routing_policy.build_policy("bad", spec, evaluator.questions)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"错误的路由策略应抛出 ValueError: {spec}")
+    
+    # routing.json 缺省时使用与原两阶段流程一致的默认策略
+    with tempfile.TemporaryDirectory() as tmp:
+        assert ConfigManager(Path(tmp)).load_routing_config()["default_policy"] == "two_stage"
+    
+    print("✓ 路由策略校验通过")
+
+
+def test_config_manager_indexes():
+    """ConfigManager 索引：查找结果与线性扫描一致，跨题选项返回 None，重复ID被拒绝"""
+    config_manager = ConfigManager()
+    questions = config_manager.load_questions()
+    all_options = [(q, o) for q in questions for o in q.options]
+    for question in questions:
+        assert config_manager.get_question_by_id(question.id) is question
+        for owner, option in all_options:
+            expected = config_tools.scan_option(questions, question.id, option.id)
+            assert config_manager.get_option_by_id(question.id, option.id) is expected
+            assert (expected is not None) == (owner is question)
+    for owner, option in all_options:
+        assert config_manager.get_option(option.id) is option
+        assert config_manager.get_question_of_option(option.id) is owner
+    assert config_manager.get_question_by_id("Q404") is None
+    assert config_manager.get_option("Q404_A1") is None and config_manager.get_question_of_option("Q404_A1") is None
+    
+    for tier in ("basic", "advanced"):
+        assert config_manager.get_questions_by_tier(tier) == tuple(q for q in questions if q.question_tier == tier)
+    assert config_manager.get_questions_by_tier("expert") == ()
+    try:
+        config_manager._question_index["Q1"] = None
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("索引应为只读")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config_tools.write_synthetic_questions(Path(tmp), 40)
+        synthetic = ConfigManager(Path(tmp))
+        assert len(synthetic.load_questions()) == 40 and synthetic.get_option_by_id("Q40", "Q40_A4") is not None
+        
+        data = json.loads((Path(tmp) / "questions.json").read_text(encoding="utf-8"))
+        data["questions"][1]["options"][0]["id"] = data["questions"][0]["options"][0]["id"]
+        (Path(tmp) / "questions.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        try:
+            ConfigManager(Path(tmp)).load_questions()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("重复的选项ID应抛出 ValueError")
+    
+    report = config_tools.benchmark_lookup(question_counts=(60,), samples=20)
+    assert [row["questions"] for row in report.values()] == [len(questions), 60]
+    
+    print("✓ 配置索引校验通过")
+
+
+def test_dimension_suggestion_index():
+    """维度建议：区间索引与按配置顺序逐条匹配一致（含重叠区间和断点），首次加载后不再读盘"""
+    import shutil
+    
+    def first_match(rules, score):
+        for rule in rules:
+            if config_manager_module._suggestion_matches(rule, score):
+                return rule.get("text", "")
+        return None
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        data = json.loads((config_dir / "dimension_suggestions.json").read_text(encoding="utf-8"))
+        # 重叠区间、两端缺省的规则和后出现的更宽区间：第一条匹配优先
+        data["suggestions"]["serve"] = [
+            {"min": 2.0, "max": 3.0, "text": "a"},
+            {"min": 2.5, "max": 4.0, "text": "b"},
+            {"text": "never"},
+            {"max": 2.0, "text": "c"},
+            {"min": 1.0, "max": 5.0, "text": "d"},
+        ]
+        (config_dir / "dimension_suggestions.json").write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        
+        config_manager = ConfigManager(config_dir)
+        rules = config_manager.load_dimension_suggestions()["suggestions"]
+        assert config_manager.load_dimension_suggestions() is config_manager.load_dimension_suggestions()
+        rng = random.Random(22)
+        for dimension, dimension_rules in rules.items():
+            points = [v for r in dimension_rules for v in (r.get("min"), r.get("max")) if v is not None]
+            scores = [rng.uniform(0.0, 7.5) for _ in range(300)] + points
+            scores += [p + 1e-9 for p in points] + [p - 1e-9 for p in points] + [-math.inf, math.inf]
+            for score in scores:
+                expected = first_match(dimension_rules, score)
+                text = config_manager.get_dimension_suggestion(dimension, score)
+                assert text == expected if expected is not None else text.startswith("暂无针对")
+        assert config_manager.get_dimension_suggestion("serve", 5.5).startswith("暂无针对")
+        assert config_manager.get_dimension_suggestion("unknown", 3.0).startswith("暂无针对")
+        assert config_manager.get_dimension_suggestion("serve", math.nan).startswith("暂无针对")
+        
+        # 索引建立后删除配置文件，查询仍然可用
+        (config_dir / "dimension_suggestions.json").unlink()
+        assert config_manager.get_dimension_suggestion("serve", 3.0) == "a"
+        assert config_manager.get_dimension_suggestion("serve", 4.5) == "d"
+    
+    print("✓ 维度建议区间索引校验通过")
+
+
+def test_hot_reload():
+    """配置热更新：修改后构建新快照并替换，旧快照仍可用；错误配置被拒绝；inotify/轮询线程都能发现修改"""
+    import os
+    import shutil
+    import time
+    
+    def edit_questions(config_dir, update):
+        path = config_dir / "questions.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        update(data)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        bump(path)
+    
+    def bump(path):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+    
+    def raise_center(data):
+        for option in data["questions"][0]["options"]:
+            option["center_level"] += 1.0
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        
+        reloaded = []
+        watcher = hot_reload.ConfigWatcher(config_dir, on_reload=reloaded.append, settle=0.01)
+        old = watcher.current
+        answers = {q.id: q.options[len(q.options) // 2].id for q in old.evaluator.questions}
+        old_support = old.evaluator.evaluate(answers, EvaluationDetail.SCORES).support_distribution
+        assert old.version == 1 and not watcher.check()
+        
+        # 只改 mtime、内容不变：不重建
+        bump(config_dir / "tennis_knowledge.json")
+        assert not watcher.check() and watcher.current is old
+        
+        edit_questions(config_dir, raise_center)
+        assert watcher.check() and reloaded == [watcher.current]
+        new = watcher.current
+        assert new.version == 2 and new.digest != old.digest
+        assert new.config_manager is not old.config_manager and new.routing.evaluator is new.evaluator
+        assert new.evaluator.evaluate(answers, EvaluationDetail.SCORES).support_distribution != old_support
+        # 旧快照不受影响，进行中的请求可以继续用它算完
+        assert old.evaluator.evaluate(answers, EvaluationDetail.SCORES).support_distribution == old_support
+        
+        # 错误配置：保留当前快照，同一内容不重复尝试
+        errors = []
+        watcher.on_error = errors.append
+        (config_dir / "questions.json").write_text("{", encoding="utf-8")
+        bump(config_dir / "questions.json")
+        assert not watcher.check() and watcher.current is new
+        assert watcher.failures == 1 and isinstance(errors[0], ValueError)
+        bump(config_dir / "questions.json")
+        assert not watcher.check() and watcher.failures == 1
+        
+        # 后台线程：inotify 和轮询
+        shutil.copy(ConfigManager().config_dir / "questions.json", config_dir / "questions.json")
+        bump(config_dir / "questions.json")
+        assert watcher.check() and watcher.current.digest == old.digest and watcher.current.version == 3
+        for use_inotify in (True, False):
+            watcher.use_inotify = use_inotify
+            watcher.interval = 0.05
+            before = watcher.current.version
+            watcher.start()
+            edit_questions(config_dir, raise_center)
+            deadline = time.monotonic() + 10
+            while watcher.current.version == before and time.monotonic() < deadline:
+                time.sleep(0.01)
+            mode = watcher.mode
+            watcher.stop()
+            assert watcher.current.version == before + 1, mode
+            assert mode == ("inotify" if use_inotify and sys.platform.startswith("linux") else "polling")
+        
+        # AppController：评估器、路由和评分引擎随快照整体替换；已取到旧快照的请求不受影响
+        controller = AppController(config_dir, shadow_engines=["legacy"], hot_reload=True)
+        assert controller.initialize()
+        controller._watcher.stop()
+        before = controller._snapshot
+        first = controller.evaluate_answers(answers).support_distribution
+        edit_questions(config_dir, raise_center)
+        assert controller._watcher.check()
+        current = controller._watcher.current
+        assert controller._snapshot is current and current is not before
+        assert controller._evaluator is current.evaluator and controller.config_manager is current.config_manager
+        assert controller.engines is current.engines and current.engines.shadows == ["legacy"]
+        assert current.engines._engines["ntrp"].evaluator is current.evaluator
+        assert current.routing.evaluator is current.evaluator
+        assert before.engines._engines["ntrp"].evaluator is before.evaluator
+        assert before.engines.evaluate(answers).support_distribution == first
+        assert before.engines.summary()["legacy"].dropped == 1  # 被替换的注册表不再启动影子计算
+        assert controller.evaluate_answers(answers).support_distribution != first
+        controller.engines.shutdown()
+    
+    print("✓ 配置热更新校验通过")
+
+
+def test_config_snapshot():
+    """二进制配置快照：内容一致时直接恢复并与 JSON 结果相同；只改 mtime 时仍可用；内容改变（即使大小和 mtime 不变）、快照损坏或禁用时退回 JSON"""
+    import os
+    import shutil
+    import warnings
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        
+        reference = ConfigManager(config_dir, use_snapshot=False)
+        reference.load_all()
+        path = ConfigManager(config_dir).compile_snapshot()
+        assert path == config_dir / config_manager_module.SNAPSHOT_FILE
+        
+        restored = ConfigManager(config_dir)
+        questions = restored.load_questions()
+        assert restored.snapshot_loaded
+        assert questions == reference.load_questions()
+        assert restored.load_tennis_knowledge() == reference.load_tennis_knowledge()
+        assert restored.load_suggestions() == reference.load_suggestions()
+        assert restored.load_scoring_config() == reference.load_scoring_config()
+        assert restored.load_routing_config() == reference.load_routing_config()
+        for question in questions:
+            assert restored.get_question_by_id(question.id) == question
+            for option in question.options:
+                assert restored.get_question_of_option(option.id).id == question.id
+        for tier in ("basic", "advanced"):
+            assert restored.get_questions_by_tier(tier) == reference.get_questions_by_tier(tier)
+        for dimension in NTRPConstants.DIMENSION_META:
+            for score in (1.0, 2.75, 3.5, 4.25, 5.0, 7.0):
+                assert restored.get_dimension_suggestion(dimension, score) == reference.get_dimension_suggestion(dimension, score)
+        answers = {q.id: q.options[len(q.options) // 2].id for q in questions}
+        assert restored.get_answer_validator().validate(answers) == reference.get_answer_validator().validate(answers)
+        assert (
+            NTRPEvaluator(questions, restored.load_suggestions(), restored).evaluate(answers, EvaluationDetail.FULL)
+            == NTRPEvaluator(reference.load_questions(), reference.load_suggestions(), reference).evaluate(answers, EvaluationDetail.FULL)
+        )
+        
+        # 大小和 mtime 都不变的修改（同一 mtime 粒度内的编辑、cp -p 还原）：按内容摘要发现变化
+        source = config_dir / "tennis_knowledge.json"
+        original = source.read_bytes()
+        stat = source.stat()
+        i = original.index(b'"', original.index(b":")) + 1
+        source.write_bytes(original[:i] + bytes([original[i] ^ 1]) + original[i + 1:])
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert source.stat().st_size == stat.st_size and source.stat().st_mtime_ns == stat.st_mtime_ns
+        same_size = ConfigManager(config_dir)
+        same_size.load_all()
+        assert not same_size.snapshot_loaded and same_size.snapshot_fallback == "stale"
+        source.write_bytes(original)
+        
+        # 只改 mtime 不改内容：按内容摘要确认后仍使用快照
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+        touched = ConfigManager(config_dir)
+        touched.load_all()
+        assert touched.snapshot_loaded
+        
+        # 内容改变：退回 JSON，读到新内容
+        data = json.loads(source.read_text(encoding="utf-8"))
+        data["__snapshot_test__"] = True
+        source.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        edited = ConfigManager(config_dir)
+        assert edited.load_tennis_knowledge()["__snapshot_test__"] is True
+        assert not edited.snapshot_loaded
+        
+        # 重新生成后再次可用；截断的快照被忽略
+        ConfigManager(config_dir).compile_snapshot()
+        fresh = ConfigManager(config_dir)
+        fresh.load_all()
+        assert fresh.snapshot_loaded
+        assert fresh.snapshot_fallback is None
+        data = path.read_bytes()
+        path.write_bytes(data[: len(data) // 2])
+        corrupt = ConfigManager(config_dir)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert corrupt.load_questions() == reference.load_questions()
+        assert not corrupt.snapshot_loaded and corrupt.snapshot_fallback == "corrupt"
+        assert any(issubclass(w.category, RuntimeWarning) for w in caught)
+        
+        # 解码以外的错误（代码缺陷）不被当作快照损坏吞掉
+        ConfigManager(config_dir, use_snapshot=False).compile_snapshot()
+        original_build = ConfigManager._build_indexes
+        ConfigManager._build_indexes = lambda self, questions: {}["missing"]
+        try:
+            ConfigManager(config_dir).load_questions()
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("恢复快照时的代码错误应原样抛出")
+        finally:
+            ConfigManager._build_indexes = original_build
+        
+        ConfigManager(config_dir).compile_snapshot()
+        disabled = ConfigManager(config_dir, use_snapshot=False)
+        disabled.load_all()
+        assert not disabled.snapshot_loaded
+        
+        result = config_tools.benchmark_startup(config_dir, repeats=3)
+        assert result["snapshot_ms"] > 0 and result["json_ms"] > 0 and result["snapshot_bytes"] > 0
+    
+    print("✓ 二进制配置快照校验通过")
+
+
+def test_questionnaire_registry():
+    """多版本问卷注册表：稳定分流、不变配置与相同选项共享、各版本结果与独立加载一致、按版本统计"""
+    import shutil
+    
+    # 随附配置：全部流量在当前问卷，简化版只加载、不分流
+    users = [f"user-{i}" for i in range(4000)]
+    shipped = questionnaire_registry.QuestionnaireRegistry()
+    assert shipped.versions == ["current", "simple"]
+    assert all(shipped.assign(u) == "current" for u in users)
+    
+    # 分流只取决于 salt 和用户ID，流量为 0 的版本不会被分到
+    def experiment(salt, traffic):
+        files = {"current": "questions.json", "simple": "questions-simple.json", "holdout": "questions.json"}
+        return {"salt": salt, "versions": {name: {"questions": files[name], "traffic": t} for name, t in traffic.items()}}
+    
+    split = experiment("questionnaire-2026", {"current": 50, "simple": 50, "holdout": 0})
+    registry = questionnaire_registry.QuestionnaireRegistry(experiment=split)
+    assert registry.versions == ["current", "simple", "holdout"]
+    assignments = [registry.assign(u) for u in users]
+    reloaded = questionnaire_registry.QuestionnaireRegistry(experiment=split)
+    assert assignments == [reloaded.assign(u) for u in users]
+    counts = {name: assignments.count(name) for name in registry.versions}
+    assert counts["holdout"] == 0
+    assert abs(counts["current"] - counts["simple"]) < 0.1 * len(users)
+    other = questionnaire_registry.QuestionnaireRegistry(experiment=experiment("other", {"current": 1, "simple": 1}))
+    assert [other.assign(u) for u in users] != assignments
+    
+    # 问题以外的配置整体共享；字段相同的选项在各版本中是同一个对象
+    managers = [registry.config_manager_for(name) for name in registry.versions]
+    assert all(m.load_tennis_knowledge() is managers[0].load_tennis_knowledge() for m in managers)
+    assert all(m._suggestion_index is managers[0]._suggestion_index for m in managers)
+    current = {o.id: o for q in managers[0].load_questions() for o in q.options}
+    simple = {o.id: o for q in managers[1].load_questions() for o in q.options}
+    same = [oid for oid in current.keys() & simple.keys() if current[oid] == simple[oid]]
+    assert same and all(current[oid] is simple[oid] for oid in same)
+    sharing = registry.sharing()
+    assert sharing["unique_options"] < sharing["options"]
+    
+    # 各版本结果与独立加载的评估器一致，并按版本累计统计
+    rng = random.Random(0)
+    for name in registry.versions:
+        standalone = ConfigManager(questions_file=registry.config_manager_for(name).questions_file)
+        evaluator = NTRPEvaluator(standalone.load_questions(), standalone.load_suggestions(), standalone)
+        for _ in range(20):
+            answers = questionnaire_registry.synthetic_answers(evaluator.questions, rng)
+            assert registry.evaluate("replay", answers, version=name) == evaluator.evaluate(answers)
+    registry.reset()
+    
+    stats = questionnaire_registry.simulate(registry, 400)
+    expected = {name: assignments[:400].count(name) for name in registry.versions}
+    assert {name: s.calls for name, s in stats.items()} == expected
+    for s in stats.values():
+        assert sum(s.level_distribution.values()) == s.calls
+        assert s.calls == 0 or (1.0 <= s.mean_level <= 7.0 and s.p95_ms >= s.p50_ms > 0)
+    try:
+        registry.evaluate("user-0", {"Q1": "missing"})
+        assert False, "无效答案应抛出 ValueError"
+    except ValueError:
+        pass
+    assert registry.summary()[registry.assign("user-0")].errors == 1
+    try:
+        registry.evaluator("unknown")
+        assert False, "未知版本应抛出 ValueError"
+    except ValueError:
+        pass
+    assert json.loads(registry.dump()).keys() == set(registry.versions)
+    
+    # 其它问题文件不生成快照；实验配置校验
+    try:
+        ConfigManager(questions_file="questions-simple.json").compile_snapshot()
+        assert False, "非 questions.json 不应生成快照"
+    except ValueError:
+        pass
+    with tempfile.TemporaryDirectory() as tmp:
+        config_dir = Path(tmp)
+        for path in ConfigManager().config_dir.glob("*.json"):
+            shutil.copy(path, config_dir)
+        (config_dir / "experiments.json").write_text(
+            json.dumps({"versions": {"current": {"questions": "questions.json", "traffic": -1}}}), encoding="utf-8"
+        )
+        try:
+            ConfigManager(config_dir).load_experiment_config()
+            assert False, "负流量应抛出 ValueError"
+        except ValueError:
+            pass
+        (config_dir / "experiments.json").unlink()
+        default = questionnaire_registry.QuestionnaireRegistry(config_dir)
+        assert default.versions == ["current"] and default.assign("anyone") == "current"
+    
+    print("✓ 多版本问卷注册表校验通过")
+
+
+if __name__ == "__main__":
+    test_compiled_support_matches_membership()
+    test_evaluate_many_matches_evaluate()
+    test_session_reuses_basic_state()
+    test_detail_levels()
+    test_sensitivity_matrix()
+    test_upgrade_plan()
+    test_level_bounds_contain_completions()
+    test_adaptive_test()
+    test_specialized_evaluator()
+    test_posterior_summary()
+    test_calibration()
+    test_hyperparameter_search()
+    test_answer_validator()
+    test_engine_registry_shadow()
+    test_parity_harness()
+    test_irt_engine()
+    test_invariant_checker()
+    test_routing_policy()
+    test_config_manager_indexes()
+    test_dimension_suggestion_index()
+    test_hot_reload()
+    test_config_snapshot()
+    test_questionnaire_registry()
+    
+    print("\n" + "=" * 60)
+    print("测试完成!")
+    print("=" * 60)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Config snapshot compiler and config loading benchmarks
+
+compile    writes config.snapshot into the config directory (see
+           ConfigManager.compile_snapshot); later ConfigManager instances
+           restore it instead of parsing the JSON files while the sources
+           still hash to the recorded digest.
+benchmark  compares indexed option lookup with the former linear scan and
+           validate_answers on the shipped and on synthetic questionnaires,
+           then cold-start load_all from JSON against the binary snapshot.
+
+Usage:
+    python config_tools.py compile [--config-dir DIR]
+    python config_tools.py benchmark [--config-dir DIR] [--questions 500,2000]
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+sys.path.insert(0, str(Path(__file__).parent / "aiteni-core" / "src"))
+
+from config_manager import ConfigManager, SNAPSHOT_SOURCES, SNAPSHOT_VERSION  # noqa: E402
+from data_models import NTRPConstants, OptionConfig, QuestionConfig  # noqa: E402
+
+
+def scan_option(questions: Sequence[QuestionConfig], question_id: str, option_id: str) -> Optional[OptionConfig]:
+    """The linear lookup get_option_by_id used before the indexes (benchmark reference only)"""
+    for question in questions:
+        if question.id == question_id:
+            for option in question.options:
+                if option.id == option_id:
+                    return option
+            return None
+    return None
+
+
+def write_synthetic_questions(config_dir: Path, question_count: int, option_count: int = 5) -> None:
+    """Write a synthetic questions.json with question_count questions of option_count options each"""
+    dimensions = list(NTRPConstants.DIMENSION_META)
+    questions = [
+        {
+            "id": f"Q{i}",
+            "text": f"合成问题 {i}",
+            "dimension": dimensions[i % len(dimensions)],
+            "question_tier": "basic" if i % 3 else "advanced",
+            "options": [
+                {"id": f"Q{i}_A{k}", "text": f"选项 {k}", "center_level": 1.0 + k * 5.0 / max(option_count - 1, 1)}
+                for k in range(option_count)
+            ],
+        }
+        for i in range(1, question_count + 1)
+    ]
+    with open(Path(config_dir) / "questions.json", "w", encoding="utf-8") as f:
+        json.dump({"questions": questions}, f, ensure_ascii=False)
+
+
+def benchmark_lookup(
+    question_counts: Sequence[int] = (500,),
+    samples: int = 2000,
+    seed: int = 0,
+    config_dir: Optional[Path] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Per-call time of indexed lookup, linear lookup and validate_answers over whole answer sets
+
+    The questionnaire in config_dir (default: the shipped one) is always included.
+
+    Returns:
+        {questionnaire: {'questions', 'load_ms', 'indexed_lookup_us', 'linear_lookup_us', 'validate_us'}}
+    """
+    rng = random.Random(seed)
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [("questions.json", config_dir)]
+        for count in question_counts:
+            synthetic_dir = Path(tmp) / str(count)
+            synthetic_dir.mkdir()
+            write_synthetic_questions(synthetic_dir, count)
+            targets.append((f"synthetic {count}", synthetic_dir))
+
+        for name, target in targets:
+            config_manager = ConfigManager(target)
+            start = time.perf_counter()
+            questions = config_manager.load_questions()
+            load_ms = (time.perf_counter() - start) * 1000
+            config_manager.get_answer_validator()
+
+            answer_sets = [{q.id: rng.choice(q.options).id for q in questions} for _ in range(samples)]
+
+            start = time.perf_counter()
+            for answers in answer_sets:
+                for question_id, option_id in answers.items():
+                    config_manager.get_option_by_id(question_id, option_id)
+            indexed = (time.perf_counter() - start) / samples
+
+            linear_samples = max(samples // 20, 1)
+            start = time.perf_counter()
+            for answers in answer_sets[:linear_samples]:
+                for question_id, option_id in answers.items():
+                    scan_option(questions, question_id, option_id)
+            linear = (time.perf_counter() - start) / linear_samples
+
+            start = time.perf_counter()
+            for answers in answer_sets:
+                config_manager.validate_answers(answers)
+            validate = (time.perf_counter() - start) / samples
+
+            results[name] = {
+                'questions': len(questions),
+                'load_ms': load_ms,
+                'indexed_lookup_us': indexed * 1e6,
+                'linear_lookup_us': linear * 1e6,
+                'validate_us': validate * 1e6,
+            }
+    return results
+
+
+def benchmark_startup(config_dir: Optional[Path] = None, repeats: int = 50) -> Dict[str, float]:
+    """
+    Cold-start load_all from JSON against the binary snapshot
+
+    The sources are copied into a temporary directory, so the config directory is
+    left untouched; the two modes alternate to even out system noise.
+
+    Returns:
+        {'json_ms', 'snapshot_ms', 'speedup', 'compile_ms', 'snapshot_bytes'} (median timings)
+
+    Raises:
+        RuntimeError: the snapshot was not used, or was used with use_snapshot=False
+    """
+    source = Path(ConfigManager(config_dir).config_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp)
+        for name in SNAPSHOT_SOURCES:
+            if (source / name).exists():
+                shutil.copy(source / name, target / name)
+
+        start = time.perf_counter()
+        path = ConfigManager(target, use_snapshot=False).compile_snapshot()
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        samples: Dict[bool, List[float]] = {False: [], True: []}
+        for i in range(repeats + 1):
+            for use_snapshot in (False, True):
+                start = time.perf_counter()
+                config_manager = ConfigManager(target, use_snapshot=use_snapshot)
+                config_manager.load_all()
+                elapsed = (time.perf_counter() - start) * 1000
+                if config_manager.snapshot_loaded != use_snapshot:
+                    raise RuntimeError(
+                        f"use_snapshot={use_snapshot} but snapshot_loaded={config_manager.snapshot_loaded} "
+                        f"(fallback: {config_manager.snapshot_fallback})"
+                    )
+                if i:  # the first round only warms up
+                    samples[use_snapshot].append(elapsed)
+        json_ms = sorted(samples[False])[repeats // 2]
+        snapshot_ms = sorted(samples[True])[repeats // 2]
+        return {
+            'json_ms': json_ms,
+            'snapshot_ms': snapshot_ms,
+            'speedup': json_ms / snapshot_ms,
+            'compile_ms': compile_ms,
+            'snapshot_bytes': float(path.stat().st_size),
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile the binary config snapshot, or run the config loading benchmarks")
+    parser.add_argument("command", choices=["compile", "benchmark"], nargs="?", default="benchmark")
+    parser.add_argument("--config-dir", type=Path, default=None)
+    parser.add_argument("--questions", default="500",
+                        help="comma-separated sizes of the synthetic questionnaires for the lookup benchmark")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        path = ConfigManager(args.config_dir, use_snapshot=False).compile_snapshot()
+        print(f"Snapshot written to {path} ({path.stat().st_size} bytes, format version {SNAPSHOT_VERSION})")
+        return 0
+
+    counts = [int(n) for n in args.questions.split(",") if n.strip()]
+    for name, row in benchmark_lookup(counts, config_dir=args.config_dir).items():
+        print(f"{name}:")
+        for key, value in row.items():
+            print(f"  {key}: {value:.2f}")
+    print("cold start (load_all):")
+    for key, value in benchmark_startup(args.config_dir).items():
+        print(f"  {key}: {value:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
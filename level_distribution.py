@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Level distribution of questions.json over uniformly random answer sets
+
+Base level (anchor support expectation capped by hard caps) is computed exactly
+by dynamic programming, without enumerating the ~10^15 answer combinations:
+
+    min(A / W, cap) >= t   <=>   sum_q (a_q - t * w_q) >= 0  and  every chosen cap >= t
+
+where a_q / w_q are the per-question level-weighted / plain support sums.
+For every threshold t the per-question terms are discretized and convolved;
+rounding every term down and up gives a guaranteed lower / upper bound on the
+probability, so each reported number is an interval that narrows as --bins grows.
+
+The barrel effect and comprehensive bonus depend on all dimension scores at
+once and are not additive, so the final (displayed) level distribution is
+estimated by Monte Carlo sampling in a process pool.
+
+Usage:
+    python level_distribution.py [--tier all|basic|advanced] [--samples N] [--workers N]
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent / "aiteni-core" / "src"))
+
+from config_manager import ConfigManager  # noqa: E402
+from ntrp_evaluator import NTRPEvaluator  # noqa: E402
+from data_models import round_to_half  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional: the pure Python DP uses sparse dicts
+    np = None
+
+# Displayed levels are round_to_half(level) over [1.0, 7.0]
+ROUNDED_LEVELS: List[float] = [1.0 + 0.5 * i for i in range(13)]
+
+
+def load_evaluator(config_dir: Optional[Path] = None) -> NTRPEvaluator:
+    config_manager = ConfigManager(config_dir)
+    return NTRPEvaluator(
+        config_manager.load_questions(), config_manager.load_suggestions(), config_manager
+    )
+
+
+def select_questions(evaluator: NTRPEvaluator, tier: str) -> List:
+    if tier == "all":
+        return list(evaluator.questions)
+    return [q for q in evaluator.questions if q.question_tier == tier]
+
+
+def question_terms(evaluator: NTRPEvaluator, questions: Sequence) -> List[List[Tuple[float, float, float]]]:
+    """Per question, per option: (sum level * support, sum support, hard cap)"""
+    levels = evaluator._levels
+    terms = []
+    for question in questions:
+        options = []
+        for option in question.options:
+            compiled = evaluator._compiled_options[option.id]
+            options.append((
+                sum(level * s for level, s in zip(levels, compiled.support)),
+                sum(compiled.support),
+                compiled.hard_cap,
+            ))
+        terms.append(options)
+    return terms
+
+
+# =========================
+#  Exact DP for the base level
+# =========================
+
+def probability_at_least(
+    terms: List[List[Tuple[float, float, float]]],
+    threshold: float,
+    bins: int = 20000,
+) -> Tuple[float, float]:
+    """
+    P(base level >= threshold) for independent uniform answers
+
+    Returns:
+        (lower bound, upper bound) from rounding every term down / up
+    """
+    # Options whose hard cap is below the threshold can never reach it: drop their mass
+    values: List[List[Tuple[float, float]]] = []
+    for options in terms:
+        p = 1.0 / len(options)
+        kept = [(a - threshold * w, p) for a, w, cap in options if cap >= threshold]
+        if not kept:
+            return 0.0, 0.0
+        values.append(kept)
+
+    span = sum(max(v for v, _ in kept) - min(v for v, _ in kept) for kept in values)
+    if span <= 0:
+        total = sum(max(v for v, _ in kept) for kept in values)
+        mass = math.prod(sum(p for _, p in kept) for kept in values)
+        return (mass, mass) if total >= 0 else (0.0, 0.0)
+    step = span / bins
+
+    bounds = []
+    for rounding in (math.floor, math.ceil):
+        offset = 0
+        kernels = []
+        for kept in values:
+            low = min(rounding(v / step) for v, _ in kept)
+            offset += low
+            kernels.append([(rounding(v / step) - low, p) for v, p in kept])
+        # sum of rounded terms >= 0  <=>  shifted index >= -offset
+        distribution = _convolve_all(kernels)
+        start = max(0, -offset)
+        bounds.append(float(sum(distribution[start:])))
+    return bounds[0], bounds[1]
+
+
+def _convolve_all(kernels: List[List[Tuple[int, float]]]):
+    """Distribution of the sum of independent non-negative integer offsets"""
+    if np is not None:
+        distribution = np.ones(1)
+        for kernel in kernels:
+            width = max(k for k, _ in kernel) + 1
+            result = np.zeros(len(distribution) + width - 1)
+            for k, p in kernel:
+                result[k:k + len(distribution)] += p * distribution
+            distribution = result
+        return distribution
+
+    distribution: Dict[int, float] = {0: 1.0}
+    for kernel in kernels:
+        result: Dict[int, float] = {}
+        for index, mass in distribution.items():
+            for k, p in kernel:
+                result[index + k] = result.get(index + k, 0.0) + mass * p
+        distribution = result
+    size = max(distribution) + 1
+    dense = [0.0] * size
+    for index, mass in distribution.items():
+        dense[index] = mass
+    return dense
+
+
+def base_level_distribution(
+    terms: List[List[Tuple[float, float, float]]],
+    bins: int = 20000,
+) -> Dict[float, Tuple[float, float]]:
+    """
+    Exact distribution of round_to_half(base level)
+
+    Returns:
+        {displayed level: (lower bound, upper bound)}
+    """
+    cutoffs = [level + 0.25 for level in ROUNDED_LEVELS[:-1]]
+    tails = [(1.0, 1.0)] + [probability_at_least(terms, t, bins) for t in cutoffs] + [(0.0, 0.0)]
+    distribution = {}
+    for i, level in enumerate(ROUNDED_LEVELS):
+        (lo_here, hi_here), (lo_next, hi_next) = tails[i], tails[i + 1]
+        lower = max(0.0, lo_here - hi_next)
+        distribution[level] = (lower, max(lower, min(1.0, hi_here - lo_next)))
+    return distribution
+
+
+# =========================
+#  Monte Carlo for the final level
+# =========================
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(config_dir: Optional[str], question_ids: List[str]) -> None:
+    evaluator = load_evaluator(Path(config_dir) if config_dir else None)
+    selected = set(question_ids)
+    _worker_state["evaluator"] = evaluator
+    # Unselected questions stay unanswered (code -1)
+    _worker_state["radices"] = [
+        len(q.options) if q.id in selected else 0 for q in evaluator.questions
+    ]
+
+
+def _sample_chunk(args: Tuple[int, int]) -> Tuple[Dict[float, int], Dict[float, int]]:
+    seed, count = args
+    evaluator = _worker_state["evaluator"]
+    radices = _worker_state["radices"]
+    rng = random.Random(seed)
+    codes = [
+        [rng.randrange(r) if r else -1 for r in radices]
+        for _ in range(count)
+    ]
+    result = evaluator.evaluate_many(codes)
+    final_counts: Dict[float, int] = {}
+    base_counts: Dict[float, int] = {}
+    for final, base in zip(result.rounded_level, result.base_level):
+        final = float(final)
+        base = round_to_half(float(base))
+        final_counts[final] = final_counts.get(final, 0) + 1
+        base_counts[base] = base_counts.get(base, 0) + 1
+    return final_counts, base_counts
+
+
+def monte_carlo(
+    question_ids: List[str],
+    samples: int,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = 20000,
+    config_dir: Optional[Path] = None,
+) -> Tuple[Dict[float, int], Dict[float, int]]:
+    """
+    Sample uniformly random answer sets in a process pool
+
+    Returns:
+        (counts of rounded final levels, counts of rounded base levels)
+    """
+    chunks = []
+    remaining = samples
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        chunks.append((seed * 1_000_003 + len(chunks), count))
+        remaining -= count
+
+    final_counts: Dict[float, int] = {}
+    base_counts: Dict[float, int] = {}
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(str(config_dir) if config_dir else None, question_ids),
+    ) as pool:
+        for finals, bases in pool.map(_sample_chunk, chunks):
+            for level, n in finals.items():
+                final_counts[level] = final_counts.get(level, 0) + n
+            for level, n in bases.items():
+                base_counts[level] = base_counts.get(level, 0) + n
+    return final_counts, base_counts
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config-dir", type=Path, default=None, help="config directory (default: aiteni-core/config)")
+    parser.add_argument("--tier", choices=["all", "basic", "advanced"], default="all",
+                        help="questions answered (others are left unanswered)")
+    parser.add_argument("--bins", type=int, default=20000, help="DP discretization bins per threshold")
+    parser.add_argument("--samples", type=int, default=200000, help="Monte Carlo samples (0 to skip)")
+    parser.add_argument("--workers", type=int, default=None, help="Monte Carlo worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--at-least", type=float, default=4.5, help="report the share at this displayed level or above")
+    args = parser.parse_args(argv)
+
+    evaluator = load_evaluator(args.config_dir)
+    questions = select_questions(evaluator, args.tier)
+    if not questions:
+        print(f"❌ No questions in tier {args.tier}")
+        return 1
+    terms = question_terms(evaluator, questions)
+    combinations = math.prod(len(options) for options in terms)
+
+    print(f"Questions: {len(questions)} ({args.tier}), answer combinations: {combinations:.3e}")
+    print(f"DP backend: {'NumPy' if np is not None else 'pure Python'}, bins: {args.bins}")
+
+    start = time.perf_counter()
+    exact = base_level_distribution(terms, args.bins)
+    dp_seconds = time.perf_counter() - start
+
+    final_counts: Dict[float, int] = {}
+    base_counts: Dict[float, int] = {}
+    mc_seconds = 0.0
+    if args.samples > 0:
+        start = time.perf_counter()
+        final_counts, base_counts = monte_carlo(
+            [q.id for q in questions], args.samples, args.workers, args.seed, config_dir=args.config_dir
+        )
+        mc_seconds = time.perf_counter() - start
+
+    print()
+    header = f"{'level':>6}  {'base (exact DP)':>21}"
+    if args.samples > 0:
+        header += f"  {'base (MC)':>10}  {'final (MC)':>10}"
+    print(header)
+    for level in ROUNDED_LEVELS:
+        lo, hi = exact[level]
+        line = f"{level:>6.1f}  {lo:>10.6f}–{hi:<10.6f}"
+        if args.samples > 0:
+            line += f"  {base_counts.get(level, 0) / args.samples:>10.6f}"
+            line += f"  {final_counts.get(level, 0) / args.samples:>10.6f}"
+        print(line)
+
+    print()
+    lo = sum(exact[level][0] for level in ROUNDED_LEVELS if level >= args.at_least)
+    hi = sum(exact[level][1] for level in ROUNDED_LEVELS if level >= args.at_least)
+    print(f"Base level >= {args.at_least}: {lo:.6f}–{hi:.6f} (exact, {dp_seconds:.2f}s)")
+    if args.samples > 0:
+        share = sum(n for level, n in final_counts.items() if level >= args.at_least) / args.samples
+        error = math.sqrt(max(share * (1 - share), 1e-12) / args.samples)
+        print(f"Final level >= {args.at_least}: {share:.4f} ± {1.96 * error:.4f} "
+              f"(Monte Carlo, {args.samples} samples, {mc_seconds:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())